@@ -7,6 +7,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from api.query_endpoint import router as query_router
 from api.upload_endpoint import router as upload_router
 from api.citation_purpose_endpoint import router as citation_purpose_router
+from api.papers_endpoint import router as papers_router
+from vectorstore.vector_qa import vector_qa_service
 
 app = FastAPI()
 
@@ -23,4 +25,11 @@ app.add_middleware(
 # app.include_router(metadata_router, prefix="")
 app.include_router(query_router, prefix="")
 app.include_router(upload_router, prefix="")
-app.include_router(citation_purpose_router, prefix="")
\ No newline at end of file
+app.include_router(citation_purpose_router, prefix="")
+app.include_router(papers_router, prefix="")
+
+
+# ✅ 서버 시작 시 벡터 DB / 임베딩 모델 미리 로드 (첫 질의 지연 제거)
+@app.on_event("startup")
+def warm_up():
+    vector_qa_service.warm_up()
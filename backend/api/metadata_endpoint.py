@@ -4,12 +4,19 @@ from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 import os
 import json
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from utils.paper_registry import list_papers
 
 router = APIRouter()
 
 @router.get("/get_metadata")
 def get_metadata():
-    metadata_path = "./utils/metadata/integrated_metadata.json"
+    # ✅ 가장 최근에 업로드된 논문 (논문별 디렉토리), 등록된 논문이 없으면 기존 공용 파일
+    papers = list_papers()
+    metadata_path = papers[0]["metadata_path"] if papers else "./utils/metadata/integrated_metadata.json"
     if not os.path.exists(metadata_path):
         return JSONResponse(status_code=404, content={"error": "Metadata file not found"})
 
@@ -0,0 +1,56 @@
+# backend/api/papers_endpoint.py
+# 업로드된 논문 목록 / 논문별 메타데이터 / 논문 삭제
+
+import sys
+import os
+from fastapi import APIRouter, HTTPException
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from utils.paper_registry import list_papers, get_paper, load_paper_metadata, unregister_paper
+from vectorstore.build_vector_db import remove_paper_from_vector_db
+from graphdb.graph_builder import GraphBuilder, get_shared_driver
+from graphdb.local_graph import LocalGraphBuilder
+
+base_dir = os.path.join(os.path.dirname(__file__), "..")
+VECTOR_DB_DIR = os.path.join(base_dir, "utils/metadata/chroma_db")
+
+router = APIRouter()
+
+
+# ✅ 논문 목록 (질의 시 QueryRequest.paper_id로 사용)
+@router.get("/papers")
+def papers():
+    return {
+        "papers": [
+            {key: paper.get(key) for key in ("paper_id", "title", "year", "references", "uploaded_at")}
+            for paper in list_papers()
+        ]
+    }
+
+
+# ✅ 논문별 통합 메타데이터 (paper_id에 '/' 가 들어갈 수 있어 query parameter로 받음)
+@router.get("/papers/metadata")
+def paper_metadata(paper_id: str):
+    metadata = load_paper_metadata(paper_id)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail=f"등록되지 않은 논문입니다: {paper_id}")
+    return metadata
+
+
+# ✅ 논문 삭제 (벡터 DB / BM25 색인의 해당 논문 문서 + 그래프의 인용 관계 + 논문 디렉토리)
+@router.delete("/papers")
+def delete_paper(paper_id: str):
+    if get_paper(paper_id) is None:
+        raise HTTPException(status_code=404, detail=f"등록되지 않은 논문입니다: {paper_id}")
+    removed = remove_paper_from_vector_db(paper_id, VECTOR_DB_DIR)
+
+    # 업로드 때와 같은 그래프 백엔드 (GRAPH_BACKEND: neo4j / local)
+    if os.getenv("GRAPH_BACKEND", "neo4j") == "local":
+        graph = LocalGraphBuilder()
+    else:
+        graph = GraphBuilder(driver=get_shared_driver())
+    removed_relations = graph.remove_paper(paper_id)
+
+    unregister_paper(paper_id)
+    return {"paper_id": paper_id, "removed_documents": removed, "removed_relations": removed_relations}
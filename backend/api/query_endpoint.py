@@ -1,23 +1,103 @@
 import sys
 import os
+import json
+import time
+import threading
+from collections import deque
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
 from fastapi import HTTPException, APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from graphdb.hybrid_qa_strict import hybrid_qa
+from graphdb.hybrid_qa_strict import hybrid_qa, hybrid_qa_stream
+from graphdb.graph_qa import cypher_cache, result_cache
+from graphdb.query_router import query_router
 from vectorstore.qa_chain import run_qa_chain
+from vectorstore.vector_qa import retrieve_documents, stream_answer_from_documents, embeddings
+from utils.answer_cache import AnswerCache
+from vectorstore.embedding_cache import open_cache
+from utils.conversation_store import ConversationStore, CONVERSATION_SUMMARY, summarize_with_llm, summary_executor
+from vectorstore.retrieval_filters import clean_filters
+from vectorstore.context_packer import packing_stats
+from utils.paper_registry import get_paper
 
 base_dir = os.path.join(os.path.dirname(__file__), "..")
 VECTOR_DB_DIR = os.path.join(base_dir, "utils/metadata/chroma_db")
 
 router = APIRouter()
 
+# ✅ 최종 답변 캐시 (MiniLM 질문 임베딩 유사도 조회, /upload 시 코퍼스 버전 변경으로 무효화)
+answer_cache = AnswerCache(embed_fn=embeddings.embed_query)
+
+# ✅ 세션별 대화 히스토리 (토큰 window, CONVERSATION_SUMMARY=true 이면 밀려난 턴을 요청 밖에서 요약)
+conversation_store = ConversationStore(
+    summarize_fn=summarize_with_llm if CONVERSATION_SUMMARY else None,
+    executor=summary_executor,
+)
+
+# ✅ 스트리밍 응답 지연 시간 기록 (첫 토큰까지 / 전체)
+LATENCY_WINDOW = int(os.getenv("QUERY_LATENCY_WINDOW", "500"))
+_latency_lock = threading.Lock()
+_latencies = {"ttft_ms": deque(maxlen=LATENCY_WINDOW), "total_ms": deque(maxlen=LATENCY_WINDOW)}
+
+
+def record_latency(ttft_ms, total_ms):
+    with _latency_lock:
+        if ttft_ms is not None:
+            _latencies["ttft_ms"].append(ttft_ms)
+        _latencies["total_ms"].append(total_ms)
+
+
+def latency_stats() -> dict:
+    def summarize(values):
+        if not values:
+            return {"count": 0, "p50": None, "p95": None}
+        ordered = sorted(values)
+        return {
+            "count": len(ordered),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        }
+
+    with _latency_lock:
+        return {name: summarize(list(values)) for name, values in _latencies.items()}
+
+
+# ✅ 검색 메타데이터 필터 (생략하면 질문에서 추론)
+class RetrievalFilters(BaseModel):
+    source: str | None = None  # original_paper_body / original paper / reference paper
+    year_min: int | None = None
+    year_max: int | None = None
+    paper_id: str | None = None
+
 # ✅ 요청 형식
 class QueryRequest(BaseModel):
     query: str
     top_k: int = 3
     return_sources: bool = False
     mode: str = "hybrid"
+    session_id: str | None = None  # 없으면 히스토리 없이 단발성 질의
+    filters: RetrievalFilters | None = None
+    paper_id: str | None = None  # 특정 논문만 검색 (없으면 전체 논문, /papers 목록의 paper_id)
+
+
+# ✅ 요청 필터 검증 (알 수 없는 source → 400, 등록되지 않은 논문 → 404)
+def request_filters(request: QueryRequest) -> dict:
+    filters = request.filters.dict() if request.filters else {}
+    if request.paper_id:
+        filters["paper_id"] = request.paper_id
+    try:
+        filters = clean_filters(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if "paper_id" in filters and get_paper(filters["paper_id"]) is None:
+        raise HTTPException(status_code=404, detail=f"등록되지 않은 논문입니다: {filters['paper_id']}")
+    return filters
+
+
+# ✅ 답변 캐시 key의 mode에 필터 포함 (필터가 다르면 다른 답변)
+def cache_mode(request: QueryRequest, filters: dict) -> str:
+    return f"{request.mode}|{json.dumps(filters, sort_keys=True)}" if filters else request.mode
 
 class Source(BaseModel):
     title: str | None = None
@@ -30,60 +110,180 @@ class QueryResponse(BaseModel):
     answer: str
     sources: list[Source]
 
+# ✅ Document → Source 응답 형식 변환
+def format_sources(source_docs) -> list:
+    sources = []
+    for doc in source_docs:
+        try:
+            authors = doc.metadata.get("authors", "")
+            if isinstance(authors, str):
+                authors = [a.strip() for a in authors.split(",") if a.strip()]
+            elif not isinstance(authors, list):
+                authors = []
+
+            sources.append({
+                "title": doc.metadata.get("title", "제목 없음"),
+                "year": doc.metadata.get("year"),
+                "authors": authors,
+                "summary": doc.page_content[:300] + "..."
+            })
+        except Exception as e:
+            print("⚠️ 소스 포맷 에러:", e)
+            sources.append({
+                "title": "Unknown",
+                "authors": [],
+                "summary": str(doc)[:300]
+            })
+    return sources
+
+
 # ✅ 메인 엔드포인트
 @router.post("/query", response_model=QueryResponse)
 def query_endpoint(request: QueryRequest):
+    filters = request_filters(request)
+    mode_key = cache_mode(request, filters)
     try:
         print(f"📥 받은 쿼리: {request.query}")
         print(f"🔁 반환할 소스 포함 여부: {request.return_sources}")
         print(f"🧩 QA 모드: {request.mode}")
 
+        # 답변 캐시는 히스토리가 없는 첫 질문에만 적용 (후속 질문은 대화 맥락에 따라 답이 달라짐)
+        chat_history = conversation_store.history(request.session_id)
+        had_history = bool(chat_history)  # QA 함수 호출 전에 판단 (history 리스트는 호출 측 소유)
+        cached = answer_cache.lookup(request.query, mode_key, request.top_k) if not had_history else None
+        if cached is not None:
+            print("⚡ 답변 캐시 hit")
+            conversation_store.append(request.session_id, request.query, cached["answer"])
+            return {"answer": cached["answer"], "sources": cached["sources"] if request.return_sources else []}
+
         if request.mode == "vector-only":
             answer, source_docs = run_qa_chain(
                 query=request.query,
                 k=request.top_k,
                 VECTOR_DB_DIR=VECTOR_DB_DIR,
-                return_sources=True
+                return_sources=True,
+                chat_history=chat_history,
+                filters=filters
             )
         else:  # hybrid (기본)
             answer, source_docs = hybrid_qa(
                 question=request.query,
                 k=request.top_k,
                 vector_db_dir=VECTOR_DB_DIR,
-                return_sources=request.return_sources
+                return_sources=True,
+                chat_history=chat_history,
+                filters=filters
             )
+        conversation_store.append(request.session_id, request.query, answer)
 
-        sources = []
-        if request.return_sources:
-            for doc in source_docs:
-                try:
-                    authors = doc.metadata.get("authors", "")
-                    if isinstance(authors, str):
-                        authors = [a.strip() for a in authors.split(",") if a.strip()]
-                    elif not isinstance(authors, list):
-                        authors = []
-
-                    sources.append({
-                        "title": doc.metadata.get("title", "제목 없음"),
-                        "year": doc.metadata.get("year"),
-                        "authors": authors,
-                        "summary": doc.page_content[:300] + "..."
-                    })
-                except Exception as e:
-                    print("⚠️ 소스 포맷 에러:", e)
-                    sources.append({
-                        "title": "Unknown",
-                        "authors": [],
-                        "summary": str(doc)[:300]
-                    })
-
-        return {"answer": answer, "sources": sources}
+        # 캐시에는 sources를 항상 함께 저장 (return_sources 여부와 무관하게 재사용)
+        sources = format_sources(source_docs)
+        if not had_history:
+            answer_cache.store(request.query, mode_key, request.top_k, answer, sources)
+
+        return {"answer": answer, "sources": sources if request.return_sources else []}
 
     except Exception as e:
         print(f"❌ 에러 발생: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+# ✅ SSE 프레임 (event: <이름> / data: <JSON>)
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _vector_only_stream(request: QueryRequest, chat_history: list, filters: dict):
+    start = time.perf_counter()
+    source_docs = retrieve_documents(request.query, k=request.top_k, VECTOR_DB_DIR=VECTOR_DB_DIR, filters=filters)
+    yield {"event": "vector_sources", "sources": source_docs, "elapsed_ms": round((time.perf_counter() - start) * 1000)}
+
+    chunks, ttft_ms = [], None
+    for chunk in stream_answer_from_documents(request.query, source_docs, chat_history):
+        if ttft_ms is None:
+            ttft_ms = round((time.perf_counter() - start) * 1000)
+        chunks.append(chunk)
+        yield {"event": "token", "data": chunk}
+
+    total_ms = round((time.perf_counter() - start) * 1000)
+    yield {"event": "done", "answer": "".join(chunks), "sources": source_docs, "ttft_ms": ttft_ms, "total_ms": total_ms}
+
+
+# ✅ 스트리밍 엔드포인트 (Server-Sent Events)
+# - token 이벤트: 모델이 생성하는 즉시 한 조각씩 전달
+# - graph_done / vector_sources: 중간 단계 진행 상황
+# - done: 전체 답변 + sources + 지연 시간 (ttft_ms, total_ms)
+@router.post("/query/stream")
+def query_stream_endpoint(request: QueryRequest):
+    print(f"📥 받은 쿼리 (stream): {request.query}")
+    print(f"🧩 QA 모드: {request.mode}")
+    filters = request_filters(request)
+    mode_key = cache_mode(request, filters)
+
+    chat_history = conversation_store.history(request.session_id)
+    had_history = bool(chat_history)
+    cached = answer_cache.lookup(request.query, mode_key, request.top_k) if not had_history else None
+    if cached is not None:
+        print("⚡ 답변 캐시 hit")
+        events = iter([
+            {"event": "token", "data": cached["answer"]},
+            {"event": "done", "answer": cached["answer"], "sources": cached["sources"], "cached": True},
+        ])
+    elif request.mode == "vector-only":
+        events = _vector_only_stream(request, chat_history, filters)
+    else:  # hybrid (기본)
+        events = hybrid_qa_stream(
+            question=request.query,
+            k=request.top_k,
+            vector_db_dir=VECTOR_DB_DIR,
+            chat_history=chat_history,
+            filters=filters
+        )
+
+    def event_stream():
+        try:
+            for event in events:
+                name = event.pop("event")
+                if name == "vector_sources":
+                    event["sources"] = format_sources(event["sources"]) if request.return_sources else []
+                elif name == "done" and event.get("cached"):
+                    conversation_store.append(request.session_id, request.query, event["answer"])
+                    event["sources"] = event["sources"] if request.return_sources else []
+                elif name == "done":
+                    record_latency(event["ttft_ms"], event["total_ms"])
+                    conversation_store.append(request.session_id, request.query, event["answer"])
+                    sources = format_sources(event["sources"])
+                    if not had_history:
+                        answer_cache.store(request.query, mode_key, request.top_k, event["answer"], sources)
+                    event["sources"] = sources if request.return_sources else []
+                yield sse_event(name, event)
+        except Exception as e:
+            print(f"❌ 스트리밍 중 에러 발생: {e}")
+            yield sse_event("error", {"detail": "Internal Server Error"})
+
+    # 프록시 (nginx 등) 버퍼링을 끄지 않으면 토큰이 모여서 한꺼번에 전달됨
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ✅ 캐시 통계 (hit rate, 절약된 LLM 시간) + 스트리밍 지연 시간 + context 압축 전 / 후 토큰 수
+@router.get("/query/stats")
+def query_stats():
+    return {
+        "cypher_cache": cypher_cache.stats(),
+        "graph_result_cache": result_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "conversations": conversation_store.stats(),
+        "query_router": query_router.stats(),
+        "embedding_cache": open_cache().stats(),
+        "stream_latency": latency_stats(),
+        "prompt_tokens": packing_stats(),
+    }
+
+
 # ✅ 로컬 테스트용
 if __name__ == "__main__":
     import uvicorn
@@ -1,6 +1,8 @@
 import sys
 import os
 import json
+import shutil
+import tempfile
 from fastapi import APIRouter, UploadFile, File
 from pathlib import Path
 from dotenv import load_dotenv
@@ -11,7 +13,10 @@ from utils.pdf_parser import process_pdf
 from utils.metadata_fetcher import enrich_metadata_with_fallback
 from vectorstore.build_vector_db import build_vector_db
 from utils.relation_fetcher import convert_to_enriched_metadata
-from graphdb.graph_builder import GraphBuilder  # ✅ 클래스 직접 import
+from utils.paper_registry import register_paper, paper_dir
+from graphdb.graph_schema import citing_work_id
+from graphdb.graph_builder import GraphBuilder, get_shared_driver  # ✅ 클래스 직접 import
+from graphdb.local_graph import LocalGraphBuilder
 
 load_dotenv()
 router = APIRouter()
@@ -32,54 +37,70 @@ async def upload_pdf(file: UploadFile = File(...)):
     print(f"✅ PDF 저장 완료: {pdf_path}")
 
     # 2. PDF 파싱 및 메타데이터 경로 설정
+    # ✅ 업로드마다 별도 staging 디렉토리 사용 (공용 파일을 쓰면 다른 논문의 결과가 섞임)
     metadata_dir = "utils/metadata"
     os.makedirs(metadata_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix="upload_", dir=metadata_dir)
 
-    base_metadata_path = os.path.join(metadata_dir, f"{base_filename}_metadata.json")
-    integrated_metadata_path = os.path.join(metadata_dir, "integrated_metadata.json")
-    enriched_metadata_path = os.path.join(metadata_dir, "enriched_metadata.json")
+    base_metadata_path = os.path.join(staging_dir, f"{base_filename}_metadata.json")
+    staged_integrated_path = os.path.join(staging_dir, "integrated_metadata.json")
 
     # 3. PDF 파싱 및 메타데이터 추출
     process_pdf(pdf_path, base_metadata_path)
 
     enrich_metadata_with_fallback(
         base_metadata_path,
-        integrated_metadata_path,
+        staged_integrated_path,
         cache_dir=os.path.join(metadata_dir, '.cache')
     )
 
-    # 4. triple 관계 추출
+    # ✅ 4. 논문 디렉토리 (paper_id 기준) 로 옮긴 뒤 그 안에서 triple 관계 추출
+    with open(staged_integrated_path, "r", encoding="utf-8") as f:
+        target_dir = paper_dir(citing_work_id(json.load(f)))
+    os.makedirs(target_dir, exist_ok=True)
+    integrated_metadata_path = os.path.join(target_dir, "integrated_metadata.json")
+    enriched_metadata_path = os.path.join(target_dir, "enriched_metadata.json")
+    shutil.move(staged_integrated_path, integrated_metadata_path)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    # 같은 논문을 다시 올린 경우 이전 triple은 버리고 새 메타데이터로 다시 추출
+    if os.path.exists(enriched_metadata_path):
+        os.remove(enriched_metadata_path)
     convert_to_enriched_metadata(
         integrated_path=integrated_metadata_path,
         enriched_path=enriched_metadata_path
     )
 
-    # 5. Vector DB 구축
+    # ✅ 5. 논문 등록 (논문별 디렉토리에 메타데이터 보관 → 다음 업로드가 덮어쓰지 않음)
+    paper = register_paper(integrated_metadata_path, enriched_metadata_path, pdf_filename=pdf_filename)
+
+    # 6. Vector DB 반영 (공용 컬렉션, 이 논문의 paper_id 문서만 증분 갱신)
     build_vector_db(
-        integrated_metadata_path,
+        paper["metadata_path"],
         os.path.join(metadata_dir, "chroma_db")
     )
 
-    # ✅ 6. Graph DB 구축
+    # ✅ 7. Graph DB 구축
     with open(enriched_metadata_path, "r", encoding="utf-8") as f:
         metadata = json.load(f)
 
     print(f"\n📦 총 triple 수: {len(metadata.get('triples', []))}\n")
     
-    graph = GraphBuilder(
-        uri=os.getenv("NEO4J_URI"),
-        user=os.getenv("NEO4J_USERNAME"),
-        password=os.getenv("NEO4J_PASSWORD")
-    )
+    if os.getenv("GRAPH_BACKEND", "neo4j") == "local":
+        graph = LocalGraphBuilder()
+    else:
+        graph = GraphBuilder(driver=get_shared_driver())
     graph.insert_triples_with_metadata(metadata)
+    graph.close()
 
     print("✅ GraphDB triple 삽입 완료")
 
-    # 7. 응답 반환
-    with open(integrated_metadata_path, "r", encoding="utf-8") as f:
+    # 8. 응답 반환
+    with open(paper["metadata_path"], "r", encoding="utf-8") as f:
         data = json.load(f)
 
     return {
+        "paper_id": paper["paper_id"],
         "title": data.get("title"),
         "abstract_original": data.get("abstract_original"),
         "abstract_llm": data.get("abstract_llm"),
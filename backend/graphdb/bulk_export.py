@@ -0,0 +1,277 @@
+# bulk_export.py
+# 여러 논문의 enriched_metadata.json → Neo4j bulk import용 노드/관계 CSV
+# - 오프라인: neo4j-admin database import full 로 적재
+# - 온라인 fallback: 배치 UNWIND (또는 서버에서 접근 가능한 CSV URL이 있으면 LOAD CSV)
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+
+from graphdb.graph_schema import (
+    cited_work_id,
+    citing_work_id,
+    iter_reference_triples,
+    reference_properties,
+    to_relation_type,
+)
+
+load_dotenv()
+
+NODE_FIELDS = [
+    "work_id:ID(Paper)", "title", "abstract_original", "abstract_llm", "ref_abstract",
+    "authors:string[]", "year:int", "citation_count:int", "citation_contexts", ":LABEL",
+]
+REL_FIELDS = [":START_ID(Paper)", ":END_ID(Paper)", ":TYPE", "ref_number:int"]
+ARRAY_DELIMITER = ";"
+
+
+def find_enriched_metadata(metadata_dir: str) -> list:
+    """디렉토리 하위의 모든 *enriched_metadata.json 경로"""
+    return sorted(str(p) for p in Path(metadata_dir).rglob("*enriched_metadata.json"))
+
+
+def _merge_props(node: dict, props: dict):
+    # 여러 논문에서 등장한 노드는 비어있지 않은 값을 우선 유지
+    for key, value in props.items():
+        if value not in ("", None, [], 0) or key not in node:
+            node[key] = value
+
+
+def export_bulk_csv(metadata_dir: str, out_dir: str) -> dict:
+    """
+    - metadata_dir 하위의 enriched_metadata.json 전체를 읽어 노드/관계를 논문 간 중복 제거
+    - out_dir/papers.csv, out_dir/relationships.csv 생성
+    - 처리 통계 (파일 수, 노드 수, 관계 수, rows/sec) 반환
+    """
+    start = time.perf_counter()
+    paths = find_enriched_metadata(metadata_dir)
+    print(f"📂 enriched metadata {len(paths)}개 발견 → {metadata_dir}")
+
+    nodes = {}
+    # (src, tgt, 관계 타입) → ref_number: 온라인 적재의 MERGE + SET 과 같이 같은 관계는 한 행, 마지막 ref_number 유지
+    relationships = {}
+
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+        src_id = citing_work_id(metadata)
+        _merge_props(nodes.setdefault(src_id, {}), {
+            "title": metadata.get("title", ""),
+            "abstract_original": metadata.get("abstract_original", ""),
+            "abstract_llm": metadata.get("abstract_llm", ""),
+        })
+
+        for rel, ref_number, tgt_title, ref_info in iter_reference_triples(metadata):
+            tgt_id = cited_work_id(tgt_title, ref_info)
+            _merge_props(nodes.setdefault(tgt_id, {}), {"title": tgt_title, **reference_properties(ref_info)})
+            relationships[(src_id, tgt_id, to_relation_type(rel))] = ref_number if ref_number is not None else ""
+
+    os.makedirs(out_dir, exist_ok=True)
+    nodes_path = os.path.join(out_dir, "papers.csv")
+    rels_path = os.path.join(out_dir, "relationships.csv")
+
+    with open(nodes_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(NODE_FIELDS)
+        for work_id, props in nodes.items():
+            authors = props.get("authors") or []
+            if not isinstance(authors, list):
+                authors = [a.strip() for a in str(authors).split(",") if a.strip()]
+            writer.writerow([
+                work_id,
+                props.get("title", ""),
+                props.get("abstract_original", ""),
+                props.get("abstract_llm", ""),
+                props.get("ref_abstract", ""),
+                ARRAY_DELIMITER.join(a.replace(ARRAY_DELIMITER, ",") for a in authors),
+                props.get("year") or "",
+                props.get("citation_count") or "",
+                props.get("citation_contexts", ""),
+                "Paper",
+            ])
+
+    with open(rels_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(REL_FIELDS)
+        for (src, tgt, rel_type), ref_number in sorted(relationships.items()):
+            writer.writerow([src, tgt, rel_type, ref_number])
+
+    elapsed = time.perf_counter() - start
+    rows = len(nodes) + len(relationships)
+    stats = {
+        "files": len(paths),
+        "nodes": len(nodes),
+        "relationships": len(relationships),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else None,
+    }
+    print(f"✅ CSV export 완료 → {nodes_path}, {rels_path}")
+    print(f"   노드 {stats['nodes']}개, 관계 {stats['relationships']}개, {stats['rows_per_sec']} rows/sec")
+    print(
+        "   오프라인 적재: neo4j-admin database import full "
+        f"--nodes={nodes_path} --relationships={rels_path} --array-delimiter='{ARRAY_DELIMITER}'"
+    )
+    return stats
+
+
+# ============================== #
+#        온라인 fallback 적재     #
+# ============================== #
+
+def _iter_batches(csv_path: str, batch_size: int):
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        batch = []
+        for row in csv.DictReader(f):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _node_row(row: dict) -> dict:
+    return {
+        "work_id": row["work_id:ID(Paper)"],
+        "props": {
+            "title": row["title"],
+            "abstract_original": row["abstract_original"],
+            "abstract_llm": row["abstract_llm"],
+            "ref_abstract": row["ref_abstract"],
+            "authors": [a for a in row["authors:string[]"].split(ARRAY_DELIMITER) if a],
+            "year": int(row["year:int"] or 0),
+            "citation_count": int(row["citation_count:int"] or 0),
+            "citation_contexts": row["citation_contexts"],
+        },
+    }
+
+
+def import_csv_online(
+    nodes_csv: str,
+    rels_csv: str,
+    uri: str,
+    user: str,
+    password: str,
+    batch_size: int = 1000,
+    csv_base_url: str = None,
+) -> dict:
+    """
+    실행 중인 Neo4j에 CSV를 배치 단위로 적재 (triple 당 트랜잭션 대신 batch_size 행 당 1 트랜잭션)
+    - csv_base_url이 주어지면 서버가 직접 읽는 LOAD CSV ... IN TRANSACTIONS 사용
+    - 아니면 클라이언트가 CSV를 스트리밍하며 UNWIND $rows 로 전송
+    """
+    from neo4j import GraphDatabase
+
+    start = time.perf_counter()
+    node_rows = rel_rows = 0
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+
+    with driver.session() as session:
+        session.run("CREATE CONSTRAINT paper_work_id IF NOT EXISTS FOR (p:Paper) REQUIRE p.work_id IS UNIQUE")
+
+        if csv_base_url:
+            base = csv_base_url.rstrip("/")
+            session.run(f"""
+                LOAD CSV WITH HEADERS FROM '{base}/{os.path.basename(nodes_csv)}' AS row
+                CALL {{
+                    WITH row
+                    MERGE (p:Paper {{work_id: row.`work_id:ID(Paper)`}})
+                    SET p.title = row.title,
+                        p.abstract_original = row.abstract_original,
+                        p.abstract_llm = row.abstract_llm,
+                        p.ref_abstract = row.ref_abstract,
+                        p.authors = split(row.`authors:string[]`, '{ARRAY_DELIMITER}'),
+                        p.year = toInteger(row.`year:int`),
+                        p.citation_count = toInteger(row.`citation_count:int`),
+                        p.citation_contexts = row.citation_contexts
+                }} IN TRANSACTIONS OF {int(batch_size)} ROWS
+            """).consume()
+            # 관계 타입은 파라미터화할 수 없으므로 타입별로 실행
+            rel_types = {row[":TYPE"] for batch in _iter_batches(rels_csv, batch_size) for row in batch}
+            for rel_type in sorted(rel_types):
+                session.run(f"""
+                    LOAD CSV WITH HEADERS FROM '{base}/{os.path.basename(rels_csv)}' AS row
+                    CALL {{
+                        WITH row
+                        WITH row WHERE row.`:TYPE` = '{rel_type}'
+                        MATCH (a:Paper {{work_id: row.`:START_ID(Paper)`}})
+                        MATCH (b:Paper {{work_id: row.`:END_ID(Paper)`}})
+                        MERGE (a)-[r:{rel_type}]->(b)
+                        SET r.ref_number = toInteger(row.`ref_number:int`)
+                    }} IN TRANSACTIONS OF {int(batch_size)} ROWS
+                """).consume()
+            node_rows = sum(len(b) for b in _iter_batches(nodes_csv, batch_size))
+            rel_rows = sum(len(b) for b in _iter_batches(rels_csv, batch_size))
+        else:
+            for batch in _iter_batches(nodes_csv, batch_size):
+                session.execute_write(lambda tx, rows: tx.run("""
+                    UNWIND $rows AS row
+                    MERGE (p:Paper {work_id: row.work_id})
+                    SET p += row.props
+                """, rows=rows).consume(), [_node_row(r) for r in batch])
+                node_rows += len(batch)
+
+            for batch in _iter_batches(rels_csv, batch_size):
+                by_type = {}
+                for row in batch:
+                    by_type.setdefault(row[":TYPE"], []).append({
+                        "src": row[":START_ID(Paper)"],
+                        "tgt": row[":END_ID(Paper)"],
+                        "ref_number": int(row["ref_number:int"]) if row["ref_number:int"] else None,
+                    })
+                for rel_type, rows in by_type.items():
+                    session.execute_write(lambda tx, rows: tx.run(f"""
+                        UNWIND $rows AS row
+                        MATCH (a:Paper {{work_id: row.src}})
+                        MATCH (b:Paper {{work_id: row.tgt}})
+                        MERGE (a)-[r:{rel_type}]->(b)
+                        SET r.ref_number = row.ref_number
+                    """, rows=rows).consume(), rows)
+                rel_rows += len(batch)
+
+    driver.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "nodes": node_rows,
+        "relationships": rel_rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round((node_rows + rel_rows) / elapsed, 1) if elapsed > 0 else None,
+    }
+    print(f"✅ 온라인 적재 완료: 노드 {node_rows}개, 관계 {rel_rows}개, {stats['rows_per_sec']} rows/sec")
+    return stats
+
+
+# 실행 예시
+if __name__ == "__main__":
+    default_dir = Path(__file__).resolve().parent.parent / "utils/metadata"
+
+    parser = argparse.ArgumentParser(description="enriched_metadata.json → Neo4j bulk import CSV")
+    parser.add_argument("--metadata-dir", default=str(default_dir))
+    parser.add_argument("--out-dir", default=str(default_dir / "bulk_import"))
+    parser.add_argument("--online", action="store_true", help="export 후 NEO4J_URI로 배치 적재")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--csv-base-url", default=None, help="서버에서 접근 가능한 CSV 위치 (LOAD CSV 사용)")
+    args = parser.parse_args()
+
+    export_bulk_csv(args.metadata_dir, args.out_dir)
+
+    if args.online:
+        import_csv_online(
+            os.path.join(args.out_dir, "papers.csv"),
+            os.path.join(args.out_dir, "relationships.csv"),
+            uri=os.getenv("NEO4J_URI"),
+            user=os.getenv("NEO4J_USERNAME"),
+            password=os.getenv("NEO4J_PASSWORD"),
+            batch_size=args.batch_size,
+            csv_base_url=args.csv_base_url,
+        )
@@ -0,0 +1,139 @@
+# cypher_cache.py
+# 자연어 질문 → Cypher 번역 결과 캐시 (검증된 Cypher만 저장)
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_question(question: str) -> str:
+    """대소문자/유니코드/공백/끝 문장부호 차이를 제거한 질문"""
+    question = unicodedata.normalize("NFKC", question).lower().strip()
+    question = re.sub(r"\s+", " ", question)
+    return question.rstrip(" ?!.。？！")
+
+
+def history_digest(chat_history: list, turns: int = 2) -> str:
+    """Cypher 생성에 영향을 주는 최근 대화 (turns 왕복) 의 digest"""
+    recent = (chat_history or [])[-turns * 2:] if turns > 0 else []
+    payload = [[getattr(m, "type", ""), getattr(m, "content", str(m))] for m in recent]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def _cosine(a: list, b: list) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class CypherCache:
+    """
+    (정규화된 질문, 대화 히스토리 digest) → Cypher
+    - 정확히 일치하는 키를 먼저 조회하고, embed_fn이 있으면 같은 히스토리 digest 내에서
+      임베딩 유사도가 similarity_threshold 이상인 질문도 hit로 처리
+    - 생성 소요 시간을 함께 저장해 hit 시 절약된 시간을 누적
+    - path가 주어지면 JSON 파일로 영속화
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        embed_fn=None,
+        similarity_threshold: float = 0.92,
+        max_entries: int = 1000,
+        history_turns: int = 2,
+    ):
+        self.path = path
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.history_turns = history_turns
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = OrderedDict(json.load(f))
+
+    def _key(self, question: str, chat_history: list) -> tuple:
+        norm = normalize_question(question)
+        digest = history_digest(chat_history, self.history_turns)
+        return f"{digest}:{norm}", norm, digest
+
+    def lookup(self, question: str, chat_history: list = None):
+        """캐시된 Cypher (없으면 None)"""
+        key, norm, digest = self._key(question, chat_history)
+
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry["generation_seconds"]
+                return entry["cypher"]
+
+        if self.embed_fn is not None and self.similarity_threshold > 0:
+            query_vec = self.embed_fn(norm)
+            with self._lock:
+                best, best_score = None, self.similarity_threshold
+                for entry in self.entries.values():
+                    if entry["digest"] != digest or not entry.get("embedding"):
+                        continue
+                    score = _cosine(query_vec, entry["embedding"])
+                    if score >= best_score:
+                        best, best_score = entry, score
+                if best is not None:
+                    self.hits += 1
+                    self.semantic_hits += 1
+                    self.saved_seconds += best["generation_seconds"]
+                    print(f"♻️ 유사 질문 Cypher 재사용 (sim={best_score:.3f}): {best['question']}")
+                    return best["cypher"]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, question: str, chat_history: list, cypher: str, generation_seconds: float):
+        """실행 검증이 끝난 Cypher만 저장할 것"""
+        key, norm, digest = self._key(question, chat_history)
+        embedding = self.embed_fn(norm) if self.embed_fn is not None and self.similarity_threshold > 0 else None
+
+        with self._lock:
+            self.entries[key] = {
+                "question": norm,
+                "digest": digest,
+                "cypher": cypher,
+                "generation_seconds": round(generation_seconds, 4),
+                "embedding": list(embedding) if embedding is not None else None,
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
@@ -0,0 +1,97 @@
+# cypher_guard.py
+# LLM이 생성한 Cypher의 안전한 실행: 서버 측 트랜잭션 timeout, 행 수 제한, 토큰 예산 내 스트리밍
+
+import json
+import os
+import sys
+import time
+
+from neo4j import unit_of_work
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.token_counter import count_tokens, truncate_to_tokens
+
+GRAPH_QUERY_TIMEOUT = float(os.getenv("GRAPH_QUERY_TIMEOUT", "10"))
+GRAPH_QUERY_ROW_CAP = int(os.getenv("GRAPH_QUERY_ROW_CAP", "200"))
+GRAPH_CONTEXT_TOKEN_BUDGET = int(os.getenv("GRAPH_CONTEXT_TOKEN_BUDGET", "2000"))
+
+
+def _row_tokens(row: dict) -> int:
+    return count_tokens(json.dumps(row, ensure_ascii=False, default=str))
+
+
+def truncate_row(row: dict, token_budget: int):
+    """
+    한 행만으로 예산을 넘을 때 긴 값 (문자열 / 리스트) 부터 잘라 예산 안에 맞춘 사본
+    - 리스트 / dict 값은 JSON 문자열로 바꿔 자름, 맞출 수 없으면 None
+    """
+    row = dict(row)
+    for key in sorted(row, key=lambda k: -len(str(row[k]))):
+        over = _row_tokens(row) - token_budget
+        if over <= 0:
+            break
+        value = row[key]
+        if isinstance(value, (list, dict)):
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        if not isinstance(value, str):
+            continue
+        row[key] = truncate_to_tokens(value, max(0, count_tokens(value) - over - 1)) + "…"
+    return row if _row_tokens(row) <= token_budget else None
+
+
+def run_guarded_query(
+    driver,
+    cypher: str,
+    params: dict = None,
+    timeout: float = GRAPH_QUERY_TIMEOUT,
+    row_cap: int = GRAPH_QUERY_ROW_CAP,
+    token_budget: int = GRAPH_CONTEXT_TOKEN_BUDGET,
+    database: str = None,
+) -> list:
+    """
+    읽기 트랜잭션으로 Cypher 실행 후 결과를 스트리밍으로 수집
+    - timeout: 서버 측 트랜잭션 timeout (초), 초과 시 서버가 쿼리를 중단
+    - row_cap: 최대 행 수, token_budget: QA 프롬프트에 들어갈 결과의 최대 토큰 수
+    - 한도에 도달하면 나머지 결과는 가져오지 않고 버림
+    - 첫 행부터 토큰 예산을 넘으면 (긴 abstract 등) 빈 결과 대신 그 행의 긴 값을 잘라서 반환
+    """
+    start = time.perf_counter()
+    stats = {"rows": 0, "tokens": 0, "truncated_by": None}
+
+    @unit_of_work(timeout=timeout)
+    def _work(tx):
+        rows = []
+        result = tx.run(cypher, params or {})
+        for record in result:
+            if len(rows) >= row_cap:
+                stats["truncated_by"] = "row_cap"
+                break
+            row = record.data()
+            row_tokens = _row_tokens(row)
+            if stats["tokens"] + row_tokens > token_budget:
+                stats["truncated_by"] = "token_budget"
+                row = truncate_row(row, token_budget) if not rows else None
+                if row is not None:
+                    rows.append(row)
+                    stats["tokens"] += _row_tokens(row)
+                break
+            rows.append(row)
+            stats["tokens"] += row_tokens
+        stats["rows"] = len(rows)
+        return rows
+
+    try:
+        with driver.session(database=database) as session:
+            rows = session.execute_read(_work)
+    except Exception as e:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"❌ Cypher 실행 실패 ({elapsed_ms:.1f}ms, timeout={timeout}s): {e}")
+        raise
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if stats["truncated_by"]:
+        print(f"⚠️ Cypher 결과 잘림 ({stats['truncated_by']}, rows={stats['rows']}, tokens={stats['tokens']}, "
+              f"{elapsed_ms:.1f}ms): {' '.join(cypher.split())}")
+    print(f"⏱️ Cypher 실행 {elapsed_ms:.1f}ms (rows={stats['rows']}, tokens={stats['tokens']})")
+    return rows
@@ -1,87 +1,145 @@
 from neo4j import GraphDatabase
 import json
 from pathlib import Path
-import re
 import os
+import sys
+import threading
 
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from graphdb.graph_schema import (
+    to_relation_type,
+    reference_properties,
+    iter_reference_triples,
+    citing_work_id,
+    cited_work_id,
+)
+from utils.versioning import bump_version
+
 load_dotenv()
 
+NEO4J_POOL_SIZE = int(os.getenv("NEO4J_POOL_SIZE", "50"))
+
+_shared_driver = None
+_shared_driver_lock = threading.Lock()
+
+
+def get_shared_driver():
+    """
+    프로세스 전역 Neo4j driver (connection pool 내장, thread-safe)
+    - 요청마다 driver를 새로 만들지 않고 재사용
+    """
+    global _shared_driver
+    with _shared_driver_lock:
+        if _shared_driver is None:
+            _shared_driver = GraphDatabase.driver(
+                os.getenv("NEO4J_URI"),
+                auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD")),
+                max_connection_pool_size=NEO4J_POOL_SIZE,
+            )
+        return _shared_driver
+
+
 class GraphBuilder:
-    def __init__(self, uri: str, user: str, password: str):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri: str = None, user: str = None, password: str = None, driver=None):
+        # driver를 넘기면 공유 driver 사용 (close 시 닫지 않음)
+        self._owns_driver = driver is None
+        self.driver = driver or GraphDatabase.driver(uri, auth=(user, password))
 
     def close(self):
-        self.driver.close()
+        if self._owns_driver:
+            self.driver.close()
+
+    def ensure_schema(self):
+        # work_id 유일성 제약 (MERGE가 인덱스 조회로 동작)
+        with self.driver.session() as session:
+            session.run("CREATE CONSTRAINT paper_work_id IF NOT EXISTS FOR (p:Paper) REQUIRE p.work_id IS UNIQUE")
 
     def insert_triples_with_metadata(self, metadata):
         title = metadata.get("title", "")
         abstract_orig = metadata.get("abstract_original", "")
         abstract_llm = metadata.get("abstract_llm", "")
-        references = metadata.get("references", [])
-        triples = metadata.get("triples", [])
+        src_id = citing_work_id(metadata)
 
-        # reference 딕셔너리 생성
-        ref_map = {ref["ref_title"]: ref for ref in references}
+        self.ensure_schema()
 
         with self.driver.session() as session:
-            for i, (src, rel, tgt) in enumerate(triples):
+            for i, (rel, ref_number, tgt_title, ref_info) in enumerate(iter_reference_triples(metadata)):
                 print(f"[{i+1:03}] Inserting triple:")
-                print(f"     🔹 Source : {src}")
+                print(f"     🔹 Source : {title}")
                 print(f"     🔸 Relation : {rel}")
-                print(f"     🔹 Target : {tgt}\n")
+                print(f"     🔹 Target : [{ref_number}] {tgt_title}\n")
 
                 # 대상 논문의 메타데이터 추출
-                clean_tgt_title = re.sub(r"^\[\d+\]\s*", "", tgt)
-                ref_info = ref_map.get(clean_tgt_title, {})
-
-                ref_abstract = ref_info.get("abstract", "")
-                ref_authors = ref_info.get("authors", "")
-
-                # 연도와 인용수는 정수형으로 변환 시도
-                try:
-                    ref_year = int(ref_info.get("year", 0))
-                except (ValueError, TypeError):
-                    ref_year = 0
-
-                try:
-                    ref_citations = int(ref_info.get("citation_count", 0))
-                except (ValueError, TypeError):
-                    ref_citations = 0
-
-                # citation_contexts를 문자열로 병합
-                ref_citation_contexts_raw = ref_info.get("citation_contexts", [])
-                if isinstance(ref_citation_contexts_raw, list):
-                    ref_citation_contexts = " || ".join(ref_citation_contexts_raw)
-                else:
-                    ref_citation_contexts = str(ref_citation_contexts_raw)
+                ref_props = reference_properties(ref_info)
 
                 session.run(f"""
-                    MERGE (a:Paper {{title: $src}})
-                    SET a.abstract_original = $abstract_orig,
+                    MERGE (a:Paper {{work_id: $src_id}})
+                    SET a.title = $src,
+                        a.abstract_original = $abstract_orig,
                         a.abstract_llm = $abstract_llm
 
-                    MERGE (b:Paper {{title: $tgt}})
-                    SET b.ref_abstract = $ref_abstract,
+                    MERGE (b:Paper {{work_id: $tgt_id}})
+                    SET b.title = $tgt,
+                        b.ref_abstract = $ref_abstract,
                         b.authors = $ref_authors,
                         b.year = $ref_year,
                         b.citation_count = $ref_citations,
                         b.citation_contexts = $ref_citation_contexts
 
-                    MERGE (a)-[:{rel.replace(" ", "_").upper()}]->(b)
+                    MERGE (a)-[r:{to_relation_type(rel)}]->(b)
+                    SET r.ref_number = $ref_number
                 """, {
-                    "src": src,
-                    "tgt": tgt,
+                    "src_id": src_id,
+                    "src": title,
+                    "tgt_id": cited_work_id(tgt_title, ref_info),
+                    "tgt": tgt_title,
+                    "ref_number": ref_number,
                     "abstract_orig": abstract_orig,
                     "abstract_llm": abstract_llm,
-                    "ref_abstract": ref_abstract,
-                    "ref_authors": ref_authors,
-                    "ref_year": ref_year,
-                    "ref_citations": ref_citations,
-                    "ref_citation_contexts": ref_citation_contexts
+                    "ref_abstract": ref_props["ref_abstract"],
+                    "ref_authors": ref_props["authors"],
+                    "ref_year": ref_props["year"],
+                    "ref_citations": ref_props["citation_count"],
+                    "ref_citation_contexts": ref_props["citation_contexts"]
                 })
 
+        # ✅ 그래프 쓰기 버전 갱신 (QA 쪽 스키마 / 캐시 무효화 기준)
+        bump_version("graph")
+
+    def remove_paper(self, paper_id: str) -> int:
+        """
+        업로드 논문 (paper_id = citing work_id) 의 인용 관계 삭제
+        - 다른 논문과 연결이 남지 않은 reference 노드도 삭제
+        - 논문 노드는 다른 논문이 인용하고 있으면 abstract 속성만 지우고 유지
+        - 반환: 삭제한 관계 수 (삭제가 있었을 때만 graph 버전 증가)
+        """
+        with self.driver.session() as session:
+            summary = session.run("""
+                MATCH (a:Paper {work_id: $paper_id})-[r]->(b)
+                DELETE r
+                WITH DISTINCT b
+                WHERE NOT (b)--()
+                DELETE b
+            """, {"paper_id": paper_id}).consume()
+            removed = summary.counters.relationships_deleted
+            session.run("""
+                MATCH (a:Paper {work_id: $paper_id})
+                WHERE NOT ()-->(a)
+                DELETE a
+            """, {"paper_id": paper_id})
+            session.run("""
+                MATCH (a:Paper {work_id: $paper_id})
+                REMOVE a.abstract_original, a.abstract_llm
+            """, {"paper_id": paper_id})
+
+        if removed:
+            bump_version("graph")
+        print(f"🗑️ GraphDB에서 {paper_id} 관계 {removed}개 삭제")
+        return removed
+
 
 def insert_triples_to_graph(enriched_metadata_path: str):
     with open(enriched_metadata_path, "r", encoding="utf-8") as f:
@@ -0,0 +1,202 @@
+# graph_intents.py
+# 자주 묻는 그래프 질문 형태 → 파라미터화된 Cypher 템플릿 (LLM Cypher 생성 생략)
+
+import json
+import os
+import re
+
+# ✅ 관계 타입별 키워드 (영문은 어간 일치)
+RELATION_KEYWORDS = {
+    "HAS_BACKGROUND_ON": ["background", "배경"],
+    "USE_METHOD_OF": ["method", "technique", "방법", "기법", "기술"],
+    "IS_MOTIVATED_BY": ["motivat", "inspir", "동기", "영감"],
+    "COMPARES_OR_CONTRASTS_WITH": ["compar", "contrast", "비교"],
+    "EXTENDS_IDEA_OF": ["extend", "build upon", "builds on", "확장"],
+}
+COUNT_KEYWORDS = ["how many", "count", "number of", "categor", "몇 개", "몇개", "개수", "유형별"]
+# 개수 질문이 그래프 질문인지 판단하는 대상 단서 ("How many layers ..." 같은 내용 질문 제외)
+COUNT_TARGETS = [
+    "reference", "cite", "cited", "citation", "relation", "categor", "type",
+    "레퍼런스", "참조", "참고문헌", "인용", "유형", "관계",
+]
+MOST_CITED_KEYWORDS = ["most cited", "most-cited", "highest citation", "가장 많이 인용", "인용수가 가장"]
+# 관계 키워드와 함께 쓰이는 넓은 참조 단서 (query_router의 자유 형식 관계 질문 판정용)
+REFERENCE_CUES = [
+    "reference", "paper", "cite", "model", "used", "uses",
+    "논문", "레퍼런스", "참조", "참고", "인용", "모델", "사용",
+]
+
+# 관계 키워드 질문이 reference 목록 질문인지 판단하는 단서
+# ("What technique does this paper use for ..." 같은 내용 질문 제외, 복수형 / 목록 표현만)
+LIST_CUES = [
+    "reference", "cite", "cited", "citing", "papers", "works", "all the", "list",
+    "레퍼런스", "참조", "참고", "인용", "논문들", "어떤 논문", "목록",
+]
+
+AUTHOR_PATTERNS = [
+    r"authors? of (?:the )?(?:paper )?(.+)",
+    r"who (?:wrote|authored) (?:the )?(?:paper )?(.+)",
+    r"(.+?)\s*(?:논문)?의 저자",
+    r"(.+?)\s*(?:논문)?(?:을|를)? 쓴 사람",
+]
+
+DEFAULT_LIMIT = 50
+
+# ✅ 키워드 / 패턴을 작성할 때 확인한 tuning 예시 (held-out 평가 세트와 겹치지 않아야 함)
+INTENT_EXAMPLES = [
+    {"question": "Attention is all you need 논문에서 참조하는 레퍼런스들을, 참조 유형별로 몇개씩 있는지도 각각 알려줄래?",
+     "intent": "relation_counts"},
+    {"question": "Who wrote the most cited paper?", "intent": "most_cited"},
+    {"question": "who is the author of layer normalization?", "intent": "authors_of", "title": "layer normalization"},
+    {"question": "Reply all the techniques used in the transformer paper. I want to study those.",
+     "intent": "references_by_relation", "relation": "USE_METHOD_OF"},
+    {"question": "what model does do transformer model compare with?", "intent": None},
+    {"question": "transformer 논문에 대해 설명해줘", "intent": None},
+    {"question": "How many layers does the Transformer encoder have?", "intent": None},
+    {"question": "What technique does this paper use for positional encoding?", "intent": None},
+]
+# ✅ 템플릿 적중률 평가 세트 (키워드 / 패턴 작성에 쓰지 않은 held-out 질문)
+INTENT_EVAL_PATH = os.path.join(os.path.dirname(__file__), "intent_questions_heldout.json")
+
+CYPHER_TEMPLATES = {
+    "relation_counts": """
+        MATCH (a:Paper)-[r]->(:Paper)
+        WHERE $source IS NULL OR a.work_id = $source
+        RETURN type(r) AS relation, count(*) AS count
+        ORDER BY count DESC
+    """,
+    "most_cited": """
+        MATCH (:Paper)-[r]->(b:Paper)
+        WHERE ($relation IS NULL OR type(r) = $relation) AND b.citation_count IS NOT NULL
+        RETURN DISTINCT b.title AS title, b.authors AS authors, b.year AS year, b.citation_count AS citation_count
+        ORDER BY citation_count DESC
+        LIMIT $limit
+    """,
+    "authors_of": """
+        MATCH (b:Paper)
+        WHERE toLower(b.title) CONTAINS $title AND b.authors IS NOT NULL
+        RETURN b.title AS title, b.authors AS authors, b.year AS year
+        ORDER BY b.citation_count DESC
+        LIMIT $limit
+    """,
+    "references_by_relation": """
+        MATCH (a:Paper)-[r]->(b:Paper)
+        WHERE type(r) = $relation AND ($source IS NULL OR a.work_id = $source)
+        RETURN b.title AS title, b.year AS year, b.citation_count AS citation_count, r.ref_number AS ref_number
+        ORDER BY citation_count DESC
+        LIMIT $limit
+    """,
+}
+
+
+def has_cue(question: str, cues: list) -> bool:
+    """
+    단서 포함 여부 (소문자 질문 기준)
+    - 영문 단서는 단어 시작 경계에서만 일치 (어간 일치는 유지: compar → compare / comparison)
+    - 한글 단서는 조사가 붙으므로 부분 일치
+    """
+    for cue in cues:
+        if cue.isascii():
+            if re.search(rf"\b{re.escape(cue)}", question):
+                return True
+        elif cue in question:
+            return True
+    return False
+
+
+def match_relation(question: str):
+    for rel_type, keywords in RELATION_KEYWORDS.items():
+        if has_cue(question, keywords):
+            return rel_type
+    return None
+
+
+def _extract_title(question: str):
+    for pattern in AUTHOR_PATTERNS:
+        match = re.search(pattern, question)
+        if match:
+            title = match.group(1).strip(" \"'“”‘’?？.!")
+            if title and title not in ("it", "this", "that", "this paper", "이 논문", "그 논문"):
+                return title
+    return None
+
+
+def match_intent(question: str, source: str = None):
+    """
+    질문 → (intent 이름, Cypher 파라미터) / 일치하는 형태가 없으면 None
+    - relation_counts: 관계 유형별 reference 수 (개수 단서 + reference / 관계 단서가 함께 있을 때만)
+    - most_cited: 가장 많이 인용된 reference (관계 유형 한정 가능)
+    - authors_of: 특정 reference의 저자
+    - references_by_relation: 특정 관계 유형의 reference 목록 (관계 키워드 + 목록 단서)
+    - source: 인용하는 논문 work_id (주어지면 개수 / 목록을 그 논문의 관계로 한정)
+    """
+    q = re.sub(r"\s+", " ", question.lower()).strip()
+    relation = match_relation(q)
+
+    # "highest citation count" 처럼 개수 단서를 포함한 최다 인용 질문이 있으므로 most_cited를 먼저 판정
+    if has_cue(q, MOST_CITED_KEYWORDS):
+        return "most_cited", {"relation": relation, "limit": 1}
+
+    if has_cue(q, COUNT_KEYWORDS) and has_cue(q, COUNT_TARGETS):
+        return "relation_counts", {"source": source}
+
+    title = _extract_title(q)
+    if title:
+        return "authors_of", {"title": title, "limit": 5}
+
+    if relation is not None and has_cue(q, LIST_CUES):
+        return "references_by_relation", {"relation": relation, "source": source, "limit": DEFAULT_LIMIT}
+
+    return None
+
+
+def evaluate(path: str = INTENT_EVAL_PATH) -> dict:
+    """
+    labelled 질문 세트 ([{"question", "intent", "relation"?, "title"?}], 템플릿이 아닌 질문은 intent null) 평가
+    - hit_rate: 템플릿 질문 중 어떤 템플릿이든 일치한 비율 (LLM Cypher 생성 생략 비율)
+    - correct_rate: 템플릿 질문 중 intent와 라벨에 있는 파라미터 (relation / title) 까지 맞은 비율
+    - false_positive_rate: 템플릿이 아닌 질문이 템플릿에 일치한 비율 (잘못된 graph 답변)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        labelled = json.load(f)
+
+    template_questions = [item for item in labelled if item["intent"] is not None]
+    other_questions = [item for item in labelled if item["intent"] is None]
+    hits, correct, false_positives, mismatched = 0, 0, 0, []
+
+    for item in labelled:
+        matched = match_intent(item["question"])
+        expected = item["intent"]
+        if expected is None:
+            if matched is not None:
+                false_positives += 1
+                mismatched.append({"question": item["question"], "expected": None, "predicted": matched})
+            continue
+
+        hits += matched is not None
+        ok = matched is not None and matched[0] == expected and all(
+            matched[1].get(key) == item[key] for key in ("relation", "title") if key in item
+        )
+        if ok:
+            correct += 1
+        else:
+            mismatched.append({"question": item["question"], "expected": expected, "predicted": matched})
+
+    return {
+        "questions": len(labelled),
+        "template_questions": len(template_questions),
+        "hit_rate": round(hits / len(template_questions), 4) if template_questions else 0.0,
+        "correct_rate": round(correct / len(template_questions), 4) if template_questions else 0.0,
+        "false_positive_rate": round(false_positives / len(other_questions), 4) if other_questions else 0.0,
+        "mismatched": mismatched,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="그래프 템플릿 적중률 평가 (held-out 질문 세트)")
+    parser.add_argument("--path", default=INTENT_EVAL_PATH)
+    args = parser.parse_args()
+
+    print(json.dumps(evaluate(args.path), ensure_ascii=False, indent=2))
@@ -3,14 +3,34 @@ from langchain.chains import GraphCypherQAChain
 from langchain_core.prompts.chat import (
     ChatPromptTemplate, 
     SystemMessagePromptTemplate, 
-    HumanMessagePromptTemplate
+    HumanMessagePromptTemplate,
+    MessagesPlaceholder,
 )
 from langchain_openai import ChatOpenAI
-import os
+import os, re, sys, threading, time
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from graphdb.graph_schema import (
+    GRAPH_NO_RESULT_MSG,
+    GRAPH_NOT_RELATIONAL_MSG,
+    GRAPH_STATUS_NO_RESULT,
+    GRAPH_STATUS_NOT_RELATIONAL,
+    GRAPH_STATUS_OK,
+)
+from graphdb.cypher_cache import CypherCache
+from graphdb.graph_intents import CYPHER_TEMPLATES, match_intent
+from graphdb.cypher_guard import run_guarded_query
+from graphdb.result_cache import QueryResultCache
+from utils.paper_registry import find_paper_in_question
+from utils.versioning import get_version
+
 load_dotenv()
 
+# ✅ 그래프 백엔드 선택: "neo4j" (기본) | "local" (인메모리, NEO4J_URI 불필요)
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+
 # 1. System Prompt 정의
 system_prompt = (
     """You are a Cypher expert assistant for querying an academic paper graph database.
@@ -57,7 +77,7 @@ Just output the Cypher query directly.
 
 6. ⚠️ Exclude any results where essential properties (e.g., title, authors, citation_count) are NULL.
 
-7. ⚠️ Do **not** use `LIMIT` unless the user explicitly requests a specific number of results or says "top-k".
+7. ⚠️ When listing papers, always end the query with `LIMIT 50` (or the exact number the user asks for, e.g. "top-k"). Aggregations such as `count(*)` need no `LIMIT`.
 
 8. Do not include any natural language instructions, questions, or summaries in your output — return only the valid Cypher query.
 
@@ -79,8 +99,13 @@ Just output the Cypher query directly.
   (a)-[:EXTENDS_IDEA_OF]->(b): a extends, generalizes, or builds upon an idea from b.
 
   Properties:
+    - Every paper: `work_id` (unique key: DOI or normalized title + year), `title` (plain title, no "[n]" prefix)
     - Citing paper (`a`): `title`, `abstract_llm`, `abstract_original`
     - Cited paper (`b`): `title`, `year`, `authors`, `citation_count`, `ref_abstract`, `citation_contexts`
+    - Relationship (`r`): `ref_number` (reference number of `b` inside the citing paper `a`)
+
+  A cited paper is a single node shared by every paper that cites it, so co-citation and multi-hop
+  questions can be answered by traversal, e.g. (a1:Paper)-[]->(b:Paper)<-[]-(a2:Paper).
 
 === EXAMPLES ===
 ❗️Avoid using `title` for keyword matching. Use abstract-based fuzzy matching instead.
@@ -115,58 +140,194 @@ RETURN ...
 
 llm = ChatOpenAI(model="gpt-4", temperature=0)
 
-graph = Neo4jGraph(
-    url=os.getenv("NEO4J_URI"),
-    username=os.getenv("NEO4J_USERNAME"),
-    password=os.getenv("NEO4J_PASSWORD")
+if GRAPH_BACKEND == "local":
+    from graphdb.local_graph import run_local_graph_qa_with_status
+    graph = None
+else:
+    from graphdb.graph_builder import get_shared_driver
+
+    # ✅ 스키마는 import 시점이 아니라 그래프 쓰기 버전이 바뀔 때 GraphQAService가 갱신
+    # ✅ Neo4jGraph는 스키마 조회에만 쓰므로 자체 driver를 connection 1개로 제한
+    #    → Cypher 실행 (run_guarded_query) / 업로드는 프로세스 공용 pool driver (get_shared_driver) 사용
+    graph = Neo4jGraph(
+        url=os.getenv("NEO4J_URI"),
+        username=os.getenv("NEO4J_USERNAME"),
+        password=os.getenv("NEO4J_PASSWORD"),
+        refresh_schema=False,
+        driver_config={"max_connection_pool_size": 1},
+    )
+
+# ✅ NL → Cypher 번역 캐시
+# - CYPHER_CACHE_SIMILARITY > 0 이면 MiniLM 임베딩 유사도로 비슷한 표현의 질문도 재사용
+CYPHER_CACHE_PATH = os.path.join(os.path.dirname(__file__), "../utils/metadata/.cache/cypher_cache.json")
+CYPHER_CACHE_SIMILARITY = float(os.getenv("CYPHER_CACHE_SIMILARITY", "0"))
+
+
+def _embed_question(text: str) -> list:
+    from vectorstore.vector_qa import embeddings
+    return embeddings.embed_query(text)
+
+
+cypher_cache = CypherCache(
+    path=CYPHER_CACHE_PATH,
+    embed_fn=_embed_question if CYPHER_CACHE_SIMILARITY > 0 else None,
+    similarity_threshold=CYPHER_CACHE_SIMILARITY,
 )
 
 
-# ✅ 4. 실행 함수 정의
-def run_graph_rag_qa(query: str, chat_history: list = []) -> str:
+# ✅ Cypher 실행 결과 캐시 (graph 버전 변경 시 무효화)
+result_cache = QueryResultCache()
+
+
+def _extract_cypher(text: str) -> str:
+    # ```cypher ... ``` 블록이 있으면 내부만 사용
+    match = re.search(r"```(?:cypher)?(.*?)```", text, re.DOTALL | re.IGNORECASE)
+    return (match.group(1) if match else text).strip()
+
+
+def _generate_cypher(graph_chain: GraphCypherQAChain, query: str, chat_history: list) -> str:
+    generated = graph_chain.cypher_generation_chain.invoke(
+        {"query": query, "question": query, "schema": graph_chain.graph_schema, "chat_history": list(chat_history)}
+    )
+    if isinstance(generated, dict):
+        generated = generated.get("text", "")
+    return _extract_cypher(generated)
+
+
+def _answer_from_context(graph_chain: GraphCypherQAChain, query: str, context: list) -> str:
+    answer = graph_chain.qa_chain.invoke({"question": query, "context": context})
+    if isinstance(answer, dict):
+        answer = answer.get(graph_chain.qa_chain.output_key, "")
+    return answer.strip()
+
+
+# ✅ 4. 장기 실행 Graph QA 서비스
+class GraphQAService:
     """
-    chat_history를 반영한 Cypher 프롬프트 생성 + Graph QA 실행
+    프로세스 전역 Graph QA 서비스
+    - GraphCypherQAChain은 하나만 생성 (chat_history는 MessagesPlaceholder로 호출 시 전달 → 대화가 달라도 재사용)
+    - Neo4jGraph 하나를 스키마 조회용으로 공유 (자체 driver, connection 1개)
+    - Cypher 실행은 GraphBuilder와 같은 pool driver 사용
+    - 실행은 run_guarded_query 로 timeout / 행 수 / 토큰 예산을 강제
+    - 실행 결과는 graph 버전에 묶인 result_cache에 저장해 같은 쿼리는 DB를 거치지 않음
+    - 그래프 쓰기 버전이 바뀐 경우에만 스키마 갱신 (갱신 시 chain도 다시 생성)
     """
 
-    try:
-        # 1. system message
-        system_prompt_template = SystemMessagePromptTemplate.from_template(system_prompt)
-
-        # 2. 히스토리 반영 및 최종 프롬프트 구성
-        human_prompt_template = HumanMessagePromptTemplate.from_template("{query}")
-        chat_prompt = ChatPromptTemplate.from_messages(
-            [system_prompt_template] + chat_history + [human_prompt_template]
-        )
-
-        # 3. chain 생성 및 실행
-        graph_chain = GraphCypherQAChain.from_llm(
-            llm=llm,
-            graph=graph,
-            cypher_prompt=chat_prompt,
-            verbose=True,
-            return_intermediate_steps=True,
-            allow_dangerous_requests=True
-        )
-
-        result = graph_chain.invoke({"query": query})
-
-        # 4. Cypher 결과 확인
-        intermediate = result.get("intermediate_steps", [])
-        context_docs = intermediate[1].get("context", []) if len(intermediate) > 1 else []
+    def __init__(self, llm, graph, driver, system_prompt: str):
+        self.llm = llm
+        self.graph = graph
+        self.driver = driver
+        self.cypher_prompt = ChatPromptTemplate.from_messages([
+            SystemMessagePromptTemplate.from_template(system_prompt),
+            MessagesPlaceholder("chat_history", optional=True),
+            HumanMessagePromptTemplate.from_template("{query}"),
+        ])
+        self._chain = None
+        self._schema_version = None
+        self._lock = threading.Lock()
+
+    def refresh_schema_if_needed(self):
+        version = get_version("graph")
+        if version == self._schema_version:
+            return
+        with self._lock:
+            if version != self._schema_version:
+                print(f"🔄 그래프 스키마 갱신 (graph version {self._schema_version} → {version})")
+                self.graph.refresh_schema()
+                self._chain = None
+                self._schema_version = version
+
+    def get_chain(self) -> GraphCypherQAChain:
+        with self._lock:
+            if self._chain is None:
+                self._chain = GraphCypherQAChain.from_llm(
+                    llm=self.llm,
+                    graph=self.graph,
+                    cypher_prompt=self.cypher_prompt,
+                    verbose=True,
+                    return_intermediate_steps=True,
+                    allow_dangerous_requests=True
+                )
+            return self._chain
+
+    def execute(self, cypher: str, params: dict = None) -> list:
+        rows = result_cache.get(cypher, params)
+        if rows is None:
+            version = get_version("graph")  # 실행 전 버전으로 저장 (실행 중 그래프 쓰기가 있으면 다음 조회에서 무효화)
+            rows = run_guarded_query(self.driver, cypher, params)
+            result_cache.put(cypher, params, rows, version)
+        else:
+            print("♻️ 캐시된 Cypher 결과 사용")
+        return rows
+
+    def run(self, query: str, chat_history: list) -> tuple:
+        """(status, answer) 반환"""
+        self.refresh_schema_if_needed()
+        graph_chain = self.get_chain()
+
+        # 1. 자주 묻는 질문 형태는 템플릿 Cypher로 바로 실행 (DB 1회 + 답변 LLM 1회)
+        intent = match_intent(query, source=find_paper_in_question(query))
+        if intent is not None:
+            name, params = intent
+            template_docs = self.execute(CYPHER_TEMPLATES[name], params)
+            print(f"✅ template[{name}] context_docs:", template_docs)
+            if template_docs:
+                return GRAPH_STATUS_OK, _answer_from_context(graph_chain, query, template_docs)
+
+        # 2. Cypher 생성 (캐시 hit 시 LLM 호출 생략)
+        cypher = cypher_cache.lookup(query, chat_history)
+        generation_seconds = None
+        if cypher is None:
+            start = time.perf_counter()
+            cypher = _generate_cypher(graph_chain, query, chat_history)
+            generation_seconds = time.perf_counter() - start
+
+        print("✅ cypher:", cypher)
+
+        # 3. Cypher 실행 및 결과 확인
+        context_docs = self.execute(cypher)
 
         print("✅ context_docs:", context_docs)
 
         if not context_docs:
-            return "현재 구축된 그래프 DB에는 질문한 내용과 일치하는 결과가 없습니다. 다른 질문을 하거나 다른 모델 (벡터 DB 혹은 하이브리드 방식)을 이용해주세요."
+            return GRAPH_STATUS_NO_RESULT, GRAPH_NO_RESULT_MSG
 
-        return result.get("result", "").strip()
+        # ✅ 실행에 성공하고 결과가 있는 Cypher만 캐시에 저장
+        if generation_seconds is not None:
+            cypher_cache.store(query, chat_history, cypher, generation_seconds)
+        print("📊 cypher cache:", cypher_cache.stats())
+
+        return GRAPH_STATUS_OK, _answer_from_context(graph_chain, query, context_docs)
+
+
+graph_qa_service = GraphQAService(llm, graph, get_shared_driver(), system_prompt) if graph is not None else None
+
+
+# ✅ 5. 실행 함수 정의
+def run_graph_rag_qa(query: str, chat_history: list = None) -> str:
+    """
+    chat_history를 반영한 Cypher 프롬프트 생성 + Graph QA 실행
+    """
+    return run_graph_rag_qa_with_status(query, chat_history)[1]
+
+
+def run_graph_rag_qa_with_status(query: str, chat_history: list = None) -> tuple:
+    """
+    run_graph_rag_qa와 동일하나 (status, answer) 반환
+    - status: GRAPH_STATUS_OK | GRAPH_STATUS_NO_RESULT | GRAPH_STATUS_NOT_RELATIONAL
+    """
+    if GRAPH_BACKEND == "local":
+        return run_local_graph_qa_with_status(query, chat_history)
+
+    try:
+        return graph_qa_service.run(query, chat_history or [])
 
     except Exception as e:
         print("❌ 에러 발생:", e)
-        return "관계기반 질문이 아닙니다. 현재 질문으로 그래프 DB 조회를 할 수 없습니다. 다른 질문을 하거나 다른 모델 (벡터 DB 혹은 하이브리드 방식)을 이용해주세요."
+        return GRAPH_STATUS_NOT_RELATIONAL, GRAPH_NOT_RELATIONAL_MSG
 
     
-# 5. 예시 질의
+# 6. 예시 질의
 if __name__ == "__main__":
     # graphRAG로 답변 가능한 질문 예시 
     #question = "Attention is all you need 논문에서 참조하는 레퍼런스들을, 참조 유형별로 몇개씩 있는지도 각각 알려줄래?"
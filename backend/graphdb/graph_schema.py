@@ -0,0 +1,120 @@
+# graph_schema.py
+# Neo4j / 로컬 그래프 백엔드가 공유하는 스키마 정의 및 헬퍼
+
+import os
+import re
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.metadata_fetcher import normalize_title
+
+# ✅ relation_fetcher가 생성하는 관계 라벨 → 그래프 관계 타입
+RELATION_TYPES = [
+    "HAS_BACKGROUND_ON",
+    "USE_METHOD_OF",
+    "IS_MOTIVATED_BY",
+    "COMPARES_OR_CONTRASTS_WITH",
+    "EXTENDS_IDEA_OF",
+]
+
+# ✅ 그래프 QA fallback 메시지 (hybrid QA에서 실패 판정에 사용)
+GRAPH_NO_RESULT_MSG = "현재 구축된 그래프 DB에는 질문한 내용과 일치하는 결과가 없습니다. 다른 질문을 하거나 다른 모델 (벡터 DB 혹은 하이브리드 방식)을 이용해주세요."
+GRAPH_NOT_RELATIONAL_MSG = "관계기반 질문이 아닙니다. 현재 질문으로 그래프 DB 조회를 할 수 없습니다. 다른 질문을 하거나 다른 모델 (벡터 DB 혹은 하이브리드 방식)을 이용해주세요."
+
+# ✅ 그래프 QA 결과 상태 (문자열 비교 대신 사용)
+GRAPH_STATUS_OK = "ok"
+GRAPH_STATUS_NO_RESULT = "no_result"
+GRAPH_STATUS_NOT_RELATIONAL = "not_relational"
+
+
+def to_relation_type(relation: str) -> str:
+    """'use method of' → 'USE_METHOD_OF'"""
+    return relation.replace(" ", "_").upper()
+
+
+def reference_properties(ref_info: dict) -> dict:
+    """
+    reference 메타데이터 → cited 논문 노드 속성
+    - 연도와 인용수는 정수형으로 변환 (실패 시 0)
+    - citation_contexts는 ' || '로 병합한 문자열
+    """
+    try:
+        ref_year = int(ref_info.get("year", 0))
+    except (ValueError, TypeError):
+        ref_year = 0
+
+    try:
+        ref_citations = int(ref_info.get("citation_count", 0))
+    except (ValueError, TypeError):
+        ref_citations = 0
+
+    ref_citation_contexts_raw = ref_info.get("citation_contexts", [])
+    if isinstance(ref_citation_contexts_raw, list):
+        ref_citation_contexts = " || ".join(ref_citation_contexts_raw)
+    else:
+        ref_citation_contexts = str(ref_citation_contexts_raw)
+
+    return {
+        "ref_abstract": ref_info.get("abstract", ""),
+        "authors": ref_info.get("authors", ""),
+        "year": ref_year,
+        "citation_count": ref_citations,
+        "citation_contexts": ref_citation_contexts,
+    }
+
+
+# ============================== #
+#        노드 식별자 (work_id)    #
+# ============================== #
+
+def work_id(title: str, year=None, doi: str = None) -> str:
+    """
+    논문 노드의 안정적인 식별자 'title:<정규화된 title>'
+    - 업로드 논문 메타데이터에는 year / DOI가 없고 reference 메타데이터에는 있으므로,
+      같은 논문이 업로드 논문과 인용된 논문으로 모두 등장해도 한 노드가 되도록 title만 사용
+    - year / DOI는 식별에 쓰지 않음 (year는 노드 속성으로 보관), title이 비어 있을 때만 DOI로 구분
+    - 문장 부호는 공백으로 바꿔 비교 (끝의 '.', 곧은 / 굽은 따옴표 차이 등 무시)
+    """
+    key = " ".join(re.sub(r"[^\w\s]", " ", normalize_title(title or "")).split())
+    if not key and doi:
+        return "doi:" + re.sub(r"^https?://(dx\.)?doi\.org/", "", doi.strip().lower())
+    return "title:" + key
+
+
+def ref_number_key(ref_number):
+    """'[12]', 12, '12' → 12 (해석 불가 시 None)"""
+    match = re.search(r"\d+", str(ref_number or ""))
+    return int(match.group()) if match else None
+
+
+def iter_reference_triples(metadata: dict):
+    """
+    enriched metadata의 triple → (관계 라벨, ref_number, cited title, reference 메타데이터)
+    - 신규 형식: [source, relation, ref_title, ref_number]
+    - 기존 형식: [source, relation, "[n] ref_title"] 도 ref_number를 읽어 동일하게 처리
+    """
+    references = metadata.get("references", [])
+    ref_by_number = {ref_number_key(ref.get("ref_number")): ref for ref in references}
+    ref_by_title = {ref.get("ref_title"): ref for ref in references}
+
+    for triple in metadata.get("triples", []):
+        _, rel, tgt = triple[:3]
+        if len(triple) > 3:
+            ref_number = ref_number_key(triple[3])
+        else:
+            match = re.match(r"^\[(\d+)\]\s*", tgt)
+            ref_number = int(match.group(1)) if match else None
+            tgt = tgt[match.end():] if match else tgt
+
+        ref_info = ref_by_number.get(ref_number) or ref_by_title.get(tgt) or {}
+        title = ref_info.get("title") or ref_info.get("ref_title") or tgt
+        yield rel, ref_number, title, ref_info
+
+
+def citing_work_id(metadata: dict) -> str:
+    return work_id(metadata.get("title", ""), metadata.get("year"), metadata.get("doi"))
+
+
+def cited_work_id(title: str, ref_info: dict) -> str:
+    return work_id(title, ref_info.get("year"), ref_info.get("doi"))
@@ -2,15 +2,18 @@
 
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import HumanMessage, AIMessage
 from langchain_openai import ChatOpenAI
 from langchain_core.documents import Document
 
-import os, sys
+import os, sys, time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from vectorstore.vector_qa import run_qa_chain
+from vectorstore.context_packer import pack_synthesis_inputs
 from graphdb.graph_qa import run_graph_rag_qa  # ✅ fallback 내장 함수 사용
+from graphdb.graph_schema import GRAPH_NOT_RELATIONAL_MSG
+from graphdb.query_router import route_question, chitchat_messages, ROUTE_RELATIONAL, ROUTE_CHITCHAT
 
 
 base_dir = os.path.join(os.path.dirname(__file__), "../utils/metadata")
@@ -18,6 +21,27 @@ VECTOR_DB_DIR = os.path.join(base_dir, "chroma_db")
 
 llm = ChatOpenAI(model="gpt-4", temperature=0)
 
+# ✅ graph / vector 브랜치 동시 실행용 스레드 풀 및 브랜치별 timeout (초)
+GRAPH_BRANCH_TIMEOUT = float(os.getenv("GRAPH_BRANCH_TIMEOUT", "30"))
+VECTOR_BRANCH_TIMEOUT = float(os.getenv("VECTOR_BRANCH_TIMEOUT", "30"))
+branch_executor = ThreadPoolExecutor(max_workers=int(os.getenv("HYBRID_QA_WORKERS", "8")))
+
+GRAPH_TIMEOUT_ANSWER = "[Graph DB] 제한 시간 내에 응답하지 못해 결과가 없습니다."
+VECTOR_TIMEOUT_ANSWER = "[Vector DB] 제한 시간 내에 응답하지 못해 결과가 없습니다."
+
+
+def _collect_branch(future, deadline: float, fallback, label: str):
+    """deadline (time.monotonic 기준) 까지 브랜치 결과 대기, 초과 / 에러 시 fallback 반환"""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        # 실행 중인 스레드는 중단할 수 없으므로 결과만 버림
+        future.cancel()
+        print(f"⏱️ {label} 브랜치 timeout → 받은 결과만으로 종합")
+    except Exception as e:
+        print(f"❌ {label} 브랜치 에러: {e}")
+    return fallback
+
 
 # ✅ 벡터 문서 title 요약용 함수
 def format_vector_titles(docs: list[Document]) -> str:
@@ -37,18 +61,40 @@ def hybrid_qa(
     vector_db_dir=VECTOR_DB_DIR,
     k: int = 3,
     return_sources=False,
-    chat_history=[]
+    chat_history=None,
+    filters=None,
+    graph_timeout: float = GRAPH_BRANCH_TIMEOUT,
+    vector_timeout: float = VECTOR_BRANCH_TIMEOUT,
 ):
     print(f"\n💬 질문: {question}")
+    start = time.monotonic()
+    history_snapshot = list(chat_history or [])  # 읽기 전용 (새 턴 저장은 호출 측 ConversationStore 담당)
+
+    # ✅ 0. LLM 호출 전 로컬 분류 (일상 대화는 검색 / 종합 없이 짧은 답변 1회)
+    route = route_question(question)
+    if route == ROUTE_CHITCHAT:
+        response = (llm | StrOutputParser()).invoke(chitchat_messages(question, history_snapshot))
+        print(response)
+        return (response, [])
+
+    # ✅ 1~2. Graph QA / Vector QA 동시 실행 (히스토리 반영, 브랜치별 timeout)
+    # relational route가 아니면 graph 브랜치 (Cypher 생성) 생략
+    graph_future = branch_executor.submit(run_graph_rag_qa, question, history_snapshot) if route == ROUTE_RELATIONAL else None
+    vector_future = branch_executor.submit(
+        run_qa_chain,
+        question, k=k, VECTOR_DB_DIR=vector_db_dir, return_sources=True, chat_history=history_snapshot,
+        filters=filters,
+    )
 
-    # ✅ 1. Graph QA 실행 (히스토리 반영)
-    graph_answer = run_graph_rag_qa(question, chat_history)
-
-    # ✅ 2. Vector QA 실행
-    vector_answer, sources = run_qa_chain(
-        question, k=k, VECTOR_DB_DIR=vector_db_dir, return_sources=True, chat_history=chat_history
+    if graph_future is not None:
+        graph_answer = _collect_branch(graph_future, start + graph_timeout, GRAPH_TIMEOUT_ANSWER, "Graph")
+    else:
+        graph_answer = GRAPH_NOT_RELATIONAL_MSG
+    vector_answer, sources = _collect_branch(
+        vector_future, start + vector_timeout, (VECTOR_TIMEOUT_ANSWER, []), "Vector"
     )
     vector_docs_summary = format_vector_titles(sources)
+    print(f"⏱️ graph/vector 브랜치 완료: {time.monotonic() - start:.2f}s")
 
     # ✅ 3. System Prompt 정의
     system_template = SystemMessagePromptTemplate.from_template(
@@ -81,24 +127,20 @@ def hybrid_qa(
     # ✅ 4. 히스토리 반영
 
     chat_prompt = ChatPromptTemplate.from_messages(
-        [system_template] + chat_history + [
+        [system_template] + history_snapshot + [
             HumanMessagePromptTemplate.from_template("{question}")
         ]
     )
 
-    # ✅ 5. LLM 실행 체인
+    # ✅ 5. LLM 실행 체인 (graph / vector 답변은 항목별 토큰 상한 안으로 줄여서 전달)
     chain = chat_prompt | llm | StrOutputParser()
-    response = chain.invoke({
+    inputs, _ = pack_synthesis_inputs(question, {
         "question": question,
         "vector_answer": vector_answer,
         "vector_docs_summary": vector_docs_summary,
         "graph_answer": graph_answer
     })
-
-    # ✅ 6. 히스토리 업데이트
-    if chat_history is not None:
-        chat_history.append(HumanMessage(content=question))
-        chat_history.append(AIMessage(content=response))
+    response = chain.invoke(inputs)
 
     print("\n📌 Hybrid QA Result:")
     print(response)
@@ -2,15 +2,18 @@
 
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import HumanMessage, AIMessage
 from langchain_openai import ChatOpenAI
 from langchain_core.documents import Document
 
-import os, sys
+import os, sys, time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from vectorstore.vector_qa import run_qa_chain
-from graphdb.graph_qa import run_graph_rag_qa  # ✅ fallback 내장 함수 사용
+from vectorstore.vector_qa import retrieve_documents, answer_from_documents
+from vectorstore.context_packer import pack_synthesis_inputs
+from graphdb.graph_qa import run_graph_rag_qa_with_status  # ✅ fallback 내장 함수 사용
+from graphdb.graph_schema import GRAPH_STATUS_OK, GRAPH_STATUS_NOT_RELATIONAL, GRAPH_NOT_RELATIONAL_MSG
+from graphdb.query_router import route_question, chitchat_messages, ROUTE_RELATIONAL, ROUTE_CHITCHAT
 
 
 base_dir = os.path.join(os.path.dirname(__file__), "../utils/metadata")
@@ -18,6 +21,12 @@ VECTOR_DB_DIR = os.path.join(base_dir, "chroma_db")
 
 llm = ChatOpenAI(model="gpt-4", temperature=0)
 
+# ✅ 벡터 검색 (Chroma similarity search) 을 graph QA와 동시에 미리 실행하기 위한 스레드 풀
+retrieval_executor = ThreadPoolExecutor(max_workers=int(os.getenv("HYBRID_QA_WORKERS", "8")))
+# ✅ 벡터 검색 대기 상한 (초, flexible 모드의 벡터 브랜치 timeout과 같은 설정)
+VECTOR_BRANCH_TIMEOUT = float(os.getenv("VECTOR_BRANCH_TIMEOUT", "30"))
+VECTOR_TIMEOUT_ANSWER = "[Vector DB] 제한 시간 내에 응답하지 못해 결과가 없습니다."
+
 
 # ✅ 벡터 문서 title 요약용 함수
 def format_vector_titles(docs: list[Document]) -> str:
@@ -31,34 +40,21 @@ def format_vector_titles(docs: list[Document]) -> str:
     return result.strip()
 
 
-# ✅ Hybrid QA 실행 함수
-def hybrid_qa(
-    question: str,
-    vector_db_dir=VECTOR_DB_DIR,
-    k: int = 3,
-    return_sources=False,
-    chat_history=[]
-):
-    print(f"\n💬 질문: {question}")
-
-    # ✅ 1. Graph QA 실행 (히스토리 반영)
-    graph_answer = run_graph_rag_qa(question, chat_history=chat_history)
+def _collect_retrieval(future, deadline: float):
+    """deadline (time.perf_counter 기준) 까지 벡터 검색 결과 대기, 초과 / 에러 시 None (graph 답변만으로 종합)"""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.perf_counter()))
+    except FutureTimeoutError:
+        # 실행 중인 스레드는 중단할 수 없으므로 결과만 버림
+        future.cancel()
+        print("⏱️ Vector 검색 timeout → graph 답변만으로 종합")
+    except Exception as e:
+        print(f"❌ Vector 검색 에러: {e}")
+    return None
 
-    graph_failure_msgs = ["현재 구축된 그래프 DB에는 질문한 내용과 일치하는 결과가 없습니다. 다른 질문을 하거나 다른 모델 (벡터 DB 혹은 하이브리드 방식)을 이용해주세요.",
-                    "관계기반 질문이 아닙니다. 현재 질문으로 그래프 DB 조회를 할 수 없습니다. 다른 질문을 하거나 다른 모델 (벡터 DB 혹은 하이브리드 방식)을 이용해주세요."]
 
-    # ✅ 2. Graph 결과가 없거나 부족할 경우 Vector QA 실행
-    if graph_answer in graph_failure_msgs:
-        vector_answer, sources = run_qa_chain(
-            question, k=k, VECTOR_DB_DIR=vector_db_dir, return_sources=True, chat_history=chat_history
-        )
-        vector_docs_summary = format_vector_titles(sources)
-    else:
-        vector_answer, sources = "그래프 DB에서 이미 충분한 내용이 검색되었습니다. 벡터DB를 검색하지 않습니다.", []
-        vector_docs_summary = ""
-
-    # ✅ 3. System Prompt 정의
-    system_template = SystemMessagePromptTemplate.from_template(
+# ✅ 종합 답변 System Prompt 정의
+synthesis_system_template = SystemMessagePromptTemplate.from_template(
         """You are a helpful assistant. The user may ask questions in any language, and you must respond in the same language.
 
     You are given two optional answers to assist with your response:
@@ -106,28 +102,112 @@ def hybrid_qa(
     )
 
 
+# ✅ Hybrid QA 스트리밍 실행 함수
+def hybrid_qa_stream(
+    question: str,
+    vector_db_dir=VECTOR_DB_DIR,
+    k: int = 3,
+    chat_history=None,
+    filters=None,
+    vector_timeout: float = VECTOR_BRANCH_TIMEOUT,
+):
+    """
+    hybrid QA 진행 상황을 이벤트 dict로 순서대로 yield
+    - routed: 로컬 router 분류 결과 (relational / content / chitchat)
+    - graph_done: graph QA 완료 (status 포함, relational route만)
+    - vector_sources: (graph 실패 시) 벡터 검색 문서
+    - token: 종합 답변 토큰 (모델 생성 즉시 전달)
+    - done: 전체 답변, sources, ttft_ms (첫 토큰까지), total_ms
+    - filters: 벡터 검색 메타데이터 필터 (source / year_min / year_max / paper_id)
+    - chat_history는 읽기만 함 (새 턴 저장은 호출 측 ConversationStore 담당)
+    - vector_timeout: 질문 시작부터 벡터 검색 대기 상한 (초과 / 에러 시 graph 답변만으로 종합)
+    """
+    print(f"\n💬 질문: {question}")
+    start = time.perf_counter()
+    history = list(chat_history or [])
+
+    # ✅ 0. LLM 호출 전 로컬 분류 → 필요한 브랜치만 실행
+    route = route_question(question)
+    yield {"event": "routed", "route": route, "elapsed_ms": round((time.perf_counter() - start) * 1000)}
+
+    if route == ROUTE_CHITCHAT:
+        # 일상 대화는 검색 / 종합 없이 짧은 답변 1회
+        sources = []
+        chain = llm | StrOutputParser()
+        inputs = chitchat_messages(question, history)
+    else:
+        # ✅ 1. 벡터 검색은 LLM 호출이 없으므로 graph QA와 동시에 투기적으로 시작
+        retrieval_future = retrieval_executor.submit(retrieve_documents, question, k, vector_db_dir, filters)
+
+        # ✅ 2. Graph QA 실행 (히스토리 반영, relational route만 — 그 외에는 Cypher 생성 생략)
+        if route == ROUTE_RELATIONAL:
+            graph_status, graph_answer = run_graph_rag_qa_with_status(question, chat_history=history)
+            yield {"event": "graph_done", "status": graph_status, "elapsed_ms": round((time.perf_counter() - start) * 1000)}
+        else:
+            graph_status, graph_answer = GRAPH_STATUS_NOT_RELATIONAL, GRAPH_NOT_RELATIONAL_MSG
+
+        # ✅ 3. Graph 결과가 없거나 부족할 경우에만 Vector 답변 생성
+        if graph_status != GRAPH_STATUS_OK:
+            sources = _collect_retrieval(retrieval_future, start + vector_timeout)
+            yield {"event": "vector_sources", "sources": sources or [], "elapsed_ms": round((time.perf_counter() - start) * 1000)}
+            if sources is None:
+                vector_answer, sources = VECTOR_TIMEOUT_ANSWER, []
+            else:
+                vector_answer = answer_from_documents(question, sources, history)
+            vector_docs_summary = format_vector_titles(sources)
+        else:
+            # 아직 시작하지 않은 검색은 취소 (이미 실행 중이면 결과만 버림)
+            retrieval_future.cancel()
+            vector_answer, sources = "그래프 DB에서 이미 충분한 내용이 검색되었습니다. 벡터DB를 검색하지 않습니다.", []
+            vector_docs_summary = ""
+
+        # ✅ 4. 히스토리 반영
+        chat_prompt = ChatPromptTemplate.from_messages(
+            [synthesis_system_template] + history + [
+                HumanMessagePromptTemplate.from_template("{question}")
+            ]
+        )
 
-    # ✅ 4. 히스토리 반영
+        # ✅ 5. LLM 실행 체인 (토큰 스트리밍, graph / vector 답변은 항목별 토큰 상한 안으로 줄여서 전달)
+        chain = chat_prompt | llm | StrOutputParser()
+        inputs, _ = pack_synthesis_inputs(question, {
+            "question": question,
+            "vector_answer": vector_answer,
+            "vector_docs_summary": vector_docs_summary,
+            "graph_answer": graph_answer
+        })
+
+    chunks = []
+    ttft_ms = None
+    for chunk in chain.stream(inputs):
+        if ttft_ms is None:
+            ttft_ms = round((time.perf_counter() - start) * 1000)
+        chunks.append(chunk)
+        yield {"event": "token", "data": chunk}
+    response = "".join(chunks)
+    total_ms = round((time.perf_counter() - start) * 1000)
+
+    print(f"⏱️ TTFT {ttft_ms}ms / total {total_ms}ms")
+    yield {"event": "done", "answer": response, "sources": sources, "ttft_ms": ttft_ms, "total_ms": total_ms}
 
-    chat_prompt = ChatPromptTemplate.from_messages(
-        [system_template] + chat_history + [
-            HumanMessagePromptTemplate.from_template("{question}")
-        ]
-    )
 
-    # ✅ 5. LLM 실행 체인
-    chain = chat_prompt | llm | StrOutputParser()
-    response = chain.invoke({
-        "question": question,
-        "vector_answer": vector_answer,
-        "vector_docs_summary": vector_docs_summary,
-        "graph_answer": graph_answer
-    })
-
-    # ✅ 6. 히스토리 업데이트
-    if chat_history is not None:
-        chat_history.append(HumanMessage(content=question))
-        chat_history.append(AIMessage(content=response))
+# ✅ Hybrid QA 실행 함수
+def hybrid_qa(
+    question: str,
+    vector_db_dir=VECTOR_DB_DIR,
+    k: int = 3,
+    return_sources=False,
+    chat_history=None,
+    filters=None,
+    vector_timeout: float = VECTOR_BRANCH_TIMEOUT,
+):
+    response, sources = "", []
+    for event in hybrid_qa_stream(
+        question, vector_db_dir=vector_db_dir, k=k, chat_history=chat_history, filters=filters,
+        vector_timeout=vector_timeout,
+    ):
+        if event["event"] == "done":
+            response, sources = event["answer"], event["sources"]
 
     print("\n📌 Hybrid QA Result:")
     print(response)
@@ -0,0 +1,321 @@
+# local_graph.py
+# Neo4j 없이 프로세스 내부에서 동작하는 그래프 백엔드 (GraphBuilder / run_graph_rag_qa 와 동일한 인터페이스)
+
+import gzip
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from graphdb.graph_schema import (
+    GRAPH_NO_RESULT_MSG,
+    GRAPH_NOT_RELATIONAL_MSG,
+    GRAPH_STATUS_NO_RESULT,
+    GRAPH_STATUS_NOT_RELATIONAL,
+    GRAPH_STATUS_OK,
+    cited_work_id,
+    citing_work_id,
+    iter_reference_triples,
+    reference_properties,
+    to_relation_type,
+)
+from graphdb.graph_intents import match_intent
+from utils.paper_registry import find_paper_in_question
+from utils.versioning import bump_version, get_version
+
+base_dir = os.path.join(os.path.dirname(__file__), "../utils/metadata")
+LOCAL_GRAPH_PATH = os.getenv("LOCAL_GRAPH_PATH", os.path.join(base_dir, "local_graph.json.gz"))
+
+
+class LocalGraph:
+    """
+    인메모리 property graph
+    - nodes: work_id → 속성 dict
+    - out_edges / in_edges: work_id → {관계 타입 → set(work_id)} (adjacency list)
+    - rel_index: 관계 타입 → set((src, tgt))
+    - edge_props: (src, 관계 타입, tgt) → 관계 속성 (ref_number)
+    - title_index: 소문자 title → work_id
+    - citation 정렬 인덱스는 쓰기 이후 첫 조회 시 lazy 재계산
+    """
+
+    def __init__(self, path: str = LOCAL_GRAPH_PATH):
+        self.path = path
+        self.nodes = {}
+        self.out_edges = {}
+        self.in_edges = {}
+        self.rel_index = {}
+        self.edge_props = {}
+        self.title_index = {}
+        self._by_citation = None
+        self._lock = threading.RLock()
+
+        if path and os.path.exists(path):
+            self.load()
+
+    # ============================== #
+    #             쓰기              #
+    # ============================== #
+
+    def merge_node(self, node_id: str, **props):
+        with self._lock:
+            node = self.nodes.setdefault(node_id, {"work_id": node_id})
+            node.update(props)
+            if node.get("title"):
+                self.title_index[node["title"].lower()] = node_id
+            self._by_citation = None
+            return node
+
+    def merge_edge(self, src: str, rel_type: str, tgt: str, **props):
+        with self._lock:
+            self.out_edges.setdefault(src, {}).setdefault(rel_type, set()).add(tgt)
+            self.in_edges.setdefault(tgt, {}).setdefault(rel_type, set()).add(src)
+            self.rel_index.setdefault(rel_type, set()).add((src, tgt))
+            if props:
+                self.edge_props.setdefault((src, rel_type, tgt), {}).update(props)
+
+    def remove_outgoing(self, src: str) -> int:
+        """
+        src의 나가는 관계 삭제 + 연결이 남지 않은 대상 노드 삭제
+        - src 노드는 다른 노드가 가리키고 있으면 abstract 속성만 지우고 유지
+        - 반환: 삭제한 관계 수
+        """
+        with self._lock:
+            removed = 0
+            for rel_type, tgts in self.out_edges.pop(src, {}).items():
+                for tgt in tgts:
+                    self.rel_index.get(rel_type, set()).discard((src, tgt))
+                    self.edge_props.pop((src, rel_type, tgt), None)
+                    sources = self.in_edges.get(tgt, {}).get(rel_type)
+                    if sources is not None:
+                        sources.discard(src)
+                        if not sources:
+                            del self.in_edges[tgt][rel_type]
+                    if not self.in_edges.get(tgt) and not self.out_edges.get(tgt):
+                        self._remove_node(tgt)
+                    removed += 1
+                if not self.rel_index.get(rel_type):
+                    self.rel_index.pop(rel_type, None)
+
+            if self.in_edges.get(src):
+                for key in ("abstract_original", "abstract_llm"):
+                    self.nodes.get(src, {}).pop(key, None)
+            else:
+                self._remove_node(src)
+            self._by_citation = None
+            return removed
+
+    def _remove_node(self, node_id: str):
+        node = self.nodes.pop(node_id, None)
+        self.in_edges.pop(node_id, None)
+        self.out_edges.pop(node_id, None)
+        if node and node.get("title") and self.title_index.get(node["title"].lower()) == node_id:
+            del self.title_index[node["title"].lower()]
+
+    # ============================== #
+    #             조회              #
+    # ============================== #
+
+    def references(self, relation: str = None, source: str = None) -> list:
+        """(source)-[relation]->(b) 의 b 노드 목록 (relation/source 생략 시 전체)"""
+        # 조회도 writer와 같은 lock 안에서 (업로드 중 dict 크기 변경으로 인한 RuntimeError 방지), 노드는 사본 반환
+        with self._lock:
+            if relation is None:
+                rel_types = list(self.rel_index)
+            else:
+                rel_types = [relation]
+
+            targets = set()
+            for rel_type in rel_types:
+                if source is None:
+                    targets.update(tgt for _, tgt in self.rel_index.get(rel_type, ()))
+                else:
+                    targets.update(self.out_edges.get(source, {}).get(rel_type, ()))
+            return [dict(self.nodes[t]) for t in targets]
+
+    def count_by_relation(self, source: str = None) -> dict:
+        """관계 타입별 edge 수 (많은 순)"""
+        with self._lock:
+            if source is None:
+                counts = {rel: len(edges) for rel, edges in self.rel_index.items()}
+            else:
+                counts = {rel: len(tgts) for rel, tgts in self.out_edges.get(source, {}).items()}
+        return dict(sorted(counts.items(), key=lambda x: x[1], reverse=True))
+
+    def top_cited(self, limit: int = 1, relation: str = None) -> list:
+        """citation_count 내림차순 cited 논문 목록"""
+        with self._lock:
+            if self._by_citation is None:
+                cited = {tgt for edges in self.rel_index.values() for _, tgt in edges}
+                self._by_citation = sorted(
+                    cited, key=lambda n: self.nodes[n].get("citation_count", 0), reverse=True
+                )
+            ranked = self._by_citation
+
+            if relation is not None:
+                allowed = {tgt for _, tgt in self.rel_index.get(relation, ())}
+                ranked = [n for n in ranked if n in allowed]
+            return [dict(self.nodes[n]) for n in ranked[:limit]]
+
+    def find_by_title(self, text: str) -> list:
+        """title 부분 일치 (대소문자 무시)"""
+        text = text.lower().strip()
+        with self._lock:
+            if text in self.title_index:
+                return [dict(self.nodes[self.title_index[text]])]
+            return [dict(self.nodes[n]) for t, n in self.title_index.items() if text in t]
+
+    # ============================== #
+    #            저장/로드           #
+    # ============================== #
+
+    def save(self, path: str = None):
+        path = path or self.path
+        with self._lock:
+            data = {
+                "nodes": self.nodes,
+                "edges": [
+                    [src, rel, tgt, self.edge_props.get((src, rel, tgt), {})]
+                    for rel, edges in self.rel_index.items() for src, tgt in edges
+                ],
+            }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def load(self, path: str = None):
+        path = path or self.path
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        with self._lock:
+            self.nodes, self.out_edges, self.in_edges = {}, {}, {}
+            self.rel_index, self.edge_props, self.title_index = {}, {}, {}
+            for node_id, props in data.get("nodes", {}).items():
+                self.merge_node(node_id, **props)
+            for src, rel, tgt, props in data.get("edges", []):
+                self.merge_edge(src, rel, tgt, **props)
+
+
+_graph = None
+_graph_version = None
+_graph_lock = threading.Lock()
+
+
+def get_local_graph(path: str = LOCAL_GRAPH_PATH) -> LocalGraph:
+    """프로세스 전역 LocalGraph (최초 호출 시, 또는 다른 프로세스가 그래프를 갱신한 경우 파일에서 로드)"""
+    global _graph, _graph_version
+    with _graph_lock:
+        version = get_version("graph")
+        if _graph is None or _graph.path != path or _graph_version != version:
+            _graph = LocalGraph(path)
+            _graph_version = version
+        return _graph
+
+
+class LocalGraphBuilder:
+    """GraphBuilder와 동일한 인터페이스의 로컬 그래프 적재기"""
+
+    def __init__(self, path: str = LOCAL_GRAPH_PATH):
+        self.graph = get_local_graph(path)
+
+    def close(self):
+        self.graph.save()
+
+    def insert_triples_with_metadata(self, metadata):
+        src_id = citing_work_id(metadata)
+        self.graph.merge_node(
+            src_id,
+            title=metadata.get("title", ""),
+            abstract_original=metadata.get("abstract_original", ""),
+            abstract_llm=metadata.get("abstract_llm", ""),
+        )
+
+        count = 0
+        for rel, ref_number, tgt_title, ref_info in iter_reference_triples(metadata):
+            tgt_id = cited_work_id(tgt_title, ref_info)
+            self.graph.merge_node(tgt_id, title=tgt_title, **reference_properties(ref_info))
+            self.graph.merge_edge(src_id, to_relation_type(rel), tgt_id, ref_number=ref_number)
+            count += 1
+
+        self.graph.save()
+        bump_version("graph")
+        print(f"✅ 로컬 그래프 저장 완료 → {self.graph.path} (triple {count}개)")
+
+    def remove_paper(self, paper_id: str) -> int:
+        """GraphBuilder.remove_paper와 동일 (반환: 삭제한 관계 수)"""
+        removed = self.graph.remove_outgoing(paper_id)
+        if removed:
+            self.graph.save()
+            bump_version("graph")
+        print(f"🗑️ 로컬 그래프에서 {paper_id} 관계 {removed}개 삭제")
+        return removed
+
+
+# ============================== #
+#          로컬 그래프 QA        #
+# ============================== #
+
+def _format_paper(node: dict) -> str:
+    authors = node.get("authors") or []
+    if isinstance(authors, list):
+        authors = ", ".join(authors)
+    return f"- {node.get('title')} ({node.get('year') or 'unknown'}), authors: {authors or '-'}, citations: {node.get('citation_count', 0)}"
+
+
+def run_local_graph_qa(query: str, chat_history: list = None) -> str:
+    return run_local_graph_qa_with_status(query, chat_history)[1]
+
+
+def run_local_graph_qa_with_status(query: str, chat_history: list = None) -> tuple:
+    """
+    run_graph_rag_qa_with_status와 동일한 시그니처의 로컬 그래프 QA → (status, answer)
+    - graph_intents 템플릿 형태로 질의 판별 (관계별 개수 / 최다 인용 / 저자 / 관계별 reference 목록)
+    - 네트워크 호출 없이 인메모리 인덱스로 응답
+    """
+    graph = get_local_graph()
+    intent = match_intent(query, source=find_paper_in_question(query))
+    if intent is None:
+        return GRAPH_STATUS_NOT_RELATIONAL, GRAPH_NOT_RELATIONAL_MSG
+
+    name, params = intent
+    if name == "relation_counts":
+        counts = graph.count_by_relation(source=params["source"])
+        if not counts:
+            return GRAPH_STATUS_NO_RESULT, GRAPH_NO_RESULT_MSG
+        return GRAPH_STATUS_OK, "\n".join(f"- {rel}: {cnt}" for rel, cnt in counts.items())
+
+    if name == "most_cited":
+        papers = graph.top_cited(limit=params["limit"], relation=params["relation"])
+    elif name == "authors_of":
+        papers = graph.find_by_title(params["title"])[: params["limit"]]
+    else:
+        papers = graph.references(relation=params["relation"], source=params["source"])
+        papers.sort(key=lambda p: p.get("citation_count", 0), reverse=True)
+        papers = papers[: params["limit"]]
+
+    if not papers:
+        return GRAPH_STATUS_NO_RESULT, GRAPH_NO_RESULT_MSG
+    return GRAPH_STATUS_OK, "\n".join(_format_paper(p) for p in papers)
+
+
+# 실행 예시
+if __name__ == "__main__":
+    enriched_path = Path(__file__).resolve().parent.parent / "utils/metadata/enriched_metadata.json"
+    with open(enriched_path, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+
+    builder = LocalGraphBuilder()
+    builder.insert_triples_with_metadata(metadata)
+
+    for question in [
+        "Categorize all the reference types used in transformer paper and answer the numbers by category",
+        "Who wrote the most cited paper?",
+        "What are the background papers of transformer?",
+    ]:
+        print(f"\n💬 질문: {question}")
+        print(run_local_graph_qa(question))
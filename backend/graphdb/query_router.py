@@ -0,0 +1,277 @@
+# query_router.py
+# LLM 호출 전 로컬 질의 분류 (관계 질문 / 내용 검색 / 일상 대화) → 필요한 브랜치만 실행
+
+import json
+import math
+import os
+import re
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from graphdb.graph_intents import match_intent, match_relation, has_cue, LIST_CUES, REFERENCE_CUES
+
+ROUTE_RELATIONAL = "relational"  # graph QA 필요 (참조 관계, 인용수, 저자 등)
+ROUTE_CONTENT = "content"        # 벡터 검색만으로 충분 (논문 내용 설명)
+ROUTE_CHITCHAT = "chitchat"      # 인사 / 일반 대화 (검색 불필요)
+
+QUERY_ROUTER = os.getenv("QUERY_ROUTER", "true").lower() == "true"
+QUERY_ROUTER_KNN = int(os.getenv("QUERY_ROUTER_KNN", "3"))
+# ✅ router_questions.json: 키워드 규칙을 맞출 때 쓴 tuning 세트 (회귀 확인용)
+#    router_questions_heldout.json: 규칙 작성에 쓰지 않은 held-out 세트 (보고하는 정확도는 이 세트 기준)
+ROUTER_TUNING_PATH = os.path.join(os.path.dirname(__file__), "router_questions.json")
+ROUTER_EVAL_PATH = os.path.join(os.path.dirname(__file__), "router_questions_heldout.json")
+
+# ✅ 기존 hybrid 경로 대비 route별로 생략되는 LLM 호출 수
+# - relational: 생략 없음
+# - content: Cypher 생성 1회 생략
+# - chitchat: Cypher 생성 + 벡터 답변 생성 생략 (종합 답변 대신 짧은 답변 1회)
+LLM_CALLS_SAVED = {ROUTE_RELATIONAL: 0, ROUTE_CONTENT: 1, ROUTE_CHITCHAT: 2}
+
+GREETING_PATTERNS = [
+    r"^(hi|hello|hey|yo)\b", r"\bgood (morning|afternoon|evening)\b", r"\bthank(s| you)\b", r"\bbye\b",
+    r"\bwho are you\b", r"\bhow are you\b", r"\bwhat can you do\b",
+    r"안녕", r"반가", r"고마", r"감사", r"수고", r"잘 ?가", r"누구(야|세요|니)", r"뭘 할 수 있", r"잘 지내",
+]
+# 인사 뒤에 이어지면 실제 질문으로 보는 단서 ("hi, what is the BLEU score?" → 검색 경로)
+QUESTION_CUES = [
+    "what", "how", "why", "which", "who", "when", "where", "can you", "could you", "tell me", "?",
+    "뭐", "무엇", "왜", "어떻게", "어떤", "언제", "어디", "얼마", "몇", "알려", "설명",
+]
+# 일상 대화 판정을 막는 학술 단서 (하나라도 있으면 검색 경로로)
+ACADEMIC_CUES = [
+    "paper", "model", "method", "transformer", "attention", "architecture", "dataset", "result",
+    "experiment", "abstract", "author", "cite", "reference", "explain", "summar",
+    "논문", "모델", "방법", "기법", "구조", "데이터", "실험", "결과", "초록", "저자", "인용", "참조", "설명", "요약",
+]
+# 다른 논문과의 관계 자체를 묻는 관계 유형 (넓은 참조 단서만으로 관계 질문 판정)
+# - USE_METHOD_OF / HAS_BACKGROUND_ON 키워드 (method, technique, 배경 ...) 는 내용 질문에도 흔하므로 목록 단서 필요
+CROSS_PAPER_RELATIONS = {"COMPARES_OR_CONTRASTS_WITH", "EXTENDS_IDEA_OF", "IS_MOTIVATED_BY"}
+# 관계 질문 단서 (graph_intents 템플릿에 걸리지 않는 자유 형식 관계 질문용)
+RELATIONAL_CUES = [
+    "cite", "cited by", "citing", "reference list", "references", "referenced", "bibliography", "relationship",
+    "related to", "which papers", "how many papers", "citation count", "build on", "builds on", "built on",
+    "who wrote", "written by", "authors of", "who are the authors",
+    "인용한", "인용된", "인용수", "참조한", "참조하는", "레퍼런스", "참고문헌", "관계", "어떤 논문들", "몇 개", "몇개", "몇 편",
+    "누가 썼", "저자가 누구", "저자는 누구",
+]
+# 논문 내용 설명을 요청하는 단서 (학술 단서와 함께 있을 때만 content로 판정)
+CONTENT_CUES = [
+    "explain", "summar", "describe", "how does", "how do", "why",
+    "설명", "요약", "정리", "왜", "어떻게",
+]
+
+# ✅ MiniLM 유사도 분류용 labelled 예시 (tuning / held-out 평가 세트와 별도)
+ROUTE_EXAMPLES = {
+    ROUTE_RELATIONAL: [
+        "Which references does the transformer paper build upon?",
+        "List the papers this work compares against.",
+        "What is the most cited reference?",
+        "이 논문이 배경으로 참조한 논문은?",
+        "참조 유형별로 레퍼런스가 몇 개인지 알려줘",
+        "어떤 논문의 방법을 사용했어?",
+    ],
+    ROUTE_CONTENT: [
+        "Explain the main idea of the transformer paper.",
+        "How does multi-head attention work?",
+        "What datasets were used in the experiments?",
+        "transformer 논문에 대해 설명해줘",
+        "이 논문의 핵심 기여는 뭐야?",
+        "positional encoding이 왜 필요한지 알려줘",
+    ],
+    ROUTE_CHITCHAT: [
+        "hello",
+        "thanks for the help",
+        "who are you?",
+        "안녕",
+        "고마워",
+        "오늘 기분 어때?",
+    ],
+}
+
+
+def _question_after_greeting(question: str) -> bool:
+    """마지막 인사 표현 뒤에 단어가 있고 질문 단서 (의문사 / '?') 가 있으면 True"""
+    end = max((m.end() for p in GREETING_PATTERNS for m in re.finditer(p, question)), default=0)
+    rest = question[end:]
+    return bool(re.search(r"[a-z0-9가-힣]", rest)) and has_cue(rest, QUESTION_CUES)
+
+
+def _relational_keyword(question: str) -> bool:
+    if has_cue(question, RELATIONAL_CUES):
+        return True
+    relation = match_relation(question)
+    if relation is None:
+        return False
+    return has_cue(question, LIST_CUES) or (relation in CROSS_PAPER_RELATIONS and has_cue(question, REFERENCE_CUES))
+
+
+def keyword_route(question: str):
+    """키워드 규칙 분류 → (route, 근거) / 확신할 수 없으면 None"""
+    q = re.sub(r"\s+", " ", question.lower()).strip()
+
+    if match_intent(q) is not None:
+        return ROUTE_RELATIONAL, "graph_intent"
+    if _relational_keyword(q):
+        return ROUTE_RELATIONAL, "relational_keyword"
+    if has_cue(q, ACADEMIC_CUES):
+        # 학술 단서만으로는 관계 질문과 구분할 수 없으므로 (저자 / 인용 / 선행 연구 ...) 설명 요청 단서가 있을 때만 content
+        # 나머지는 k-NN 투표에 맡기고, 투표도 불가하면 graph QA를 거치는 relational (기존 hybrid 경로)
+        if has_cue(q, CONTENT_CUES):
+            return ROUTE_CONTENT, "content_keyword"
+        return None
+    if any(re.search(p, q) for p in GREETING_PATTERNS):
+        if _question_after_greeting(q):
+            return ROUTE_CONTENT, "question_after_greeting"
+        return ROUTE_CHITCHAT, "greeting"
+    return None
+
+
+def _unit(vec) -> list:
+    norm = math.sqrt(sum(x * x for x in vec))
+    return [x / norm for x in vec] if norm else list(vec)
+
+
+class QueryRouter:
+    """
+    질문 → (route, 근거)
+    - 키워드 규칙이 먼저 판정 (graph_intents 템플릿 / 관계 단서 / 인사 / 학술 단서)
+    - 규칙으로 판정되지 않으면 embed_fn이 있을 때 labelled 예시와의 MiniLM 유사도 k-NN 투표
+    - 둘 다 불가하면 학술 단서가 있는 질문은 relational (graph 답변을 잃지 않도록), 나머지는 content
+    """
+
+    def __init__(self, embed_fn=None, examples: dict = ROUTE_EXAMPLES, knn: int = QUERY_ROUTER_KNN):
+        self.embed_fn = embed_fn
+        self.examples = examples
+        self.knn = knn
+        self._example_vectors = None
+        self.counts = {ROUTE_RELATIONAL: 0, ROUTE_CONTENT: 0, ROUTE_CHITCHAT: 0}
+        self.llm_calls_saved = 0
+        self._lock = threading.Lock()
+
+    def _vectors(self) -> list:
+        # 예시 임베딩은 처음 필요할 때 한 번만 계산
+        with self._lock:
+            if self._example_vectors is None:
+                self._example_vectors = [
+                    (route, _unit(self.embed_fn(text)))
+                    for route, texts in self.examples.items()
+                    for text in texts
+                ]
+            return self._example_vectors
+
+    def similarity_route(self, question: str):
+        if self.embed_fn is None:
+            return None
+        query_vec = _unit(self.embed_fn(question))
+        scored = sorted(
+            ((sum(x * y for x, y in zip(query_vec, vec)), route) for route, vec in self._vectors()),
+            reverse=True,
+        )[:self.knn]
+        votes = {}
+        for score, route in scored:
+            votes[route] = votes.get(route, 0.0) + score
+        return max(votes, key=votes.get) if votes else None
+
+    def classify(self, question: str) -> tuple:
+        """통계 기록 없이 분류만 수행"""
+        routed = keyword_route(question)
+        if routed is not None:
+            return routed
+        route = self.similarity_route(question)
+        if route is not None:
+            return route, "embedding_knn"
+        if has_cue(re.sub(r"\s+", " ", question.lower()), ACADEMIC_CUES):
+            return ROUTE_RELATIONAL, "academic_default"
+        return ROUTE_CONTENT, "default"
+
+    def route(self, question: str) -> str:
+        route, reason = self.classify(question)
+        with self._lock:
+            self.counts[route] += 1
+            self.llm_calls_saved += LLM_CALLS_SAVED[route]
+        print(f"🧭 질의 route: {route} ({reason})")
+        return route
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"routes": dict(self.counts), "llm_calls_saved": self.llm_calls_saved}
+
+
+def _embed_question(text: str) -> list:
+    from vectorstore.vector_qa import embeddings
+    return embeddings.embed_query(text)
+
+
+# ✅ hybrid QA 공용 router (QUERY_ROUTER=false 이면 항상 relational → 기존 동작)
+query_router = QueryRouter(embed_fn=_embed_question)
+
+
+def route_question(question: str) -> str:
+    if not QUERY_ROUTER:
+        return ROUTE_RELATIONAL
+    return query_router.route(question)
+
+
+# ✅ 일상 대화 답변 (검색 없이 LLM 1회)
+CHITCHAT_SYSTEM_PROMPT = """You are RefNavi, an academic assistant chatbot that helps users understand scientific papers and their references.
+The user is making small talk rather than asking about a paper. Reply briefly and politely in the same language as the user,
+and, where natural, mention that you can answer questions about the uploaded paper and its references."""
+
+
+def chitchat_messages(question: str, chat_history: list = None) -> list:
+    from langchain_core.messages import SystemMessage, HumanMessage
+    return [SystemMessage(content=CHITCHAT_SYSTEM_PROMPT)] + list(chat_history or []) + [HumanMessage(content=question)]
+
+
+# ============================== #
+#           라우팅 평가            #
+# ============================== #
+
+def evaluate(router: QueryRouter, path: str = ROUTER_EVAL_PATH) -> dict:
+    """
+    labelled 질문 세트 ([{"question", "route"}]) 에 대한 분류 정확도와 절약된 LLM 호출 수
+    - 기본은 held-out 세트 (tuning 세트 정확도는 규칙을 맞춘 질문이므로 일반화 성능이 아님)
+    - misrouted: 틀린 질문 목록 (relational → 다른 route 오분류는 graph 답변 손실이므로 따로 집계)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        labelled = json.load(f)
+
+    correct, saved, missed_relational = 0, 0, 0
+    confusion, misrouted = {}, []
+    for item in labelled:
+        predicted, reason = router.classify(item["question"])
+        expected = item["route"]
+        confusion.setdefault(expected, {}).setdefault(predicted, 0)
+        confusion[expected][predicted] += 1
+        saved += LLM_CALLS_SAVED[predicted]
+        if predicted == expected:
+            correct += 1
+        else:
+            missed_relational += expected == ROUTE_RELATIONAL
+            misrouted.append({"question": item["question"], "expected": expected, "predicted": predicted, "reason": reason})
+
+    return {
+        "questions": len(labelled),
+        "accuracy": round(correct / len(labelled), 4) if labelled else 0.0,
+        "llm_calls_saved": saved,
+        "llm_calls_saved_per_question": round(saved / len(labelled), 3) if labelled else 0.0,
+        "missed_relational": missed_relational,
+        "confusion": confusion,
+        "misrouted": misrouted,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="질의 router 정확도 평가")
+    parser.add_argument("--path", default=ROUTER_EVAL_PATH, help="기본: held-out 세트")
+    parser.add_argument("--tuning", action="store_true", help="held-out 대신 tuning 세트로 평가 (규칙 수정 후 회귀 확인용)")
+    parser.add_argument("--no-embeddings", action="store_true", help="키워드 규칙만으로 평가")
+    args = parser.parse_args()
+
+    router = QueryRouter(embed_fn=None if args.no_embeddings else _embed_question)
+    path = ROUTER_TUNING_PATH if args.tuning else args.path
+    print(json.dumps(evaluate(router, path), ensure_ascii=False, indent=2))
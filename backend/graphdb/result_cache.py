@@ -0,0 +1,79 @@
+# result_cache.py
+# 실행된 Cypher 결과 캐시 (그래프 쓰기 버전이 바뀌면 자동 무효화)
+
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.versioning import get_version
+
+GRAPH_RESULT_CACHE_SIZE = int(os.getenv("GRAPH_RESULT_CACHE_SIZE", "512"))
+
+
+def normalize_cypher(cypher: str) -> str:
+    # 공백 / 줄바꿈 차이만 제거 (문자열 리터럴 대소문자는 유지)
+    return " ".join(cypher.split()).rstrip(";")
+
+
+class QueryResultCache:
+    """
+    (정규화된 Cypher, 파라미터) → 결과 행
+    - 쿼리 실행 전의 graph 버전을 함께 기록하고, 조회 시 버전이 다르면 stale로 버림
+    - max_entries 초과 시 LRU 제거
+    """
+
+    def __init__(self, max_entries: int = GRAPH_RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(cypher: str, params: dict = None) -> str:
+        return normalize_cypher(cypher) + "|" + json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+
+    def get(self, cypher: str, params: dict = None):
+        key = self._key(cypher, params)
+        version = get_version("graph")
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] != version:
+                del self.entries[key]
+                self.stale += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, cypher: str, params: dict, rows: list, version: int):
+        """version: 쿼리 실행 전에 읽은 graph 버전 (실행 중 쓰기가 있었으면 다음 조회에서 stale 처리)"""
+        key = self._key(cypher, params)
+        with self._lock:
+            self.entries[key] = (version, rows)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
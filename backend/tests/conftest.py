@@ -0,0 +1,39 @@
+# conftest.py
+# backend 모듈을 패키지 경로로 import 할 수 있도록 경로 추가 + 실행 중 생기는 파일을 임시 디렉토리로 격리
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture
+def isolated_state(tmp_path, monkeypatch):
+    """버전 카운터 / 논문 목록을 테스트별 임시 디렉토리에 기록 (utils/metadata 아래 실제 파일을 건드리지 않음)"""
+    from utils import paper_registry, versioning
+
+    monkeypatch.setattr(versioning, "VERSIONS_PATH", str(tmp_path / ".versions.json"))
+    monkeypatch.setattr(versioning, "_cached", {"mtime": None, "versions": {}})
+    monkeypatch.setattr(paper_registry, "PAPERS_DIR", str(tmp_path / "papers"))
+    monkeypatch.setattr(paper_registry, "_cached", {"mtime": None, "papers": {}})
+    return tmp_path
+
+
+class _WordEncoding:
+    """공백 단위 토크나이저 (tiktoken 인코딩 다운로드 없이 토큰 예산 로직 검증)"""
+
+    def encode(self, text: str) -> list:
+        return text.split()
+
+    def decode(self, tokens: list) -> str:
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    """count_tokens / truncate_to_tokens 를 단어 수 기준으로 계산"""
+    from utils import token_counter
+
+    monkeypatch.setattr(token_counter, "_encoding", lambda model: _WordEncoding())
@@ -0,0 +1,150 @@
+# test_bm25_index.py
+# BM25 색인 순위 / shard 저장-로드 / RRF 합치기
+
+from langchain_core.documents import Document
+
+from vectorstore.bm25_index import BM25Index, hybrid_search, reciprocal_rank_fusion, shard_name, tokenize, where_paper_ids
+
+DOCS = {
+    "d1": Document(page_content="GraphSAGE inductive representation learning on large graphs",
+                   metadata={"paper_id": "p1", "source": "reference_abstract"}),
+    "d2": Document(page_content="BERT-base pre-training of deep bidirectional transformers",
+                   metadata={"paper_id": "p1", "source": "reference_abstract"}),
+    "d3": Document(page_content="attention attention attention is all you need transformers",
+                   metadata={"paper_id": "p2", "source": "main_abstract"}),
+    "d4": Document(page_content="layer normalization for recurrent networks",
+                   metadata={"paper_id": "p2", "source": "citation_context"}),
+}
+
+
+def _index(path=None) -> BM25Index:
+    index = BM25Index(path)
+    index.add(list(DOCS), list(DOCS.values()))
+    return index
+
+
+def test_tokenize():
+    assert tokenize("GraphSAGE") == ["graphsage"]
+    assert tokenize("BERT-base") == ["bert-base", "bert", "base"]
+    assert tokenize("트랜스포머를") == ["트랜스포머를", "트랜", "랜스", "스포", "포머", "머를"]
+    assert tokenize(None) == []
+
+
+def test_exact_terms_rank_first():
+    index = _index()
+    assert index.search("graphsage", k=1)[0][0] == "d1"
+    assert index.search("bert", k=1)[0][0] == "d2"
+    # tf가 높은 문서가 위로
+    assert [doc_id for doc_id, _ in index.search("attention transformers")][:2] == ["d3", "d2"]
+    assert index.search("unknownterm") == []
+    assert index.search("") == []
+
+
+def test_predicate_and_delete():
+    index = _index()
+    only_p2 = index.search("transformers", predicate=lambda meta: meta["paper_id"] == "p2")
+    assert [doc_id for doc_id, _ in only_p2] == ["d3"]
+
+    index.delete(["d3"])
+    assert [doc_id for doc_id, _ in index.search("attention")] == []
+    assert all("attention" not in postings for postings in index.postings.values())
+    assert len(index) == 3
+
+
+def test_shards_round_trip_and_refresh(tmp_path):
+    path = str(tmp_path / "bm25")
+    index = _index(path)
+    index.save()
+    assert len(list((tmp_path / "bm25").glob("*.json.gz"))) == 2  # paper_id별 shard
+
+    loaded = BM25Index(path)
+    assert loaded.search("graphsage") == index.search("graphsage")
+    assert BM25Index(path, paper_ids=["p2"]).docs.keys() == {"d3", "d4"}
+
+    # 다른 인스턴스가 p1 문서를 삭제 → refresh는 바뀐 shard만 다시 로드
+    writer = BM25Index(path, paper_ids=["p1"])
+    writer.delete(["d1", "d2"])
+    writer.save()
+    assert loaded.refresh() == 1
+    assert set(loaded.docs) == {"d3", "d4"}
+
+
+def test_lazy_index_loads_only_the_filtered_paper(tmp_path):
+    path = str(tmp_path / "bm25")
+    _index(path).save()
+
+    lazy = BM25Index(path, lazy=True)
+    assert len(lazy) == 0 and lazy.available_shards() == {shard_name("p1"), shard_name("p2")}
+
+    # paper_id 한정 검색은 그 논문 shard만 로드 / 점수 계산
+    assert [doc_id for doc_id, _ in lazy.search("transformers", paper_ids=["p2"])] == ["d3"]
+    assert set(lazy.docs) == {"d3", "d4"}
+    assert lazy.search("graphsage", paper_ids=["p2"]) == []
+    assert lazy.search("graphsage", paper_ids=["missing"]) == []
+
+    # 필터 없는 검색은 나머지 shard도 로드, 결과는 전체 로드 인덱스와 같음
+    assert lazy.search("transformers bert") == _index().search("transformers bert")
+    assert set(lazy.docs) == set(DOCS)
+
+
+def test_lazy_refresh_tracks_new_and_removed_shards(tmp_path):
+    path = str(tmp_path / "bm25")
+    writer = BM25Index(path)
+    writer.add(["d1"], [DOCS["d1"]])
+    writer.save()
+
+    lazy = BM25Index(path, lazy=True)
+    assert lazy.search("graphsage", paper_ids=["p1"])[0][0] == "d1"
+
+    writer.add(["d3"], [DOCS["d3"]])
+    writer.delete(["d1"])
+    writer.save()
+    assert lazy.refresh() == 1  # p1 shard 제거 (새 p2 shard는 목록에만 추가)
+    assert set(lazy.docs) == set()
+    assert lazy.available_shards() == {shard_name("p2")}
+    assert lazy.search("attention")[0][0] == "d3"
+
+
+def test_where_paper_ids():
+    assert where_paper_ids(None) is None
+    assert where_paper_ids({"source": "main_abstract"}) is None
+    assert where_paper_ids({"paper_id": "p1"}) == {"p1"}
+    assert where_paper_ids({"paper_id": {"$in": ["p1", "p2"]}}) == {"p1", "p2"}
+    assert where_paper_ids({"paper_id": {"$ne": "p1"}}) is None
+    assert where_paper_ids({"$and": [{"source": "x"}, {"paper_id": {"$eq": "p2"}}]}) == {"p2"}
+    assert where_paper_ids({"$or": [{"paper_id": "p1"}, {"paper_id": "p2"}]}) is None
+
+
+def test_reciprocal_rank_fusion():
+    # b는 두 순위 모두 상위 → a (한쪽 1위) 보다 앞
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=3) == ["b", "a", "d"]
+    assert reciprocal_rank_fusion([["a"], []], k=5) == ["a"]
+    assert reciprocal_rank_fusion([], k=5) == []
+
+
+class _DenseStore:
+    """similarity_search만 있는 스토어 (고정 순위)"""
+
+    def __init__(self, ranked_ids):
+        self.ranked_ids = ranked_ids
+
+    def similarity_search(self, query, k=4, filter=None):
+        docs = [Document(page_content=DOCS[i].page_content, metadata=DOCS[i].metadata, id=i) for i in self.ranked_ids]
+        if filter:
+            docs = [d for d in docs if all(d.metadata.get(key) == value for key, value in filter.items())]
+        return docs[:k]
+
+
+def test_hybrid_search_fuses_dense_and_lexical():
+    index = _index()
+    # dense는 d4, d1 순 / BM25는 graphsage → d1 → d1이 1위
+    results = hybrid_search(_DenseStore(["d4", "d1"]), index, "graphsage", k=2)
+    assert [doc.id for doc in results] == ["d1", "d4"]
+
+    # BM25에만 있는 문서도 색인에서 Document로 복원
+    results = hybrid_search(_DenseStore([]), index, "bert", k=1)
+    assert results[0].id == "d2" and results[0].metadata["paper_id"] == "p1"
+
+    # where 필터는 BM25 후보에도 적용
+    results = hybrid_search(_DenseStore([]), index, "transformers", k=5, where={"paper_id": "p2"})
+    assert [doc.id for doc in results] == ["d3"]
@@ -0,0 +1,82 @@
+# test_context_packer.py
+# 검색 문서 context 토큰 예산 / 중복 · overlap 제거 / 질문 관련 문장 선택
+
+import pytest
+from langchain_core.documents import Document
+
+from utils.token_counter import count_tokens
+from vectorstore.context_packer import pack_context, pack_documents, pack_synthesis_inputs, trim_text
+
+pytestmark = pytest.mark.usefixtures("word_tokens")
+
+
+def _filler(topic: str, sentences: int) -> str:
+    return " ".join(f"Sentence {i} talks about {topic} in some detail." for i in range(sentences))
+
+
+def _doc(text: str, paper_id: str = "p1", source: str = "original_paper_body", doc_id: str = None) -> Document:
+    return Document(page_content=text, metadata={"paper_id": paper_id, "source": source}, id=doc_id)
+
+
+@pytest.mark.parametrize("budget", [40, 120, 400])
+def test_pack_documents_stays_within_budget(budget):
+    docs = [_doc(_filler(f"topic{i}", 10), paper_id=f"p{i}", doc_id=f"d{i}") for i in range(6)]
+    packed, stats = pack_documents("what about topic1?", docs, budget=budget, doc_max_tokens=100)
+
+    assert stats["tokens_after"] <= budget
+    assert stats["tokens_before"] == count_tokens("\n\n".join(doc.page_content for doc in docs))
+    assert stats["packed_docs"] == len(packed) >= 1
+    # 검색 순위 순서 유지 + metadata / id 보존
+    assert [doc.id for doc in packed] == [f"d{i}" for i in range(len(packed))]
+    assert packed[0].metadata == {"paper_id": "p0", "source": "original_paper_body"}
+
+
+def test_pack_documents_removes_duplicates_and_chunk_overlap():
+    shared = "The encoder stack is composed of six identical layers with residual connections."
+    first = "Attention maps queries and keys to weights. " + shared
+    second = shared + " Each decoder layer adds a cross attention sub-layer."
+    other = shared + " A different paper reuses the same sentence."
+    docs = [_doc(first), _doc(first), _doc(second), _doc(other, paper_id="p2")]
+
+    packed, stats = pack_documents("encoder layers", docs, budget=1000)
+
+    assert [doc.page_content for doc in packed] == [
+        first,
+        "Each decoder layer adds a cross attention sub-layer.",  # 같은 논문 · source의 앞 chunk와 겹치는 부분 제거
+        other,  # 다른 논문 문서는 overlap 비교 대상이 아님
+    ]
+    assert stats["tokens_after"] < stats["tokens_before"]
+
+
+def test_trim_text_keeps_header_and_relevant_sentences():
+    text = "Title: Graph Attention Networks\n" + " ".join([
+        "We study many unrelated topics here.",
+        "Masked self-attention lets nodes attend over neighbours.",
+        "Results are reported on citation datasets.",
+        "Nothing else matters in this sentence.",
+    ])
+    trimmed = trim_text("how does masked self-attention over neighbours work?", text, max_tokens=14)
+
+    assert count_tokens(trimmed) <= 14
+    assert trimmed.splitlines()[0] == "Title: Graph Attention Networks"
+    assert "Masked self-attention lets nodes attend over neighbours." in trimmed
+    assert "unrelated" not in trimmed
+    assert trim_text("q", "short text", max_tokens=10) == "short text"
+
+
+def test_pack_context_joins_packed_documents():
+    docs = [_doc("alpha beta gamma.", doc_id="a"), _doc("delta epsilon.", paper_id="p2", doc_id="b")]
+    context, stats = pack_context("alpha", docs, budget=100)
+    assert context == "alpha beta gamma.\n\ndelta epsilon."
+    assert stats["packed_docs"] == 2
+
+
+def test_pack_synthesis_inputs_trims_answers_but_not_question():
+    question = " ".join(["word"] * 50)
+    inputs = {"question": question, "graph_answer": _filler("graphs", 20), "vector_answer": "short answer."}
+    packed, stats = pack_synthesis_inputs("graphs", inputs, max_tokens=30)
+
+    assert packed["question"] == question
+    assert packed["vector_answer"] == "short answer."
+    assert count_tokens(packed["graph_answer"]) <= 30
+    assert stats["tokens_after"] <= 50 + 30 + 2
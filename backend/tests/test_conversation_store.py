@@ -0,0 +1,165 @@
+# test_conversation_store.py
+# ConversationStore 토큰 window / 요약 / 세션 제거
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from utils import conversation_store
+from utils.conversation_store import ConversationStore
+from utils.token_counter import count_tokens
+
+pytestmark = pytest.mark.usefixtures("word_tokens")
+
+
+def _turn_tokens(question: str, answer: str) -> int:
+    return count_tokens(question) + count_tokens(answer)
+
+
+def test_history_keeps_turns_in_order():
+    store = ConversationStore(max_tokens=1000)
+    store.append("s1", "What is attention?", "A weighting over positions.")
+    store.append("s1", "And multi-head?", "Several attentions in parallel.")
+
+    history = store.history("s1")
+    assert [type(m) for m in history] == [HumanMessage, AIMessage, HumanMessage, AIMessage]
+    assert [m.content for m in history[::2]] == ["What is attention?", "And multi-head?"]
+    assert store.history("other") == []
+    assert store.history(None) == []
+
+
+def test_history_is_a_copy():
+    store = ConversationStore()
+    store.append("s1", "q", "a")
+    store.history("s1").append(HumanMessage(content="injected"))
+    assert len(store.history("s1")) == 2
+
+
+def test_window_drops_oldest_turns():
+    turn = ("question about transformers", "answer about transformers")
+    budget = _turn_tokens(f"{turn[0]} 0", f"{turn[1]} 0") * 2
+    store = ConversationStore(max_tokens=budget)
+    for i in range(5):
+        store.append("s1", f"{turn[0]} {i}", f"{turn[1]} {i}")
+
+    history = store.history("s1")
+    assert len(history) == 4  # 최근 2턴만 유지
+    assert history[0].content.endswith(" 3") and history[2].content.endswith(" 4")
+    assert store.sessions["s1"].tokens <= budget
+
+
+def test_last_turn_kept_even_if_over_budget():
+    store = ConversationStore(max_tokens=5)
+    store.append("s1", "short", "ok")
+    store.append("s1", "a much longer question " * 10, "a much longer answer " * 10)
+
+    history = store.history("s1")
+    assert len(history) == 2
+    assert history[0].content.startswith("a much longer question")
+
+
+def test_dropped_turns_are_summarised():
+    calls = []
+
+    def summarize(summary, messages):
+        calls.append((summary, [m.content for m in messages]))
+        return (summary + " | " if summary else "") + "; ".join(m.content for m in messages)
+
+    store = ConversationStore(max_tokens=_turn_tokens("q1", "a1"), summarize_fn=summarize, summary_tokens=100)
+    store.append("s1", "q1", "a1")
+    store.append("s1", "q2", "a2")
+    store.append("s1", "q3", "a3")
+
+    assert calls == [("", ["q1", "a1"]), ("q1; a1", ["q2", "a2"])]
+    history = store.history("s1")
+    assert isinstance(history[0], SystemMessage)
+    assert history[0].content.endswith("q1; a1 | q2; a2")
+    assert [m.content for m in history[1:]] == ["q3", "a3"]
+    assert store.stats()["summarized_turns"] == 2
+
+
+def test_summary_is_truncated_and_failures_are_ignored():
+    store = ConversationStore(max_tokens=1, summarize_fn=lambda s, m: "word " * 50, summary_tokens=5)
+    store.append("s1", "q1", "a1")
+    store.append("s1", "q2", "a2")
+    assert count_tokens(store.sessions["s1"].summary) <= 5
+
+    def failing(summary, messages):
+        raise RuntimeError("llm down")
+
+    store = ConversationStore(max_tokens=1, summarize_fn=failing)
+    store.append("s1", "q1", "a1")
+    store.append("s1", "q2", "a2")
+    assert [m.content for m in store.history("s1")] == ["q2", "a2"]
+
+
+def _folding_summarize(summary, messages):
+    return (summary + " | " if summary else "") + "; ".join(m.content for m in messages)
+
+
+def test_concurrent_appends_do_not_overwrite_the_summary():
+    calls = []
+    first_call_started = threading.Event()
+
+    def slow_summarize(summary, messages):
+        calls.append(summary)
+        first_call_started.set()
+        time.sleep(0.05)  # 두 번째 append가 요약 도중에 들어오도록
+        return _folding_summarize(summary, messages)
+
+    store = ConversationStore(max_tokens=_turn_tokens("q0", "a0"), summarize_fn=slow_summarize, summary_tokens=100)
+    store.append("s1", "q0", "a0")
+
+    first = threading.Thread(target=store.append, args=("s1", "q1", "a1"))
+    first.start()
+    first_call_started.wait()
+    store.append("s1", "q2", "a2")
+    first.join()
+
+    # 두 번째 요약은 첫 요약 결과 위에서 계산 (이전 요약을 읽어 덮어쓰지 않음)
+    assert calls == ["", "q0; a0"]
+    assert store.sessions["s1"].summary == "q0; a0 | q1; a1"
+    assert [m.content for m in store.history("s1")[1:]] == ["q2", "a2"]
+
+
+def test_summaries_can_run_outside_the_request():
+    executor = ThreadPoolExecutor(max_workers=2)
+    release = threading.Event()
+
+    def blocking_summarize(summary, messages):
+        release.wait(5)
+        return _folding_summarize(summary, messages)
+
+    store = ConversationStore(max_tokens=_turn_tokens("q1", "a1"), summarize_fn=blocking_summarize,
+                              summary_tokens=100, executor=executor)
+    store.append("s1", "q1", "a1")
+    store.append("s1", "q2", "a2")
+    store.append("s1", "q3", "a3")  # 요약이 끝나지 않아도 append는 바로 반환
+
+    assert [m.content for m in store.history("s1")] == ["q3", "a3"]
+    release.set()
+    executor.shutdown(wait=True)
+    # 첫 작업이 pending을 가져가기 전에 두 번째 턴이 밀려나면 한 번에 요약
+    assert store.sessions["s1"].summary in ("q1; a1 | q2; a2", "q1; a1; q2; a2")
+    assert store.stats()["summarized_turns"] == 2
+    assert store.sessions["s1"].pending == []
+
+
+def test_idle_and_lru_sessions_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(conversation_store.time, "time", lambda: now[0])
+
+    store = ConversationStore(idle_seconds=60, max_sessions=2)
+    store.append("a", "q", "a")
+    store.append("b", "q", "a")
+    store.history("a")  # a가 최근 접근
+    store.append("c", "q", "a")  # max_sessions 초과 → 가장 오래 접근하지 않은 b 제거
+    assert set(store.sessions) == {"a", "c"}
+
+    now[0] += 61
+    assert store.history("a") == []
+    assert store.stats()["sessions"] == 0
+    assert store.evicted == 3
@@ -0,0 +1,83 @@
+# test_embedding_cache.py
+# EmbeddingCache 저장 / 재로드 및 여러 프로세스가 같은 디렉토리에 쓰는 경우
+
+import multiprocessing
+
+import numpy as np
+
+from vectorstore.embedding_cache import EmbeddingCache
+
+DIM = 8
+
+
+def _vector(i: int) -> list:
+    return [float(i)] * DIM
+
+
+def test_put_get_and_reload(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=4096)
+    assert cache.get_many(["a"]) == [None]
+
+    cache.put_many(["a", "b"], [_vector(1), _vector(2)])
+    # save 전에도 같은 프로세스에서는 조회 가능
+    assert cache.get_many(["a"])[0].tolist() == _vector(1)
+    cache.save()
+
+    reopened = EmbeddingCache(str(tmp_path), max_entries=4096)
+    a, b, c = reopened.get_many(["a", "b", "c"])
+    assert a.tolist() == _vector(1) and b.tolist() == _vector(2) and c is None
+
+
+def test_sees_entries_saved_by_another_instance(tmp_path):
+    first = EmbeddingCache(str(tmp_path), max_entries=4096)
+    second = EmbeddingCache(str(tmp_path), max_entries=4096)
+
+    first.put_many(["a"], [_vector(1)])
+    first.save()
+    second.put_many(["b"], [_vector(2)])
+    second.save()
+
+    # second는 저장 직전에 first의 index를 다시 읽었으므로 row가 겹치지 않음
+    assert first.get_many(["a", "b"])[1].tolist() == _vector(2)
+    assert second.get_many(["a"])[0].tolist() == _vector(1)
+    assert len(set(second.index.values())) == 2
+
+
+def test_lru_eviction_reuses_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put_many(["a", "b"], [_vector(1), _vector(2)])
+    cache.save()
+    cache.get_many(["a"])  # b가 가장 오래 사용되지 않음
+    cache.put_many(["c"], [_vector(3)])
+    cache.save()
+
+    assert cache.get_many(["a", "b", "c"])[1] is None
+    assert cache.get_many(["c"])[0].tolist() == _vector(3)
+    assert cache.stats()["evictions"] == 1
+
+
+def _writer(path: str, worker: int, count: int):
+    cache = EmbeddingCache(path, max_entries=100000)
+    for i in range(count):
+        value = worker * 100 + i
+        cache.put_many([f"{worker}-{i}"], [_vector(value)])
+        cache.save()
+
+
+def test_concurrent_processes_do_not_share_rows(tmp_path):
+    workers, count = 4, 40
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_writer, args=(str(tmp_path), w, count)) for w in range(workers)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+    cache = EmbeddingCache(str(tmp_path), max_entries=100000)
+    keys = [f"{w}-{i}" for w in range(workers) for i in range(count)]
+    assert len(cache.index) == len(keys)
+    assert len(set(cache.index.values())) == len(keys)
+    for key, vec in zip(keys, cache.get_many(keys)):
+        worker, i = map(int, key.split("-"))
+        assert np.allclose(vec, _vector(worker * 100 + i))
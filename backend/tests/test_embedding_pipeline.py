@@ -0,0 +1,91 @@
+# test_embedding_pipeline.py
+# embed_and_upsert: 공개 API (add_embeddings / add_texts) 로 반영 + 캐시 hit 문서는 재추론 없음
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import embedding_pipeline
+from vectorstore.embedding_cache import CachedEmbeddings, EmbeddingCache
+from vectorstore.embedding_pipeline import embed_and_upsert
+from vectorstore.flat_index import FlatVectorStore
+
+
+class CountingEmbeddings(Embeddings):
+    """텍스트 길이 기반 결정적 벡터 + 추론 횟수 기록"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def _vec(self, text: str) -> list:
+        return [float(len(text)), 1.0, 0.0, 0.5]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vec(text)
+
+
+class TextsOnlyStore:
+    """add_embeddings가 없는 스토어 (Chroma와 같이 add_texts로만 추가)"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.rows = {}
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        for doc_id, text, vec, meta in zip(ids, texts, self.embeddings.embed_documents(list(texts)), metadatas):
+            self.rows[doc_id] = (text, vec, meta)
+        return ids
+
+
+DOCS = [Document(page_content=f"document {'x' * i}", metadata={"paper_id": "p", "i": i}) for i in range(5)]
+IDS = [f"id{i}" for i in range(5)]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(embedding_pipeline, "EMBEDDING_CACHE", True)
+    monkeypatch.setattr(embedding_pipeline, "open_cache", lambda: cache)
+    return cache
+
+
+def test_flat_store_uses_add_embeddings(tmp_path, cache):
+    base = CountingEmbeddings()
+    embeddings = CachedEmbeddings(base, "test-model", cache=cache)
+    store = FlatVectorStore(str(tmp_path / "store"), embeddings)
+
+    stats = embed_and_upsert(store, IDS, DOCS, embeddings, batch_size=2, workers=1)
+    assert stats["embedded"] == 5 and stats["cached"] == 0
+    assert len(base.embedded) == 5
+    assert store.get(ids=["id3"])["documents"] == [DOCS[3].page_content]
+
+    # 두 번째 실행은 전부 캐시 hit → 추론 없음
+    stats = embed_and_upsert(store, IDS, DOCS, embeddings, batch_size=2, workers=1)
+    assert stats["cached"] == 5 and len(base.embedded) == 5
+    assert len(store.get()["ids"]) == 5
+
+
+def test_texts_only_store_reads_vectors_from_cache(cache):
+    base = CountingEmbeddings()
+    embeddings = CachedEmbeddings(base, "test-model", cache=cache)
+    store = TextsOnlyStore(embeddings)
+
+    embed_and_upsert(store, IDS, DOCS, embeddings, batch_size=2, workers=1)
+    # add_texts의 embed_documents는 pipeline이 캐시에 넣은 벡터를 반환 → 문서당 추론 1회
+    assert len(base.embedded) == 5
+    assert store.rows["id2"][1] == [float(len(DOCS[2].page_content)), 1.0, 0.0, 0.5]
+    assert store.rows["id2"][2] == {"paper_id": "p", "i": 2}
+
+
+def test_without_cache_texts_only_store_embeds_once(monkeypatch):
+    monkeypatch.setattr(embedding_pipeline, "EMBEDDING_CACHE", False)
+    base = CountingEmbeddings()
+    store = TextsOnlyStore(base)
+
+    stats = embed_and_upsert(store, IDS, DOCS, base, batch_size=2, workers=1)
+    assert stats["embedded"] == 5
+    assert len(base.embedded) == 5 and set(store.rows) == set(IDS)
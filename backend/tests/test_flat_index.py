@@ -0,0 +1,138 @@
+# test_flat_index.py
+# FlatVectorStore exact / hnsw 검색과 필터 검색 fallback
+
+import multiprocessing
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import flat_index
+from vectorstore.flat_index import FlatVectorStore
+
+DIM = 8
+ROWS = 300
+
+
+class RowEmbeddings(Embeddings):
+    """'doc-<i>' → 고정 난수 벡터 (질의도 같은 텍스트면 같은 벡터)"""
+
+    def __init__(self):
+        self.vectors = np.random.default_rng(0).normal(size=(ROWS, DIM)).astype(np.float32)
+
+    def _vec(self, text: str) -> list:
+        return self.vectors[int(text.split("-")[1])].tolist()
+
+    def embed_documents(self, texts):
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vec(text)
+
+
+def _store(tmp_path, mode: str) -> FlatVectorStore:
+    texts = [f"doc-{i}" for i in range(ROWS)]
+    metadatas = [{"paper_id": "small" if i % 100 == 0 else "large", "year_int": 2000 + i % 20} for i in range(ROWS)]
+    return FlatVectorStore.from_texts(texts, RowEmbeddings(), metadatas=metadatas, ids=texts,
+                                      persist_directory=str(tmp_path), mode=mode)
+
+
+@pytest.mark.parametrize("mode", ["flat", "hnsw"])
+def test_nearest_neighbour_is_itself(tmp_path, mode):
+    pytest.importorskip("hnswlib")
+    store = _store(tmp_path, mode)
+    assert (store.hnsw is not None) == (mode == "hnsw")
+
+    docs = store.similarity_search("doc-42", k=3)
+    assert docs[0].id == "doc-42"
+    assert len(docs) == 3
+
+    filtered = store.similarity_search("doc-42", k=10, filter={"paper_id": "small"})
+    assert sorted(doc.id for doc in filtered) == ["doc-0", "doc-100", "doc-200"]
+    assert store.similarity_search("doc-42", k=3, filter={"paper_id": "missing"}) == []
+
+
+class _FailingHnsw:
+    """필터 검색에서 k개를 찾지 못한 hnswlib 인덱스"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def set_ef(self, ef):
+        pass
+
+    def knn_query(self, q, k, filter=None):
+        self.calls += 1
+        raise RuntimeError("Cannot return the results in a contiguous 2D array. Probably ef or M is too small")
+
+
+def test_hnsw_filter_failure_falls_back_to_exact(tmp_path, monkeypatch):
+    store = _store(tmp_path, "flat")
+    store.hnsw = _FailingHnsw()
+    monkeypatch.setattr(flat_index, "HNSW_EXACT_FILTER_ROWS", 0)  # 작은 필터도 hnsw 먼저 시도
+
+    expected = store.similarity_search("doc-7", k=5, filter={"paper_id": "large"})
+    assert store.hnsw.calls == 1
+    assert expected[0].id == "doc-7"
+    assert all(doc.metadata["paper_id"] == "large" for doc in expected)
+
+
+def test_small_filter_uses_exact_scoring(tmp_path, monkeypatch):
+    store = _store(tmp_path, "flat")
+    store.hnsw = _FailingHnsw()
+    monkeypatch.setattr(flat_index, "HNSW_EXACT_FILTER_ROWS", 10)
+
+    results = store.search_by_vector(RowEmbeddings().embed_query("doc-100"), k=5, filter={"paper_id": "small"})
+    assert store.hnsw.calls == 0
+    assert [row for row, _ in results][0] == 100
+    assert sorted(row for row, _ in results) == [0, 100, 200]
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == pytest.approx(1.0, abs=1e-2)
+
+
+def _add_rows(persist_dir: str, worker: int, count: int):
+    # 각 프로세스가 자기 인스턴스로 한 행씩 추가 (매번 새 세대)
+    store = FlatVectorStore(persist_dir, RowEmbeddings())
+    for i in range(count):
+        store.add_embeddings([(f"w{worker}-{i}", [float(worker + 1), float(i), 1.0])], ids=[f"w{worker}-{i}"])
+
+
+def test_concurrent_writers_keep_every_row(tmp_path):
+    workers, count = 3, 15
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_add_rows, args=(str(tmp_path), w, count)) for w in range(workers)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+    store = FlatVectorStore(str(tmp_path), RowEmbeddings())
+    assert sorted(store.row_of) == sorted(f"w{w}-{i}" for w in range(workers) for i in range(count))
+
+
+def test_stale_instance_applies_changes_on_top_of_newer_generation(tmp_path):
+    first = FlatVectorStore(str(tmp_path), RowEmbeddings())
+    first.add_embeddings([("a", [1.0, 0.0]), ("b", [0.0, 1.0])], ids=["a", "b"])
+    stale = FlatVectorStore(str(tmp_path), RowEmbeddings())
+
+    first.add_embeddings([("c", [1.0, 1.0])], ids=["c"])
+    stale.delete(["a"])
+    stale.add_embeddings([("d", [1.0, -1.0])], ids=["d"])
+
+    reopened = FlatVectorStore(str(tmp_path), RowEmbeddings())
+    assert sorted(reopened.row_of) == ["b", "c", "d"]
+    assert stale.generation == reopened.generation
+
+
+def test_default_ids_do_not_collide_with_existing_rows(tmp_path):
+    store = FlatVectorStore(str(tmp_path), RowEmbeddings())
+    store.add_embeddings([("x", [1.0, 0.0])], ids=["0"])
+    ids = store.add_embeddings([("y", [0.0, 1.0]), ("z", [1.0, 1.0])], metadatas=[{"paper_id": "p"}, {}])
+
+    assert len(set(ids)) == 2 and "0" not in ids
+    assert sorted(store.row_of) == sorted(["0", *ids])
+    # 같은 내용은 같은 id → 다시 추가해도 행이 늘지 않음
+    assert store.add_embeddings([("y", [0.0, 1.0])], metadatas=[{"paper_id": "p"}]) == ids[:1]
+    assert len(store.records) == 3
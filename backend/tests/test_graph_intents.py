@@ -0,0 +1,53 @@
+# test_graph_intents.py
+# 템플릿 적중률 평가 (held-out 질문 세트) + 질문 형태별 intent 판정
+
+import json
+
+import pytest
+
+from graphdb.graph_intents import INTENT_EVAL_PATH, INTENT_EXAMPLES, CYPHER_TEMPLATES, evaluate, match_intent
+
+
+def _normalize(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def test_held_out_set_is_not_the_tuning_set():
+    with open(INTENT_EVAL_PATH, "r", encoding="utf-8") as f:
+        held_out = json.load(f)
+    tuning = {_normalize(item["question"]) for item in INTENT_EXAMPLES}
+
+    assert not {_normalize(item["question"]) for item in held_out} & tuning
+    assert {item["intent"] for item in held_out} - {None} <= set(CYPHER_TEMPLATES)
+
+
+def test_evaluate_held_out_set():
+    result = evaluate()
+    assert result["template_questions"] <= result["questions"]
+    assert result["hit_rate"] == 1.0
+    assert result["correct_rate"] == 1.0, result["mismatched"]
+    assert result["false_positive_rate"] == 0.0, result["mismatched"]
+
+
+@pytest.mark.parametrize("item", INTENT_EXAMPLES, ids=lambda item: item["question"][:40])
+def test_tuning_examples(item):
+    matched = match_intent(item["question"])
+    if item["intent"] is None:
+        assert matched is None
+        return
+    name, params = matched
+    assert name == item["intent"]
+    for key in ("relation", "title"):
+        if key in item:
+            assert params[key] == item[key]
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("What background paper has the highest citation count?", "most_cited"),
+    ("How many citations does the most cited reference have?", "most_cited"),
+    ("How many references are there per relation type?", "relation_counts"),
+    ("How many attention heads does the model use?", None),
+])
+def test_most_cited_takes_precedence_over_counts(question, intent):
+    matched = match_intent(question)
+    assert (matched[0] if matched else None) == intent
@@ -0,0 +1,66 @@
+# test_graph_schema.py
+# work_id 정규화 및 enriched metadata triple 해석
+
+from graphdb.graph_schema import (
+    cited_work_id,
+    citing_work_id,
+    iter_reference_triples,
+    ref_number_key,
+    work_id,
+)
+
+
+def test_work_id_normalises_title():
+    expected = "title:attention is all you need"
+    assert work_id("Attention Is All You Need") == expected
+    assert work_id("  attention  is all\nyou need. ") == expected
+    assert work_id("Attention is all you need", year=2017, doi="10.5555/3295222.3295349") == expected
+
+
+def test_work_id_ignores_punctuation_and_quotes():
+    assert work_id("BERT: Pre-training of Deep Bidirectional Transformers") == work_id(
+        "BERT Pre training of Deep Bidirectional Transformers"
+    )
+    assert work_id("Don't Stop Pretraining") == work_id("Don’t Stop Pretraining")
+    assert work_id("Ｌａｙｅｒ Normalization") == work_id("layer normalization")
+
+
+def test_work_id_falls_back_to_doi_without_title():
+    assert work_id("", doi="https://doi.org/10.1000/ABC") == "doi:10.1000/abc"
+    assert work_id(None, doi=" https://dx.doi.org/10.1000/abc ") == "doi:10.1000/abc"
+    assert work_id("") == "title:"
+
+
+def test_citing_and_cited_share_node():
+    # 업로드 논문 (year / DOI 없음) 과 다른 논문의 reference (year / DOI 있음) 가 같은 노드
+    uploaded = {"title": "Attention Is All You Need."}
+    ref_info = {"year": 2017, "doi": "10.5555/3295222.3295349"}
+    assert citing_work_id(uploaded) == cited_work_id("attention is all you need", ref_info)
+
+
+def test_ref_number_key():
+    assert ref_number_key("[12]") == 12
+    assert ref_number_key(12) == 12
+    assert ref_number_key("12") == 12
+    assert ref_number_key(None) is None
+    assert ref_number_key("n/a") is None
+
+
+def test_iter_reference_triples_reads_both_formats():
+    metadata = {
+        "references": [
+            {"ref_number": "[1]", "ref_title": "Layer normalization", "title": "Layer Normalization"},
+            {"ref_number": "[2]", "ref_title": "Adam"},
+        ],
+        "triples": [
+            ["Attention", "use method of", "Layer normalization", "[1]"],
+            ["Attention", "use method of", "[2] Adam"],
+            ["Attention", "has background on", "Unknown paper"],
+        ],
+    }
+    triples = [(rel, num, title) for rel, num, title, _ in iter_reference_triples(metadata)]
+    assert triples == [
+        ("use method of", 1, "Layer Normalization"),
+        ("use method of", 2, "Adam"),
+        ("has background on", None, "Unknown paper"),
+    ]
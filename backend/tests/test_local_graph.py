@@ -0,0 +1,148 @@
+# test_local_graph.py
+# LocalGraph 쓰기 / 조회 / 저장-로드 및 LocalGraphBuilder 적재
+
+import threading
+
+from graphdb import local_graph
+from graphdb.graph_schema import GRAPH_STATUS_NOT_RELATIONAL, GRAPH_STATUS_OK, work_id
+from graphdb.local_graph import LocalGraph, LocalGraphBuilder, run_local_graph_qa_with_status
+
+SRC = work_id("Attention Is All You Need")
+RESNET = work_id("Deep Residual Learning for Image Recognition")
+ADAM = work_id("Adam: A Method for Stochastic Optimization")
+LSTM = work_id("Long Short-Term Memory")
+
+METADATA = {
+    "title": "Attention Is All You Need",
+    "abstract_original": "The dominant sequence transduction models ...",
+    "references": [
+        {"ref_number": "[1]", "ref_title": "Deep Residual Learning for Image Recognition",
+         "year": 2016, "citation_count": 200000, "authors": ["Kaiming He"]},
+        {"ref_number": "[2]", "ref_title": "Adam: A Method for Stochastic Optimization",
+         "year": "2015", "citation_count": "150000", "authors": ["Diederik P. Kingma"]},
+        {"ref_number": "[3]", "ref_title": "Long Short-Term Memory",
+         "year": 1997, "citation_count": 90000, "authors": ["Sepp Hochreiter"]},
+    ],
+    "triples": [
+        ["Attention Is All You Need", "use method of", "Deep Residual Learning for Image Recognition", "[1]"],
+        ["Attention Is All You Need", "use method of", "[2] Adam: A Method for Stochastic Optimization"],
+        ["Attention Is All You Need", "compares or contrasts with", "Long Short-Term Memory", "3"],
+    ],
+}
+
+
+def _small_graph(path) -> LocalGraph:
+    graph = LocalGraph(str(path))
+    graph.merge_node(SRC, title="Attention Is All You Need")
+    graph.merge_node(RESNET, title="Deep Residual Learning for Image Recognition", citation_count=200000)
+    graph.merge_node(ADAM, title="Adam: A Method for Stochastic Optimization", citation_count=150000)
+    graph.merge_node(LSTM, title="Long Short-Term Memory", citation_count=90000)
+    graph.merge_edge(SRC, "USE_METHOD_OF", RESNET, ref_number=1)
+    graph.merge_edge(SRC, "USE_METHOD_OF", ADAM, ref_number=2)
+    graph.merge_edge(SRC, "COMPARES_OR_CONTRASTS_WITH", LSTM, ref_number=3)
+    return graph
+
+
+def test_queries(tmp_path):
+    graph = _small_graph(tmp_path / "graph.json.gz")
+
+    assert graph.count_by_relation() == {"USE_METHOD_OF": 2, "COMPARES_OR_CONTRASTS_WITH": 1}
+    assert graph.count_by_relation(source=RESNET) == {}
+    assert {n["work_id"] for n in graph.references("USE_METHOD_OF", source=SRC)} == {RESNET, ADAM}
+    assert [n["work_id"] for n in graph.top_cited(limit=2)] == [RESNET, ADAM]
+    assert [n["work_id"] for n in graph.top_cited(relation="COMPARES_OR_CONTRASTS_WITH")] == [LSTM]
+    assert [n["work_id"] for n in graph.find_by_title("long short-term")] == [LSTM]
+
+
+def test_merge_is_idempotent(tmp_path):
+    graph = _small_graph(tmp_path / "graph.json.gz")
+    graph.merge_edge(SRC, "USE_METHOD_OF", RESNET, ref_number=1)
+    graph.merge_node(RESNET, citation_count=210000)
+
+    assert graph.count_by_relation()["USE_METHOD_OF"] == 2
+    # 쓰기 이후 citation 정렬 인덱스가 다시 계산되는지
+    assert graph.top_cited()[0]["citation_count"] == 210000
+
+
+def test_save_load_round_trip(tmp_path):
+    path = tmp_path / "graph.json.gz"
+    graph = _small_graph(path)
+    graph.save()
+
+    loaded = LocalGraph(str(path))
+    assert loaded.nodes == graph.nodes
+    assert loaded.rel_index == graph.rel_index
+    assert loaded.edge_props == graph.edge_props
+    assert loaded.title_index == graph.title_index
+    assert [n["work_id"] for n in loaded.top_cited(limit=3)] == [RESNET, ADAM, LSTM]
+
+
+def test_remove_outgoing(tmp_path):
+    graph = _small_graph(tmp_path / "graph.json.gz")
+    # 다른 논문도 RESNET을 인용 → SRC 삭제 후에도 RESNET 노드는 남아야 함
+    other = work_id("BERT")
+    graph.merge_node(other, title="BERT")
+    graph.merge_edge(other, "USE_METHOD_OF", RESNET)
+
+    assert graph.remove_outgoing(SRC) == 3
+    assert SRC not in graph.nodes
+    assert ADAM not in graph.nodes and LSTM not in graph.nodes
+    assert RESNET in graph.nodes
+    assert graph.count_by_relation() == {"USE_METHOD_OF": 1}
+    assert graph.find_by_title("adam") == []
+
+
+def test_builder_and_qa(isolated_state, monkeypatch):
+    monkeypatch.setattr(local_graph, "_graph", None)
+    path = str(isolated_state / "graph.json.gz")
+
+    builder = LocalGraphBuilder(path)
+    builder.insert_triples_with_metadata(METADATA)
+    # QA는 기본 경로의 그래프를 읽으므로 방금 적재한 그래프로 대체
+    monkeypatch.setattr(local_graph, "get_local_graph", lambda path=None: builder.graph)
+
+    reloaded = LocalGraph(path)
+    assert reloaded.count_by_relation(source=SRC) == {"USE_METHOD_OF": 2, "COMPARES_OR_CONTRASTS_WITH": 1}
+    assert reloaded.edge_props[(SRC, "USE_METHOD_OF", ADAM)] == {"ref_number": 2}
+    assert reloaded.nodes[ADAM]["year"] == 2015 and reloaded.nodes[ADAM]["citation_count"] == 150000
+
+    status, answer = run_local_graph_qa_with_status("Who wrote the most cited paper?")
+    assert status == GRAPH_STATUS_OK
+    assert "Deep Residual Learning" in answer
+
+    status, _ = run_local_graph_qa_with_status("transformer 논문에 대해 설명해줘")
+    assert status == GRAPH_STATUS_NOT_RELATIONAL
+
+
+def test_queries_while_writing(tmp_path):
+    graph = _small_graph(tmp_path / "graph.json")
+    errors, done = [], threading.Event()
+
+    def write():
+        for i in range(3000):
+            node = f"w:{i}"
+            graph.merge_node(node, title=f"Paper {i}", citation_count=i)
+            graph.merge_edge(SRC, "USE_METHOD_OF", node)
+            graph.merge_edge(node, f"REL_{i % 50}", RESNET)
+            if i % 3 == 0:
+                graph.remove_outgoing(node)
+        done.set()
+
+    def read():
+        try:
+            while not done.is_set():
+                graph.references()
+                graph.references("USE_METHOD_OF", source=SRC)
+                graph.count_by_relation()
+                graph.top_cited(limit=3, relation="USE_METHOD_OF")
+                graph.find_by_title("paper 1")
+        except RuntimeError as e:  # dictionary changed size during iteration
+            errors.append(e)
+            done.set()
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
@@ -0,0 +1,61 @@
+# test_onnx_embeddings.py
+# MiniLM (torch) 와 ONNX int8 백엔드의 top-k 검색 결과 동등성
+# - optimum / onnxruntime / langchain_huggingface 가 없거나 모델을 받을 수 없으면 skip
+
+import os
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("optimum.onnxruntime")
+pytest.importorskip("transformers")
+pytest.importorskip("langchain_huggingface")
+
+from vectorstore.onnx_embeddings import ONNX_MODEL_DIR, export_quantized, load_base_embeddings, retrieval_overlap
+
+K = 3
+MIN_OVERLAP = 0.9  # onnx_embeddings CLI의 --min-overlap 기본값과 같은 기준
+
+DOCS = [
+    "The Transformer is based solely on attention mechanisms, dispensing with recurrence and convolutions entirely.",
+    "Long short-term memory networks address the vanishing gradient problem in recurrent neural networks.",
+    "Deep residual learning eases the training of very deep convolutional networks with identity shortcuts.",
+    "Adam is an algorithm for first-order gradient-based optimization based on adaptive estimates of moments.",
+    "Layer normalization computes normalization statistics over the hidden units of a single training case.",
+    "Dropout prevents neural networks from overfitting by randomly dropping units during training.",
+    "Byte pair encoding segments rare words into subword units for open-vocabulary translation.",
+    "Neural machine translation jointly learns to align and translate with a soft attention over source words.",
+    "Convolutional sequence to sequence models use gated linear units and attention in every decoder layer.",
+    "Label smoothing regularizes the classifier by mixing the target distribution with a uniform prior.",
+    "Beam search keeps the most probable partial hypotheses at each decoding step.",
+    "Sinusoidal positional encodings inject information about token order into the embeddings.",
+]
+QUESTIONS = [
+    "Which model replaces recurrence with attention?",
+    "How do residual connections help deep networks?",
+    "What optimizer uses adaptive moment estimates?",
+    "How is overfitting reduced during training?",
+    "How are rare words handled in translation?",
+    "How does the model know the order of tokens?",
+    "What is the vanishing gradient problem solution for RNNs?",
+    "How is attention used for alignment in translation?",
+]
+
+
+@pytest.fixture(scope="module")
+def backends():
+    try:
+        if not os.path.exists(os.path.join(ONNX_MODEL_DIR, "model_quantized.onnx")):
+            export_quantized()
+        return load_base_embeddings("torch"), load_base_embeddings("onnx")
+    except (OSError, ValueError) as e:  # 모델 다운로드 불가 (오프라인 등)
+        pytest.skip(f"MiniLM / ONNX 모델을 불러올 수 없음: {e}")
+
+
+def test_onnx_int8_matches_minilm_top_k(backends):
+    reference, candidate = backends
+    overlap = retrieval_overlap(reference, candidate, QUESTIONS, DOCS, k=K)
+
+    assert overlap["questions"] == len(QUESTIONS)
+    assert overlap["mean_overlap_at_k"] >= MIN_OVERLAP, overlap
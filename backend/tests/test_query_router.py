@@ -0,0 +1,54 @@
+# test_query_router.py
+# router 평가 세트 분리 (tuning / held-out)
+
+import json
+
+import pytest
+
+from graphdb.query_router import (
+    ROUTE_CHITCHAT,
+    ROUTE_CONTENT,
+    ROUTE_RELATIONAL,
+    ROUTER_EVAL_PATH,
+    ROUTER_TUNING_PATH,
+    QueryRouter,
+    evaluate,
+)
+
+
+def _questions(path: str) -> set:
+    with open(path, "r", encoding="utf-8") as f:
+        return {" ".join(item["question"].lower().split()) for item in json.load(f)}
+
+
+def test_held_out_set_is_disjoint_from_tuning_set():
+    assert not _questions(ROUTER_EVAL_PATH) & _questions(ROUTER_TUNING_PATH)
+
+
+def test_evaluate_defaults_to_held_out_set():
+    result = evaluate(QueryRouter(embed_fn=None))
+    assert result["questions"] == len(_questions(ROUTER_EVAL_PATH))
+    assert sum(sum(row.values()) for row in result["confusion"].values()) == result["questions"]
+
+
+def test_no_relational_question_skips_the_graph_branch():
+    # relational → content 오분류는 graph 답변을 조용히 잃으므로 held-out / tuning 모두 0건이어야 함
+    router = QueryRouter(embed_fn=None)
+    for path in (ROUTER_EVAL_PATH, ROUTER_TUNING_PATH):
+        result = evaluate(router, path)
+        assert result["missed_relational"] == 0, result["misrouted"]
+    assert evaluate(router)["accuracy"] >= 0.8
+
+
+@pytest.mark.parametrize("question, route", [
+    ("Does the paper cite ResNet?", ROUTE_RELATIONAL),
+    ("What papers does the transformer build on?", ROUTE_RELATIONAL),
+    ("Layer Normalization 논문은 누가 썼어?", ROUTE_RELATIONAL),
+    ("참고문헌 중에 2015년 이전 논문은 몇 편이야?", ROUTE_RELATIONAL),
+    ("What hardware was the model trained on?", ROUTE_RELATIONAL),  # 학술 단서만 있으면 graph 경로 유지
+    ("Explain residual dropout in this architecture.", ROUTE_CONTENT),
+    ("How long did training take?", ROUTE_CONTENT),
+    ("안녕", ROUTE_CHITCHAT),
+])
+def test_keyword_routes_without_embeddings(question, route):
+    assert QueryRouter(embed_fn=None).classify(question)[0] == route
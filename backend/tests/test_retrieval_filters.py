@@ -0,0 +1,79 @@
+# test_retrieval_filters.py
+# 질문 → 필터 추론, 필터 → where 변환 (Chroma 문법, flat 스토어 filter_mask와 호환)
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from vectorstore.flat_index import FlatVectorStore
+from vectorstore.retrieval_filters import (
+    SOURCE_BODY,
+    SOURCE_REFERENCE,
+    clean_filters,
+    infer_filters,
+    to_where,
+)
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("GraphSAGE 관련 레퍼런스를 알려줘", {"source": SOURCE_REFERENCE}),
+    ("references published after 2015 about attention", {"source": SOURCE_REFERENCE, "year_min": 2015}),
+    ("2014년부터 2016년까지 나온 참고문헌은?", {"source": SOURCE_REFERENCE, "year_min": 2014, "year_max": 2016}),
+    ("papers published in 2017", {"source": SOURCE_REFERENCE, "year_min": 2017, "year_max": 2017}),
+    ("본문에서 positional encoding 설명해줘", {"source": SOURCE_BODY}),
+    ("transformer 논문에 대해 설명해줘", {}),
+    ("what was the reference implementation's learning rate?", {}),
+    ("how was the 2015-2017 data split?", {}),
+    ("what is the intersection of the two masks?", {}),
+])
+def test_infer_filters(question, expected):
+    assert infer_filters(question) == expected
+
+
+def test_clean_filters_drops_empty_and_unknown_fields():
+    assert clean_filters(None) == {}
+    assert clean_filters({"source": "", "year_min": None, "paper_id": "p1", "title": "x"}) == {"paper_id": "p1"}
+    with pytest.raises(ValueError):
+        clean_filters({"source": "blog post"})
+
+
+def test_to_where():
+    assert to_where({}) is None
+    assert to_where({"source": SOURCE_BODY}) == {"source": SOURCE_BODY}
+    assert to_where({"year_max": "2017"}) == {"year_int": {"$lte": 2017}}
+    assert to_where({"year_min": 2014, "year_max": 2016, "source": SOURCE_REFERENCE, "paper_id": "p1"}) == {"$and": [
+        {"source": SOURCE_REFERENCE},
+        {"paper_id": "p1"},
+        {"year_int": {"$gte": 2014}},
+        {"year_int": {"$lte": 2016}},
+    ]}
+
+
+class ConstantEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [[1.0, float(i % 3)] for i in range(len(texts))]
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+def test_where_applies_to_flat_store(tmp_path):
+    rows = [
+        ("body", "p1", SOURCE_BODY, None),
+        ("ref-2013", "p1", SOURCE_REFERENCE, 2013),
+        ("ref-2015", "p1", SOURCE_REFERENCE, 2015),
+        ("ref-2017", "p2", SOURCE_REFERENCE, 2017),
+    ]
+    metadatas = [{"paper_id": paper, "source": source, **({"year_int": year} if year else {})}
+                 for _, paper, source, year in rows]
+    ids = [doc_id for doc_id, *_ in rows]
+    store = FlatVectorStore.from_texts(ids, ConstantEmbeddings(), metadatas=metadatas, ids=ids,
+                                       persist_directory=str(tmp_path))
+
+    def search(filters):
+        return sorted(doc.id for doc in store.similarity_search("q", k=10, filter=to_where(filters)))
+
+    assert search({}) == sorted(ids)
+    assert search({"source": SOURCE_BODY}) == ["body"]
+    assert search({"year_min": 2014}) == ["ref-2015", "ref-2017"]
+    assert search({"paper_id": "p1", "source": SOURCE_REFERENCE, "year_max": 2015}) == ["ref-2013", "ref-2015"]
+    assert search({"paper_id": "p2", "year_max": 2015}) == []
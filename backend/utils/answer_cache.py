@@ -0,0 +1,150 @@
+# answer_cache.py
+# /query 최종 답변 캐시 (질문 임베딩 최근접 이웃 조회, 코퍼스 변경 시 무효화)
+
+import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from graphdb.cypher_cache import normalize_question
+from utils.versioning import get_version
+
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+
+
+def corpus_version() -> str:
+    """그래프 + 벡터 인덱스 쓰기 버전 (/upload 시 둘 다 증가)"""
+    return f"g{get_version('graph')}:v{get_version('vector')}"
+
+
+def _unit(vec) -> list:
+    norm = math.sqrt(sum(x * x for x in vec))
+    return [x / norm for x in vec] if norm else list(vec)
+
+
+class AnswerCache:
+    """
+    (mode, top_k, 코퍼스 버전, 질문 임베딩) → (answer, sources)
+    - 같은 scope (mode, top_k, 코퍼스 버전) 안에서 정규화된 질문이 같으면 바로 hit
+    - embed_fn이 있으면 코사인 유사도가 similarity_threshold 이상인 가장 가까운 질문도 hit
+    - 코퍼스 버전이 바뀐 entry와 TTL이 지난 entry는 조회 시 제거
+    - max_entries 초과 시 LRU 제거
+    """
+
+    def __init__(
+        self,
+        embed_fn=None,
+        similarity_threshold: float = ANSWER_CACHE_SIMILARITY,
+        ttl_seconds: int = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_SIZE,
+    ):
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self._embeddings = OrderedDict()  # 정규화된 질문 → 임베딩 (lookup/store 중복 계산 방지)
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+
+    def _embed(self, norm: str):
+        if self.embed_fn is None or self.similarity_threshold <= 0:
+            return None
+        with self._lock:
+            if norm in self._embeddings:
+                return self._embeddings[norm]
+        vec = _unit(self.embed_fn(norm))
+        with self._lock:
+            self._embeddings[norm] = vec
+            while len(self._embeddings) > 256:
+                self._embeddings.popitem(last=False)
+        return vec
+
+    def _purge(self, version: str, now: float):
+        # 호출 측에서 lock 보유
+        for key in [k for k, e in self.entries.items()
+                    if e["version"] != version or now - e["created_at"] > self.ttl_seconds]:
+            del self.entries[key]
+            self.expired += 1
+
+    def lookup(self, question: str, mode: str, top_k: int):
+        """캐시된 {"answer", "sources"} (없으면 None)"""
+        norm = normalize_question(question)
+        scope = f"{mode}:{top_k}"
+        version = corpus_version()
+        now = time.time()
+
+        with self._lock:
+            self._purge(version, now)
+            key = f"{scope}:{norm}"
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return {"answer": entry["answer"], "sources": entry["sources"]}
+
+        query_vec = self._embed(norm)
+        if query_vec is not None:
+            with self._lock:
+                best_key, best_score = None, self.similarity_threshold
+                for key, entry in self.entries.items():
+                    if entry["scope"] != scope or entry["embedding"] is None:
+                        continue
+                    score = sum(x * y for x, y in zip(query_vec, entry["embedding"]))
+                    if score >= best_score:
+                        best_key, best_score = key, score
+                if best_key is not None:
+                    entry = self.entries[best_key]
+                    self.entries.move_to_end(best_key)
+                    self.hits += 1
+                    self.semantic_hits += 1
+                    print(f"♻️ 유사 질문 답변 재사용 (sim={best_score:.3f}): {entry['question']}")
+                    return {"answer": entry["answer"], "sources": entry["sources"]}
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, question: str, mode: str, top_k: int, answer: str, sources: list):
+        """sources는 응답 형식으로 변환된 (JSON 직렬화 가능한) dict 리스트"""
+        norm = normalize_question(question)
+        scope = f"{mode}:{top_k}"
+        embedding = self._embed(norm)
+
+        with self._lock:
+            key = f"{scope}:{norm}"
+            self.entries[key] = {
+                "question": norm,
+                "scope": scope,
+                "version": corpus_version(),
+                "created_at": time.time(),
+                "embedding": embedding,
+                "answer": answer,
+                "sources": sources,
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "corpus_version": corpus_version(),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
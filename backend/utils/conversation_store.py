@@ -0,0 +1,185 @@
+# conversation_store.py
+# 세션별 대화 히스토리 저장소 (토큰 기준 sliding window + 선택적 요약 + 유휴 세션 제거)
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.token_counter import count_tokens, truncate_to_tokens
+
+CONVERSATION_MAX_TOKENS = int(os.getenv("CONVERSATION_MAX_TOKENS", "2000"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300"))
+CONVERSATION_IDLE_SECONDS = int(os.getenv("CONVERSATION_IDLE_SECONDS", "1800"))
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+CONVERSATION_SUMMARY = os.getenv("CONVERSATION_SUMMARY", "false").lower() == "true"
+CONVERSATION_SUMMARY_WORKERS = int(os.getenv("CONVERSATION_SUMMARY_WORKERS", "2"))
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and RefNavi, an academic assistant.
+Keep the papers, methods and questions the user referred to, so that follow-up questions like "that paper" can still be resolved.
+Write in the same language as the conversation, in at most {max_tokens} tokens.
+
+Current summary:
+{summary}
+
+New turns to fold in:
+{turns}
+
+Updated summary:"""
+
+
+def summarize_with_llm(summary: str, messages: list, max_tokens: int = CONVERSATION_SUMMARY_TOKENS) -> str:
+    """window에서 밀려난 메시지를 기존 요약에 합침 (LLM 1회 호출)"""
+    from langchain_openai import ChatOpenAI
+
+    llm = ChatOpenAI(model=os.getenv("CONVERSATION_SUMMARY_MODEL", "gpt-4"), temperature=0)
+    turns = "\n".join(f"{m.type}: {m.content}" for m in messages)
+    prompt = SUMMARY_PROMPT.format(max_tokens=max_tokens, summary=summary or "(none)", turns=turns)
+    return llm.invoke(prompt).content.strip()
+
+
+# ✅ 요약 LLM 호출을 요청 경로 밖에서 실행하는 executor (query_endpoint에서 ConversationStore에 전달)
+summary_executor = ThreadPoolExecutor(max_workers=CONVERSATION_SUMMARY_WORKERS)
+
+
+class _Session:
+    def __init__(self):
+        self.turns = []  # [(HumanMessage, AIMessage, 토큰 수)]
+        self.tokens = 0
+        self.summary = ""
+        self.pending = []  # window에서 밀려났지만 아직 요약에 반영되지 않은 메시지
+        self.summary_lock = threading.Lock()  # 세션별 요약 갱신 직렬화 (읽기-요약-쓰기 사이 덮어쓰기 방지)
+        self.last_access = time.time()
+
+
+class ConversationStore:
+    """
+    session_id → 대화 히스토리
+    - 최근 턴부터 max_tokens 이내만 유지 (오래된 턴은 왕복 단위로 제거)
+    - summarize_fn이 있으면 제거된 턴을 rolling summary로 접어서 SystemMessage로 앞에 붙임
+      - 같은 세션의 요약 갱신은 세션별 lock으로 직렬화 (동시 append가 서로의 요약을 덮어쓰지 않음)
+      - executor를 주면 요약 LLM 호출을 그 executor에서 실행 (요청은 기다리지 않고, 요약이 끝나기 전 history에는
+        밀려난 턴이 빠진 이전 요약이 붙음) / executor=None 이면 append 안에서 실행 (window를 넘긴 턴의 응답이 LLM 1회만큼 늦어짐)
+    - idle_seconds 동안 접근이 없는 세션 / max_sessions 초과 세션은 LRU로 제거
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = CONVERSATION_MAX_TOKENS,
+        idle_seconds: int = CONVERSATION_IDLE_SECONDS,
+        max_sessions: int = CONVERSATION_MAX_SESSIONS,
+        summarize_fn=None,
+        summary_tokens: int = CONVERSATION_SUMMARY_TOKENS,
+        executor=None,
+    ):
+        self.max_tokens = max_tokens
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self.summarize_fn = summarize_fn
+        self.summary_tokens = summary_tokens
+        self.executor = executor
+        self.sessions = OrderedDict()
+        self.evicted = 0
+        self.summarized_turns = 0
+        self._lock = threading.Lock()
+
+    def _evict_idle(self, now: float):
+        # 호출 측에서 lock 보유 / OrderedDict가 접근 순서이므로 앞쪽만 확인
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if now - session.last_access <= self.idle_seconds and len(self.sessions) <= self.max_sessions:
+                break
+            del self.sessions[session_id]
+            self.evicted += 1
+
+    def history(self, session_id: str) -> list:
+        """프롬프트에 넣을 메시지 리스트 (복사본; 요약이 있으면 맨 앞에 SystemMessage)"""
+        if not session_id:
+            return []
+
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            session = self.sessions.get(session_id)
+            if session is None:
+                return []
+            session.last_access = now
+            self.sessions.move_to_end(session_id)
+
+            messages = [SystemMessage(content=f"Summary of the earlier conversation:\n{session.summary}")] if session.summary else []
+            for human, ai, _ in session.turns:
+                messages.extend([human, ai])
+            return messages
+
+    def append(self, session_id: str, question: str, answer: str):
+        """질문/답변 1턴 추가 후 token window를 넘는 오래된 턴 제거 (요약 설정 시 요약에 반영)"""
+        if not session_id:
+            return
+
+        turn_tokens = count_tokens(question) + count_tokens(answer)
+        now = time.time()
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = _Session()
+            session.turns.append((HumanMessage(content=question), AIMessage(content=answer), turn_tokens))
+            session.tokens += turn_tokens
+            session.last_access = now
+            self.sessions.move_to_end(session_id)
+
+            # 마지막 턴은 window보다 커도 유지
+            dropped = []
+            while session.tokens > self.max_tokens and len(session.turns) > 1:
+                human, ai, tokens = session.turns.pop(0)
+                session.tokens -= tokens
+                dropped.extend([human, ai])
+            if self.summarize_fn is not None:
+                session.pending.extend(dropped)
+            self._evict_idle(now)
+
+        if dropped and self.summarize_fn is not None:
+            if self.executor is not None:
+                self.executor.submit(self._summarize, session)
+            else:
+                self._summarize(session)
+
+    def _summarize(self, session: _Session):
+        """세션의 pending 메시지를 요약에 반영 (세션별 lock 안에서 최신 요약을 읽고 씀)"""
+        with session.summary_lock:
+            with self._lock:
+                dropped, session.pending = session.pending, []
+                previous_summary = session.summary
+            if not dropped:  # 앞선 요약 작업이 이미 반영
+                return
+            try:
+                summary = self.summarize_fn(previous_summary, dropped)
+                summary = truncate_to_tokens(summary, self.summary_tokens)
+            except Exception as e:
+                print(f"⚠️ 대화 요약 실패 (요약 없이 진행): {e}")
+                return
+            with self._lock:
+                session.summary = summary
+                self.summarized_turns += len(dropped) // 2
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict_idle(time.time())
+            tokens = [s.tokens for s in self.sessions.values()]
+            return {
+                "sessions": len(self.sessions),
+                "max_tokens": self.max_tokens,
+                "avg_window_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0,
+                "max_window_tokens": max(tokens) if tokens else 0,
+                "summarized_turns": self.summarized_turns,
+                "evicted": self.evicted,
+            }
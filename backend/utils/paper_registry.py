@@ -0,0 +1,152 @@
+# paper_registry.py
+# 업로드된 논문 목록 + 논문별 메타데이터 디렉토리 (utils/metadata/papers/<key>/)
+# - 업로드마다 integrated / enriched 메타데이터를 논문 디렉토리에 보관 (다른 논문 업로드로 덮어쓰지 않음)
+# - 벡터 DB는 컬렉션 하나를 paper_id 메타데이터로 나눠 씀 (논문별 검색은 paper_id 필터)
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from graphdb.graph_schema import citing_work_id
+
+PAPERS_DIR = os.getenv("REFNAVI_PAPERS_DIR", os.path.join(os.path.dirname(__file__), "metadata/papers"))
+REGISTRY_FILENAME = "papers.json"
+
+_lock = threading.Lock()
+_cached = {"mtime": None, "papers": {}}
+
+
+def paper_key(paper_id: str) -> str:
+    """paper_id ('title:...') → 디렉토리 이름으로 쓸 수 있는 짧은 key"""
+    return hashlib.sha1(paper_id.encode("utf-8")).hexdigest()[:16]
+
+
+def paper_dir(paper_id: str) -> str:
+    return os.path.join(PAPERS_DIR, paper_key(paper_id))
+
+
+def _registry_path() -> str:
+    return os.path.join(PAPERS_DIR, REGISTRY_FILENAME)
+
+
+def _read() -> dict:
+    # versioning과 같은 방식: mtime이 바뀐 경우에만 다시 읽음
+    try:
+        mtime = os.stat(_registry_path()).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if mtime != _cached["mtime"]:
+        with open(_registry_path(), "r", encoding="utf-8") as f:
+            _cached["papers"] = json.load(f)
+        _cached["mtime"] = mtime
+    return _cached["papers"]
+
+
+def _write(papers: dict):
+    os.makedirs(PAPERS_DIR, exist_ok=True)
+    tmp_path = f"{_registry_path()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(papers, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, _registry_path())
+    _cached["mtime"] = None
+
+
+def register_paper(integrated_path: str, enriched_path: str = None, pdf_filename: str = None) -> dict:
+    """
+    업로드 결과 메타데이터를 논문 디렉토리로 복사하고 목록에 등록 (같은 논문이면 갱신)
+    - 이미 논문 디렉토리 안의 파일이면 복사하지 않음
+    - 반환: 등록 정보 (paper_id, title, year, references, dir, metadata_path, ...)
+    """
+    with open(integrated_path, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    paper_id = citing_work_id(metadata)
+
+    target_dir = paper_dir(paper_id)
+    os.makedirs(target_dir, exist_ok=True)
+    for src, name in ((integrated_path, "integrated_metadata.json"), (enriched_path, "enriched_metadata.json")):
+        dst = os.path.join(target_dir, name)
+        if src and os.path.exists(src) and os.path.abspath(src) != os.path.abspath(dst):
+            shutil.copyfile(src, dst)
+
+    entry = {
+        "paper_id": paper_id,
+        "title": metadata.get("title", ""),
+        "year": metadata.get("year"),
+        "references": len(metadata.get("references", [])),
+        "pdf_filename": pdf_filename,
+        "dir": target_dir,
+        "metadata_path": os.path.join(target_dir, "integrated_metadata.json"),
+        "uploaded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with _lock:
+        papers = dict(_read())
+        papers[paper_id] = entry
+        _write(papers)
+    print(f"🗂️ 논문 등록: {entry['title']} ({paper_id})")
+    return entry
+
+
+def unregister_paper(paper_id: str) -> dict:
+    """목록에서 제거 + 논문 디렉토리 삭제 (없으면 None)"""
+    with _lock:
+        papers = dict(_read())
+        entry = papers.pop(paper_id, None)
+        if entry is None:
+            return None
+        _write(papers)
+    shutil.rmtree(entry["dir"], ignore_errors=True)
+    return entry
+
+
+def get_paper(paper_id: str) -> dict:
+    with _lock:
+        return _read().get(paper_id)
+
+
+def list_papers() -> list:
+    """등록된 논문 목록 (최근 업로드 순)"""
+    with _lock:
+        papers = list(_read().values())
+    return sorted(papers, key=lambda p: p.get("uploaded_at") or "", reverse=True)
+
+
+def find_paper_in_question(question: str) -> str:
+    """
+    질문이 가리키는 업로드 논문의 paper_id (graph 개수 / 목록 질문을 인용하는 논문 기준으로 한정할 때 사용)
+    - 등록된 논문 title (또는 ':' 앞 부분) 이 질문에 들어 있으면 그 논문
+    - 등록된 논문이 하나뿐이면 그 논문, 그 외에는 None (전체 논문)
+    """
+    q = " ".join(question.lower().split())
+    papers = list_papers()
+    for paper in papers:
+        title = " ".join((paper.get("title") or "").lower().split())
+        if title and (title in q or title.split(":")[0].strip() in q):
+            return paper["paper_id"]
+    return papers[0]["paper_id"] if len(papers) == 1 else None
+
+
+def load_paper_metadata(paper_id: str) -> dict:
+    entry = get_paper(paper_id)
+    if entry is None:
+        return None
+    with open(entry["metadata_path"], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="기존 통합 메타데이터 JSON을 논문 목록에 등록 (멀티 논문 구조 도입 전 데이터용)")
+    parser.add_argument("integrated_paths", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.integrated_paths:
+        enriched = os.path.join(os.path.dirname(path), "enriched_metadata.json")
+        register_paper(path, enriched if os.path.exists(enriched) else None)
+    print(json.dumps(list_papers(), ensure_ascii=False, indent=2))
@@ -262,7 +262,7 @@ def classify_all_relations(metadata: Dict) -> List[Dict]:
         return []
 
 # ✅ triple 리스트 생성: flatten 구조로 변환
-def generate_triples(metadata: Dict) -> List[List[str]]:
+def generate_triples(metadata: Dict) -> List[List]:
     refs = {ref["ref_number"]: ref.get("ref_title", "") for ref in metadata.get("references", [])}
     predictions = classify_all_relations(metadata)
     source_title = metadata.get("title", "")
@@ -272,10 +272,9 @@ def generate_triples(metadata: Dict) -> List[List[str]]:
         ref_num = pred.get("ref_number")
         raw_title = pred.get("ref_title") or refs.get(ref_num, "Unknown Reference")
         relations = pred.get("relations", ["cites"])
-        # ✅ ref_num 붙인 제목
-        ref_title = f"[{ref_num}] {raw_title}"
+        # ✅ [source, relation, target 제목, ref_number] (ref_number는 관계 속성으로 저장됨)
         for relation in relations:
-            triples.append([source_title, relation, ref_title])
+            triples.append([source_title, relation, raw_title, ref_num])
             print(f"[✓] [{ref_num}] {relation} → {raw_title}")
     return triples
 
@@ -0,0 +1,26 @@
+# token_counter.py
+# 프롬프트 토큰 수 계산 (GPT-4 토크나이저 기준)
+
+from functools import lru_cache
+
+import tiktoken
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    return len(_encoding(model).encode(text or ""))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4") -> str:
+    """max_tokens 이내로 자른 텍스트"""
+    tokens = _encoding(model).encode(text or "")
+    if len(tokens) <= max_tokens:
+        return text
+    return _encoding(model).decode(tokens[:max_tokens])
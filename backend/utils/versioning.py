@@ -0,0 +1,71 @@
+# versioning.py
+# 그래프 / 벡터 인덱스 쓰기 버전 카운터 (프로세스 간 공유되도록 파일에 저장)
+# - 쓰기 쪽 (GraphBuilder, build_vector_db) 이 bump_version 호출
+# - 읽기 쪽 (스키마, 캐시, 로드된 인덱스) 은 get_version 값이 바뀔 때만 갱신
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 스레드 잠금만 사용
+    fcntl = None
+
+VERSIONS_PATH = os.getenv(
+    "REFNAVI_VERSIONS_PATH",
+    os.path.join(os.path.dirname(__file__), "metadata/.versions.json"),
+)
+
+_lock = threading.Lock()
+_cached = {"mtime": None, "versions": {}}
+
+
+def _read_versions() -> dict:
+    # 파일 mtime이 바뀐 경우에만 다시 읽음 (조회 비용 = stat 1회)
+    try:
+        mtime = os.stat(VERSIONS_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    if mtime != _cached["mtime"]:
+        with open(VERSIONS_PATH, "r", encoding="utf-8") as f:
+            _cached["versions"] = json.load(f)
+        _cached["mtime"] = mtime
+    return _cached["versions"]
+
+
+def get_version(name: str) -> int:
+    with _lock:
+        return int(_read_versions().get(name, 0))
+
+
+@contextmanager
+def _file_lock():
+    """다른 프로세스 (여러 uvicorn worker / 빌드 스크립트) 의 bump_version과 read-modify-write 직렬화"""
+    os.makedirs(os.path.dirname(os.path.abspath(VERSIONS_PATH)), exist_ok=True)
+    with open(f"{VERSIONS_PATH}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def bump_version(name: str) -> int:
+    with _lock, _file_lock():
+        _cached["mtime"] = None  # 잠금 전에 다른 프로세스가 쓴 값을 놓치지 않도록 항상 다시 읽음
+        versions = dict(_read_versions())
+        versions[name] = int(versions.get(name, 0)) + 1
+
+        tmp_path = f"{VERSIONS_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(versions, f)
+        os.replace(tmp_path, VERSIONS_PATH)
+
+        _cached["mtime"] = None
+        print(f"🔖 {name} version → {versions[name]}")
+        return versions[name]
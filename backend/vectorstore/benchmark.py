@@ -0,0 +1,265 @@
+# benchmark.py
+# 검색 품질 / 속도 벤치마크 (LLM · 네트워크 호출 없음)
+# - 저장된 통합 메타데이터 fixture로 설정 (chunk 크기 / overlap / 임베딩 백엔드) 별 인덱스를 임시 디렉토리에 새로 빌드
+# - 라벨링된 질문 세트 (benchmark_questions.json) 로 recall@k, MRR, 빌드 시간, p50 / p99 질의 지연 측정
+# - 결과를 JSON으로 저장 (--baseline 으로 이전 실행 결과와 비교)
+
+import os
+import sys
+import glob
+import json
+import time
+import tempfile
+
+# 빌드 시간에 이전 실행의 임베딩 캐시가 섞이지 않도록 기본은 캐시 끔 (EMBEDDING_CACHE=true 로 켤 수 있음)
+os.environ.setdefault("EMBEDDING_CACHE", "false")
+# 네트워크 없이 실행 (임베딩 모델은 로컬 HF 캐시 / ONNX 디렉토리에 있어야 함)
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from vectorstore.loader import load_metadata_as_documents, document_id, CHUNK_SIZE, CHUNK_OVERLAP
+from vectorstore.bm25_index import BM25Index, hybrid_search
+from vectorstore.flat_index import open_vector_store, VECTOR_BACKEND
+from vectorstore.embedding_pipeline import embed_and_upsert
+from utils.paper_registry import PAPERS_DIR
+
+# 업로드된 논문 전체 (논문 디렉토리가 없으면 멀티 논문 구조 도입 전 단일 fixture)
+BENCHMARK_FIXTURES = sorted(glob.glob(os.path.join(PAPERS_DIR, "*", "integrated_metadata.json"))) or [
+    os.path.join(os.path.dirname(__file__), "../utils/metadata/integrated_metadata.json")
+]
+BENCHMARK_QUESTIONS = os.path.join(os.path.dirname(__file__), "benchmark_questions.json")
+BENCHMARK_RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../utils/metadata/benchmarks")
+
+
+# ============================== #
+#            채점 함수             #
+# ============================== #
+
+_QUOTES = str.maketrans({"’": "'", "‘": "'", "“": '"', "”": '"'})
+
+
+def _normalize(text: str) -> str:
+    # ref_title (PDF 파싱) 과 Semantic Scholar title은 따옴표 / 대소문자 / 공백 표기가 다를 수 있음
+    return " ".join(text.translate(_QUOTES).lower().split())
+
+
+def is_relevant(doc, matcher: dict) -> bool:
+    """
+    라벨 matcher 한 개와 Document 비교 (chunk 설정이 바뀌어도 같은 라벨을 쓸 수 있도록 id 대신 내용으로 판단)
+    - {"title": ...}: 메타데이터 title 일치 (reference 문서)
+    - {"contains": ...}: 본문에 해당 구절 포함 (본문 chunk)
+    - 따옴표 종류 / 대소문자 / 공백 차이는 무시
+    """
+    if "title" in matcher:
+        return _normalize(doc.metadata.get("title") or "") == _normalize(matcher["title"])
+    return _normalize(matcher["contains"]) in _normalize(doc.page_content)
+
+
+def score_ranking(docs: list, relevant: list) -> tuple:
+    """검색 결과 순위 → (recall: 찾은 라벨 비율, reciprocal rank: 첫 관련 문서 순위의 역수)"""
+    found, first_rank = set(), None
+    for rank, doc in enumerate(docs, 1):
+        matched = {i for i, matcher in enumerate(relevant) if is_relevant(doc, matcher)}
+        if matched and first_rank is None:
+            first_rank = rank
+        found |= matched
+    return len(found) / len(relevant), (1.0 / first_rank if first_rank else 0.0)
+
+
+def unresolved_labels(docs: list, questions: list) -> list:
+    """어떤 문서와도 일치하지 않는 라벨 목록 [(질문, matcher)] (제목 오타 / 따옴표 차이 등 → 항상 recall 0)"""
+    return [
+        (item["question"], matcher)
+        for item in questions
+        for matcher in item["relevant"]
+        if not any(is_relevant(doc, matcher) for doc in docs)
+    ]
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+# ============================== #
+#        인덱스 빌드 / 평가          #
+# ============================== #
+
+def load_fixture_documents(fixtures: list, chunk_size: int, chunk_overlap: int) -> dict:
+    """fixture JSON들 → {document id: Document} (같은 내용은 하나만)"""
+    docs = {}
+    for path in fixtures:
+        for doc in load_metadata_as_documents(path, chunk_size=chunk_size, chunk_overlap=chunk_overlap):
+            docs.setdefault(document_id(doc), doc)
+    return docs
+
+
+def build_index(fixtures: list, persist_dir: str, embeddings, chunk_size: int, chunk_overlap: int,
+                vector_backend: str = VECTOR_BACKEND) -> dict:
+    """fixture JSON → 벡터 스토어 + BM25 색인 (build_vector_db와 같은 loader / 임베딩 파이프라인, 버전 증가 없음)"""
+    start = time.perf_counter()
+    docs = load_fixture_documents(fixtures, chunk_size, chunk_overlap)
+    ids = list(docs)
+
+    store = open_vector_store(persist_dir, embeddings, backend=vector_backend)
+    stats = embed_and_upsert(store, ids, [docs[doc_id] for doc_id in ids], embeddings, workers=1)
+    bm25 = BM25Index()
+    bm25.add(ids, [docs[doc_id] for doc_id in ids])
+
+    return {
+        "store": store,
+        "bm25": bm25,
+        "docs": len(ids),
+        "embedded": stats["embedded"],
+        "build_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def evaluate(index: dict, questions: list, k: int, retrieval: str) -> dict:
+    """질문 세트 → recall@k / MRR / 질의 지연 (retrieval: dense / hybrid)"""
+    def search(question):
+        if retrieval == "hybrid":
+            return hybrid_search(index["store"], index["bm25"], question, k)
+        return index["store"].similarity_search(question, k=k)
+
+    search(questions[0]["question"])  # warm-up (첫 질의의 모델 / 인덱스 초기화 제외)
+
+    recalls, reciprocal_ranks, latencies = [], [], []
+    for item in questions:
+        t0 = time.perf_counter()
+        docs = search(item["question"])
+        latencies.append((time.perf_counter() - t0) * 1000)
+        recall, rr = score_ranking(docs, item["relevant"])
+        recalls.append(recall)
+        reciprocal_ranks.append(rr)
+
+    return {
+        "recall_at_k": round(sum(recalls) / len(recalls), 4),
+        "mrr": round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4),
+        "p50_ms": round(percentile(latencies, 0.5), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def run_benchmark(
+    fixtures: list = BENCHMARK_FIXTURES,
+    questions_path: str = BENCHMARK_QUESTIONS,
+    chunk_sizes: list = (CHUNK_SIZE,),
+    chunk_overlaps: list = (CHUNK_OVERLAP,),
+    ks: list = (3, 5),
+    embedding_backends: list = ("torch",),
+    retrievals: list = ("dense", "hybrid"),
+    vector_backend: str = VECTOR_BACKEND,
+) -> dict:
+    """
+    설정 조합별 결과 리스트
+    - 인덱스는 (임베딩 백엔드, chunk_size, chunk_overlap) 마다 한 번 빌드하고 k / retrieval 조합을 모두 평가
+    - 실행 전에 모든 chunk 설정에서 라벨이 fixture 문서와 일치하는지 확인 (일치하지 않는 라벨이 있으면 ValueError)
+    """
+    from vectorstore.onnx_embeddings import load_base_embeddings
+
+    with open(questions_path, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    for chunk_size in chunk_sizes:
+        for chunk_overlap in chunk_overlaps:
+            docs = list(load_fixture_documents(fixtures, chunk_size, chunk_overlap).values())
+            unresolved = unresolved_labels(docs, questions)
+            if unresolved:
+                details = "\n".join(f"  - {question} → {matcher}" for question, matcher in unresolved)
+                raise ValueError(f"fixture 문서와 일치하지 않는 라벨 (chunk_size={chunk_size}, overlap={chunk_overlap}):\n{details}")
+
+    results = []
+    for backend in embedding_backends:
+        embeddings = load_base_embeddings(backend)
+        for chunk_size in chunk_sizes:
+            for chunk_overlap in chunk_overlaps:
+                with tempfile.TemporaryDirectory(prefix="refnavi_bench_") as persist_dir:
+                    print(f"\n🏗️ 빌드: embedding={backend} chunk_size={chunk_size} overlap={chunk_overlap}")
+                    index = build_index(fixtures, persist_dir, embeddings, chunk_size, chunk_overlap, vector_backend)
+                    for retrieval in retrievals:
+                        for k in ks:
+                            metrics = evaluate(index, questions, k, retrieval)
+                            results.append({
+                                "embedding_backend": backend,
+                                "vector_backend": vector_backend,
+                                "chunk_size": chunk_size,
+                                "chunk_overlap": chunk_overlap,
+                                "retrieval": retrieval,
+                                "k": k,
+                                "docs": index["docs"],
+                                "build_seconds": index["build_seconds"],
+                                **metrics,
+                            })
+                            print(f"   {retrieval:>6} k={k:<3} recall@k {metrics['recall_at_k']:.3f}  "
+                                  f"MRR {metrics['mrr']:.3f}  p50 {metrics['p50_ms']}ms  p99 {metrics['p99_ms']}ms")
+
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fixtures": [os.path.basename(path) for path in fixtures],
+        "questions": len(questions),
+        "results": results,
+    }
+
+
+def _config_key(result: dict) -> tuple:
+    return tuple(result[key] for key in
+                 ("embedding_backend", "vector_backend", "chunk_size", "chunk_overlap", "retrieval", "k"))
+
+
+def compare(current: dict, baseline: dict) -> list:
+    """같은 설정끼리 이전 결과 대비 변화량 (recall@k / MRR / p50 / p99 / 빌드 시간)"""
+    previous = {_config_key(r): r for r in baseline.get("results", [])}
+    deltas = []
+    for result in current["results"]:
+        before = previous.get(_config_key(result))
+        if before is None:
+            continue
+        deltas.append({
+            **dict(zip(("embedding_backend", "vector_backend", "chunk_size", "chunk_overlap", "retrieval", "k"),
+                       _config_key(result))),
+            **{f"{metric}_delta": round(result[metric] - before[metric], 4)
+               for metric in ("recall_at_k", "mrr", "p50_ms", "p99_ms", "build_seconds")},
+        })
+    return deltas
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="검색 recall@k / MRR / 빌드 시간 / 질의 지연 벤치마크 (LLM · 네트워크 없음)")
+    parser.add_argument("--fixtures", nargs="+", default=BENCHMARK_FIXTURES, help="통합 메타데이터 JSON 경로들")
+    parser.add_argument("--questions", default=BENCHMARK_QUESTIONS)
+    parser.add_argument("--chunk-sizes", nargs="+", type=int, default=[CHUNK_SIZE])
+    parser.add_argument("--chunk-overlaps", nargs="+", type=int, default=[CHUNK_OVERLAP])
+    parser.add_argument("--k", nargs="+", type=int, default=[3, 5])
+    parser.add_argument("--embedding-backends", nargs="+", default=["torch"], choices=["torch", "onnx"])
+    parser.add_argument("--retrieval", nargs="+", default=["dense", "hybrid"], choices=["dense", "hybrid"])
+    parser.add_argument("--vector-backend", default=VECTOR_BACKEND, choices=["chroma", "flat", "hnsw"])
+    parser.add_argument("--output", default=os.path.join(BENCHMARK_RESULTS_DIR, f"retrieval_{time.strftime('%Y%m%d_%H%M%S')}.json"))
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        fixtures=args.fixtures,
+        questions_path=args.questions,
+        chunk_sizes=args.chunk_sizes,
+        chunk_overlaps=args.chunk_overlaps,
+        ks=args.k,
+        embedding_backends=args.embedding_backends,
+        retrievals=args.retrieval,
+        vector_backend=args.vector_backend,
+    )
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["baseline"] = os.path.basename(args.baseline)
+            report["deltas"] = compare(report, json.load(f))
+        print("\n📊 이전 결과 대비:")
+        print(json.dumps(report["deltas"], ensure_ascii=False, indent=2))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 결과 저장: {args.output}")
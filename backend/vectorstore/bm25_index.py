@@ -0,0 +1,424 @@
+# bm25_index.py
+# 벡터 DB와 같은 Document로 만드는 BM25 역색인 (저자명 / 모델명 / 참조 번호 등 정확한 용어 검색용)
+# - Chroma persist 디렉토리 안의 bm25/ 에 논문 (paper_id) 별 shard 파일로 저장
+#   → 업로드 / 삭제 시 해당 논문 shard만 읽고 씀 (전체 색인을 다시 쓰지 않음)
+# - build_vector_db가 같은 id로 추가 / 삭제, 읽기 쪽은 검색에 필요한 shard만 lazy 로드 + refresh()로 바뀐 shard만 다시 로드
+# - reciprocal_rank_fusion 으로 dense 검색 결과와 합침
+
+import glob
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+
+from langchain_core.documents import Document
+
+BM25_DIRNAME = "bm25"
+LEGACY_BM25_FILENAME = "bm25_index.json.gz"  # shard 도입 전 단일 파일 (for_store에서 자동 변환)
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*|[가-힣]+")
+
+
+def tokenize(text: str) -> list:
+    """
+    소문자 영숫자 토큰 (GraphSAGE → graphsage, BERT-base → bert-base + bert, base)
+    - 한글 어절은 조사가 붙어도 일치하도록 2-gram도 함께 색인
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        tokens.append(token)
+        if token[0] >= "가":
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        elif "-" in token or "." in token:
+            tokens.extend(t for t in re.split(r"[-.]", token) if t)
+    return tokens
+
+
+def shard_name(paper_id) -> str:
+    """paper_id → shard 파일 이름 (paper_id가 없는 문서는 같은 shard 하나에 모음)"""
+    return hashlib.sha1(str(paper_id or "").encode("utf-8")).hexdigest()[:16] + ".json.gz"
+
+
+class BM25Index:
+    """
+    document id → (본문, 메타데이터, term 빈도)
+    - postings: shard → term → {id: tf} (논문별로 나눠 두어 paper_id 필터 검색은 그 논문 shard만 점수 계산)
+      (로드 시 문서별 term 빈도로 재구성, 다시 토큰화하지 않음)
+    - add / delete 로 증분 갱신 (id는 loader.document_id 와 동일한 content hash)
+    - 문서는 metadata의 paper_id 별 shard에 속하고, save()는 바뀐 shard 파일만 다시 씀
+    - paper_ids를 주면 그 논문들의 shard만 로드 (build_vector_db의 증분 갱신용)
+    - lazy=True 이면 shard 목록만 읽고, 검색에 필요한 shard를 처음 쓸 때 로드 (vector_qa 읽기용)
+    """
+
+    def __init__(self, path: str = None, paper_ids=None, lazy: bool = False):
+        self.path = path  # shard 디렉토리
+        self.lazy = lazy
+        self.docs = {}       # id → [page_content, metadata]
+        self.doc_terms = {}  # id → {term: tf}
+        self.doc_len = {}
+        self.postings = {}   # shard 파일 이름 → {term: {id: tf}}
+        self.shard_len = {}  # shard 파일 이름 → 문서 길이 합
+        self.doc_shard = {}  # id → shard 파일 이름
+        self.shards = {}     # shard 파일 이름 → set(id)
+        self._mtimes = {}    # shard 파일 이름 → 로드 / 저장 시점 mtime (메모리에 올린 shard)
+        self._on_disk = {}   # shard 파일 이름 → 마지막 목록 확인 시점 mtime (lazy: 아직 로드하지 않은 shard 포함)
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+        if path and os.path.isdir(path):
+            if lazy:
+                self._on_disk = self._scan()
+            else:
+                self.load(paper_ids=paper_ids)
+
+    @classmethod
+    def for_store(cls, persist_dir: str, paper_ids=None, lazy: bool = False) -> "BM25Index":
+        path = os.path.join(persist_dir, BM25_DIRNAME)
+        legacy_path = os.path.join(persist_dir, LEGACY_BM25_FILENAME)
+        if os.path.exists(legacy_path) and not os.path.isdir(path):
+            _migrate_legacy(legacy_path, path)
+        return cls(path, paper_ids=paper_ids, lazy=lazy)
+
+    @staticmethod
+    def exists(persist_dir: str) -> bool:
+        return (os.path.isdir(os.path.join(persist_dir, BM25_DIRNAME))
+                or os.path.exists(os.path.join(persist_dir, LEGACY_BM25_FILENAME)))
+
+    def __len__(self):
+        return len(self.docs)
+
+    def available_shards(self) -> set:
+        """메모리에 있거나 디스크에 있는 (lazy로 아직 로드하지 않은) shard 이름"""
+        with self._lock:
+            return {shard for shard, ids in self.shards.items() if ids} | set(self._on_disk)
+
+    def _scan(self) -> dict:
+        on_disk = {}
+        for shard_path in glob.glob(os.path.join(self.path or "", "*.json.gz")):
+            on_disk[os.path.basename(shard_path)] = os.stat(shard_path).st_mtime_ns
+        return on_disk
+
+    def _put(self, doc_id: str, text: str, metadata: dict, terms: dict, shard: str = None):
+        # 호출 측에서 lock 보유
+        if doc_id in self.docs:
+            self._unindex(doc_id)
+        shard = shard or shard_name((metadata or {}).get("paper_id"))
+        self.docs[doc_id] = [text, metadata]
+        self.doc_shard[doc_id] = shard
+        self.shards.setdefault(shard, set()).add(doc_id)
+        self.doc_terms[doc_id] = terms
+        length = sum(terms.values())
+        self.doc_len[doc_id] = length
+        self.shard_len[shard] = self.shard_len.get(shard, 0) + length
+        postings = self.postings.setdefault(shard, {})
+        for term, tf in terms.items():
+            postings.setdefault(term, {})[doc_id] = tf
+
+    def _unindex(self, doc_id: str):
+        terms = self.doc_terms.pop(doc_id, {})
+        length = self.doc_len.pop(doc_id, 0)
+        self.docs.pop(doc_id, None)
+        shard = self.doc_shard.pop(doc_id, None)
+        if shard is None:
+            return
+        self.shard_len[shard] = self.shard_len.get(shard, 0) - length
+        postings = self.postings.get(shard, {})
+        for term in terms:
+            posting = postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del postings[term]
+        self.shards.get(shard, set()).discard(doc_id)
+        self._dirty.add(shard)
+
+    def add(self, ids: list, docs: list):
+        with self._lock:
+            for doc_id, doc in zip(ids, docs):
+                self._put(doc_id, doc.page_content, doc.metadata, dict(Counter(tokenize(doc.page_content))))
+                self._dirty.add(self.doc_shard[doc_id])
+
+    def delete(self, ids: list):
+        with self._lock:
+            for doc_id in ids:
+                self._unindex(doc_id)
+
+    def _ensure_loaded(self, shards: list):
+        # lazy 인덱스: 검색 대상 shard 중 아직 메모리에 없는 것만 로드
+        for shard in shards:
+            if shard not in self._mtimes and shard in self._on_disk:
+                try:
+                    self._load_shard(shard)
+                except FileNotFoundError:  # 목록 확인 후 다른 프로세스가 삭제
+                    with self._lock:
+                        self._on_disk.pop(shard, None)
+
+    def search(self, query: str, k: int = 10, predicate=None, paper_ids=None) -> list:
+        """
+        BM25 점수 상위 k개 [(id, score)] (predicate(metadata)가 주어지면 통과한 문서만)
+        - paper_ids를 주면 그 논문 shard만 로드 / 점수 계산 (문서 수 / 평균 길이 / df도 그 shard 기준)
+          → 논문이 늘어도 논문 한정 검색 비용은 그 논문 크기에만 비례
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        if paper_ids is not None:
+            shards = list(dict.fromkeys(shard_name(paper_id) for paper_id in paper_ids))
+        else:
+            shards = sorted(self.available_shards())
+        self._ensure_loaded(shards)
+
+        with self._lock:
+            shards = [shard for shard in shards if self.shards.get(shard)]
+            n = sum(len(self.shards[shard]) for shard in shards)
+            if not n:
+                return []
+            avg_len = sum(self.shard_len[shard] for shard in shards) / n
+            scores = {}
+            for term in terms:
+                postings = [self.postings[shard][term] for shard in shards if term in self.postings[shard]]
+                df = sum(len(posting) for posting in postings)
+                if not df:
+                    continue
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for posting in postings:
+                    for doc_id, tf in posting.items():
+                        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc_id] / avg_len)
+                        scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+            ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+            if predicate is not None:
+                ranked = [(doc_id, s) for doc_id, s in ranked if predicate(self.docs[doc_id][1])]
+            return ranked[:k]
+
+    def get_document(self, doc_id: str) -> Document:
+        text, metadata = self.docs[doc_id]
+        return Document(page_content=text, metadata=dict(metadata), id=doc_id)
+
+    def save(self, path: str = None):
+        """바뀐 shard만 저장 (문서가 모두 삭제된 shard는 파일 삭제)"""
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            payloads = {
+                shard: {
+                    "docs": {doc_id: self.docs[doc_id] for doc_id in self.shards.get(shard, ())},
+                    "doc_terms": {doc_id: self.doc_terms[doc_id] for doc_id in self.shards.get(shard, ())},
+                }
+                for shard in dirty
+            }
+
+        for shard, data in payloads.items():
+            shard_path = os.path.join(path, shard)
+            if not data["docs"]:
+                if os.path.exists(shard_path):
+                    os.remove(shard_path)
+                self._mtimes.pop(shard, None)
+                self._on_disk.pop(shard, None)
+                continue
+            tmp_path = f"{shard_path}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, shard_path)
+            self._mtimes[shard] = self._on_disk[shard] = os.stat(shard_path).st_mtime_ns
+
+    def _load_shard(self, shard: str):
+        shard_path = os.path.join(self.path, shard)
+        with gzip.open(shard_path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        mtime = os.stat(shard_path).st_mtime_ns
+        with self._lock:
+            self._drop_shard(shard)
+            for doc_id, (text, metadata) in data["docs"].items():
+                self._put(doc_id, text, metadata, data["doc_terms"][doc_id], shard)
+            self._mtimes[shard] = self._on_disk[shard] = mtime
+
+    def _drop_shard(self, shard: str):
+        # 호출 측에서 lock 보유 (메모리에서만 제거, 파일은 그대로)
+        for doc_id in list(self.shards.get(shard, ())):
+            self._unindex(doc_id)
+        self.shards.pop(shard, None)
+        self.postings.pop(shard, None)
+        self.shard_len.pop(shard, None)
+        self._dirty.discard(shard)
+        self._mtimes.pop(shard, None)
+        self._on_disk.pop(shard, None)
+
+    def load(self, path: str = None, paper_ids=None):
+        self.path = path or self.path
+        if paper_ids is None:
+            shards = [os.path.basename(p) for p in glob.glob(os.path.join(self.path, "*.json.gz"))]
+        else:
+            shards = [shard_name(paper_id) for paper_id in paper_ids]
+        for shard in shards:
+            if os.path.exists(os.path.join(self.path, shard)):
+                self._load_shard(shard)
+
+    def refresh(self) -> int:
+        """
+        다른 프로세스가 바꾼 shard만 다시 로드 (mtime 비교) + 삭제된 shard 제거
+        - lazy 인덱스는 새 shard를 목록에만 추가하고, 메모리에 있던 shard만 다시 로드
+        - 반환: 다시 로드 / 제거한 shard 수
+        """
+        on_disk = self._scan()
+        with self._lock:
+            loaded = dict(self._mtimes)
+            removed = [shard for shard in set(loaded) | set(self._on_disk) if shard not in on_disk]
+            for shard in removed:
+                self._drop_shard(shard)
+            if self.lazy:
+                self._on_disk.update(on_disk)
+        if self.lazy:
+            changed = [shard for shard, mtime in loaded.items() if shard in on_disk and on_disk[shard] != mtime]
+        else:
+            changed = [shard for shard, mtime in on_disk.items() if loaded.get(shard) != mtime]
+        for shard in changed:
+            self._load_shard(shard)
+        return len(changed) + len(removed)
+
+
+def _migrate_legacy(legacy_path: str, path: str):
+    """단일 파일 색인 (bm25_index.json.gz) → 논문별 shard 디렉토리"""
+    start = time.perf_counter()
+    with gzip.open(legacy_path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    index = BM25Index()
+    for doc_id, (text, metadata) in data["docs"].items():
+        index._put(doc_id, text, metadata, data["doc_terms"][doc_id])
+    index._dirty = set(index.shards)
+    index.save(path)
+    os.remove(legacy_path)
+    print(f"🔁 BM25 색인 shard 변환: {len(index)}개 문서 → {len(index.shards)}개 shard ({time.perf_counter() - start:.2f}s)")
+
+
+def reciprocal_rank_fusion(rankings: list, k: int, rrf_k: int = RRF_K) -> list:
+    """
+    여러 검색 결과 id 순위 리스트 → RRF 점수 (Σ 1 / (rrf_k + rank)) 상위 k개 id
+    - 점수 척도가 다른 dense / BM25 결과를 순위만으로 합침
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return [doc_id for doc_id, _ in sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]]
+
+
+def where_paper_ids(where: dict):
+    """
+    where (Chroma 필터 문법) 가 문서를 한정하는 paper_id 집합 (한정하지 않으면 None)
+    - {"paper_id": x}, {"paper_id": {"$eq" | "$in": ...}}, $and 안의 조건 (여러 개면 교집합)
+    """
+    if not where:
+        return None
+    found = None
+    for key, cond in where.items():
+        ids = None
+        if key == "paper_id":
+            if not isinstance(cond, dict):
+                ids = {cond}
+            elif set(cond) == {"$eq"}:
+                ids = {cond["$eq"]}
+            elif set(cond) == {"$in"}:
+                ids = set(cond["$in"])
+        elif key == "$and":
+            for part in cond:
+                part_ids = where_paper_ids(part)
+                if part_ids is not None:
+                    ids = part_ids if ids is None else ids & part_ids
+        if ids is not None:
+            found = ids if found is None else found & ids
+    return found
+
+
+def hybrid_search(store, index: BM25Index, query: str, k: int, where: dict = None) -> list:
+    """
+    dense (벡터 스토어) + BM25 후보를 k보다 넉넉히 뽑아 RRF로 합친 상위 k개 Document
+    - where (Chroma 필터 문법) 는 두 검색 모두에 적용 (paper_id 조건이 있으면 BM25는 그 논문 shard만 검색)
+    """
+    from vectorstore.flat_index import match_where
+    from vectorstore.loader import document_id
+
+    fetch_k = max(k * 4, 20)
+    dense_docs = store.similarity_search(query, k=fetch_k, filter=where)
+    by_id = {(getattr(doc, "id", None) or document_id(doc)): doc for doc in dense_docs}
+    predicate = (lambda metadata: match_where(metadata, where)) if where else None
+    lexical_ids = [doc_id for doc_id, _ in index.search(query, k=fetch_k, predicate=predicate,
+                                                        paper_ids=where_paper_ids(where))]
+
+    fused = reciprocal_rank_fusion([list(by_id), lexical_ids], k=k)
+    return [by_id[doc_id] if doc_id in by_id else index.get_document(doc_id) for doc_id in fused]
+
+
+def rebuild_from_store(vector_db, persist_dir: str) -> BM25Index:
+    """기존 Chroma 컬렉션 전체로 BM25 색인 재생성 (색인 도입 전에 만든 벡터 DB용)"""
+    data = vector_db.get(include=["documents", "metadatas"])
+    index = BM25Index()
+    index.path = os.path.join(persist_dir, BM25_DIRNAME)
+    shutil.rmtree(index.path, ignore_errors=True)
+    legacy_path = os.path.join(persist_dir, LEGACY_BM25_FILENAME)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+    index.add(
+        data["ids"],
+        [Document(page_content=text, metadata=meta or {}) for text, meta in zip(data["documents"], data["metadatas"])],
+    )
+    index.save()
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+    parser = argparse.ArgumentParser(description="BM25 색인 재생성 / dense · BM25 · RRF 검색 벤치마크")
+    parser.add_argument("--persist-dir", default=os.path.join(os.path.dirname(__file__), "../utils/metadata/chroma_db"))
+    parser.add_argument("--questions", default=os.path.join(os.path.dirname(__file__), "../graphdb/router_questions.json"))
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    from langchain_chroma import Chroma
+    from vectorstore.onnx_embeddings import load_embeddings
+
+    vector_db = Chroma(persist_directory=args.persist_dir, embedding_function=load_embeddings())
+
+    start = time.perf_counter()
+    index = rebuild_from_store(vector_db, args.persist_dir)
+    build_seconds = time.perf_counter() - start
+    print(f"✅ BM25 색인 {len(index)}개 문서, 빌드 {build_seconds:.2f}s")
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [item["question"] for item in json.load(f)]
+
+    def timed(fn):
+        latencies = []
+        for question in questions:
+            t0 = time.perf_counter()
+            fn(question)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        latencies.sort()
+        return {"p50_ms": round(latencies[len(latencies) // 2], 2),
+                "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2)}
+
+    fetch_k = max(args.k * 4, 20)
+    dense = lambda q: [d.id for d in vector_db.similarity_search(q, k=fetch_k)]
+    lexical = lambda q: [doc_id for doc_id, _ in index.search(q, k=fetch_k)]
+    fused = lambda q: reciprocal_rank_fusion([dense(q), lexical(q)], k=args.k)
+
+    print(json.dumps({
+        "docs": len(index),
+        "build_seconds": round(build_seconds, 3),
+        "dense": timed(dense),
+        "bm25": timed(lexical),
+        "rrf": timed(fused),
+    }, ensure_ascii=False, indent=2))
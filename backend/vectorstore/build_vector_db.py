@@ -1,7 +1,18 @@
 import os
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from .loader import load_metadata_as_documents
+import sys
+import time
+from functools import lru_cache
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from .loader import load_metadata_as_documents, document_id
+from .onnx_embeddings import load_embeddings, embedding_name
+from .embedding_pipeline import embed_and_upsert, EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS
+from .bm25_index import BM25Index, rebuild_from_store
+from .flat_index import open_vector_store, bulk_writes, stored_embedding, mark_embedding
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.versioning import bump_version
 
 # ✅ 설정값
 JSON_PATH = "../utils/integrated_metadata.json"  # 입력 메타데이터 위치
@@ -10,37 +21,137 @@ JSON_PATH = "../utils/integrated_metadata.json"  # 입력 메타데이터 위치
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 VECTOR_DB_DIR = os.path.join(BASE_DIR, "chroma_db")
 
-import shutil
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
 
-if os.path.exists(VECTOR_DB_DIR):
-    shutil.rmtree(VECTOR_DB_DIR)  # 기존 DB 삭제
+@lru_cache(maxsize=None)
+def get_embeddings():
+    # 업로드마다 모델을 다시 로드하지 않도록 프로세스 내에서 한 번만 생성
+    # 이미 임베딩한 텍스트 (reference abstract, citation context 등) 는 캐시에서 바로 반환
+    print("🧠 임베딩 모델 로딩 중...")
+    return load_embeddings(model_name=EMBEDDING_MODEL)
 
 
-def build_vector_db(json_path: str = JSON_PATH, persist_dir: str = VECTOR_DB_DIR) -> Chroma:
+def build_vector_db(
+    json_path: str = JSON_PATH,
+    persist_dir: str = VECTOR_DB_DIR,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    workers: int = EMBEDDING_WORKERS,
+) -> Chroma:
     """
-    - JSONL에서 문서 로드 → 임베딩 → Chroma 벡터 DB 생성 및 저장
-    - 생성된 Chroma 인스턴스를 반환
+    - JSON에서 문서 로드 → 변경분만 임베딩 → Chroma 벡터 DB에 증분 반영
+    - Document id = content hash (loader.document_id)
+      · 같은 논문 (paper_id) 의 기존 id와 비교해 그대로인 문서는 건너뜀
+      · 새로 생겼거나 내용이 바뀐 문서만 임베딩 후 추가
+      · 더 이상 존재하지 않는 문서는 삭제
+    - 같은 id로 BM25 색인 (bm25/ 논문별 shard) 도 증분 갱신
+    - 임베딩은 embedding_pipeline으로 배치 / 멀티 프로세스 처리 (완료된 배치부터 바로 반영)
+    - EMBEDDING_BACKEND가 바뀌었으면 기존 문서 전체를 먼저 다시 임베딩 (reembed_if_needed)
+    - 변경이 있었을 때만 vector 버전 증가
+    - 벡터 스토어 (VECTOR_BACKEND: chroma / flat / hnsw) 인스턴스를 반환
     """
+    start = time.perf_counter()
+
     # 1. 문서 로딩
     print("📄 문서 로딩 중...")
     documents = load_metadata_as_documents(json_path)
     print(f"✅ 총 {len(documents)}개 문서 로드 완료")
 
-    # 2. 임베딩 모델 로딩
-    print("🧠 HuggingFace 임베딩 모델 로딩 중...")
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-    # 3. 벡터 DB 생성
-    print("📦 Chroma 벡터 DB 생성 중...")
-    vector_db = Chroma.from_documents(
-        documents=documents,
-        embedding=embeddings,
-        persist_directory=persist_dir
-    )
-    # vector_db.persist()
-    print(f"✅ 벡터 DB 저장 완료 → '{persist_dir}/'")
+    # 2. 기존 벡터 DB 열기 (없으면 생성)
+    vector_db = open_vector_store(persist_dir, get_embeddings())  # VECTOR_BACKEND: chroma / flat / hnsw
+    reembedded = reembed_if_needed(vector_db, persist_dir, batch_size=batch_size, workers=workers)
+
+    # 3. 논문 단위로 기존 id와 비교
+    paper_ids = {doc.metadata["paper_id"] for doc in documents}
+    existing_ids = set()
+    for paper_id in paper_ids:
+        existing_ids.update(vector_db.get(where={"paper_id": paper_id}, include=[])["ids"])
+
+    new_docs = {}
+    for doc in documents:
+        doc_id = document_id(doc)
+        if doc_id not in existing_ids:
+            new_docs.setdefault(doc_id, doc)  # 같은 내용의 중복 문서는 하나만
+    current_ids = {document_id(doc) for doc in documents}
+    stale_ids = sorted(existing_ids - current_ids)
+    skipped = len(current_ids) - len(new_docs)
+
+    # 4. 변경분 반영 (새 문서만 임베딩)
+    ids = list(new_docs)
+    with bulk_writes(vector_db):  # flat / hnsw: 추가 + 삭제를 한 번에 저장
+        if ids:
+            embed_and_upsert(vector_db, ids, [new_docs[doc_id] for doc_id in ids], get_embeddings(),
+                             batch_size=batch_size, workers=workers)
+        if stale_ids:
+            vector_db.delete(ids=stale_ids)
+
+    # 5. 같은 id로 BM25 색인 갱신 (정확한 용어 검색용, vector_qa에서 RRF로 합침)
+    if ids or stale_ids:
+        if BM25Index.exists(persist_dir):
+            # 이번에 반영한 논문 shard만 로드 / 저장
+            bm25 = BM25Index.for_store(persist_dir, paper_ids=paper_ids)
+            bm25.add(ids, [new_docs[doc_id] for doc_id in ids])
+            bm25.delete(stale_ids)
+            bm25.save()
+        else:
+            # 색인 도입 전에 만든 벡터 DB면 컬렉션 전체로 새로 생성
+            rebuild_from_store(vector_db, persist_dir)
+
+    print(f"✅ 벡터 DB 반영 완료 → '{persist_dir}/' "
+          f"(추가 {len(ids)} / 유지 {skipped} / 삭제 {len(stale_ids)}, {time.perf_counter() - start:.2f}s)")
+
+    # ✅ 벡터 인덱스 버전 증가 (답변 캐시 등 읽기 쪽 무효화)
+    if ids or stale_ids or reembedded:
+        bump_version("vector")
     return vector_db
 
+
+def reembed_if_needed(vector_db, persist_dir: str, batch_size: int = EMBEDDING_BATCH_SIZE,
+                      workers: int = EMBEDDING_WORKERS) -> int:
+    """
+    스토어에 기록된 임베딩 (embedding.json) 과 현재 EMBEDDING_BACKEND가 다르면 기존 문서 전체를 다시 임베딩
+    - 문서 id는 내용 hash라 백엔드를 바꿔도 같으므로, 증분 비교만으로는 이전 백엔드 벡터가 그대로 남음
+    - 기록이 없는 스토어는 기록 도입 전 기본값 (torch) 으로 만든 것으로 봄
+    - 반환: 다시 임베딩한 문서 수
+    """
+    current = embedding_name(model_name=EMBEDDING_MODEL)
+    previous = stored_embedding(persist_dir) or embedding_name("torch", EMBEDDING_MODEL)
+    count = 0
+    if previous != current:
+        data = vector_db.get(include=["documents", "metadatas"])
+        count = len(data["ids"])
+        if count:
+            print(f"🔁 임베딩 변경 ({previous} → {current}): 기존 문서 {count}개 다시 임베딩")
+            docs = [Document(page_content=text, metadata=meta or {})
+                    for text, meta in zip(data["documents"], data["metadatas"])]
+            with bulk_writes(vector_db):
+                embed_and_upsert(vector_db, list(data["ids"]), docs, get_embeddings(),
+                                 batch_size=batch_size, workers=workers)
+    if stored_embedding(persist_dir) != current:
+        mark_embedding(persist_dir, current)
+    return count
+
+def remove_paper_from_vector_db(paper_id: str, persist_dir: str = VECTOR_DB_DIR) -> int:
+    """
+    한 논문 (paper_id) 의 문서를 벡터 DB와 BM25 색인에서 삭제
+    - 반환: 삭제한 문서 수 (삭제가 있었을 때만 vector 버전 증가)
+    """
+    vector_db = open_vector_store(persist_dir, get_embeddings())
+    ids = vector_db.get(where={"paper_id": paper_id}, include=[])["ids"]
+    if not ids:
+        return 0
+
+    vector_db.delete(ids=ids)
+    if BM25Index.exists(persist_dir):
+        bm25 = BM25Index.for_store(persist_dir, paper_ids=[paper_id])
+        bm25.delete(ids)
+        bm25.save()
+
+    print(f"🗑️ 벡터 DB에서 {paper_id} 문서 {len(ids)}개 삭제")
+    bump_version("vector")
+    return len(ids)
+
+
 # ✅ 단독 실행 시 테스트
 if __name__ == "__main__":
     print("🚀 벡터 DB 생성 시작...")
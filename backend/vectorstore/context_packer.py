@@ -0,0 +1,240 @@
+# context_packer.py
+# 검색 문서 → 토큰 예산 안의 프롬프트 context
+# - chunk_overlap으로 인접 chunk 사이에 겹치는 텍스트 제거 + 완전히 같은 문서 중복 제거
+# - 긴 문서 (reference abstract 등) 는 질문과 겹치는 단어가 많은 문장만 남김
+# - 검색 순위 (관련도) 순서대로 예산이 찰 때까지 채움, 압축 전 / 후 토큰 수 보고
+
+import os
+import re
+import sys
+import threading
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.token_counter import count_tokens, truncate_to_tokens
+from vectorstore.bm25_index import tokenize
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_DOC_MAX_TOKENS = int(os.getenv("CONTEXT_DOC_MAX_TOKENS", "300"))  # 문서 1개 상한 (넘으면 문장 단위로 줄임)
+SYNTHESIS_FIELD_MAX_TOKENS = int(os.getenv("SYNTHESIS_FIELD_MAX_TOKENS", "400"))  # hybrid 종합 프롬프트의 graph / vector 답변 각각
+CONTEXT_MIN_TAIL_TOKENS = 60  # 남은 예산이 이보다 작으면 다음 문서를 잘라 넣지 않고 종료
+OVERLAP_MIN_CHARS = 30  # 이보다 짧게 겹치는 건 우연의 일치로 보고 유지
+OVERLAP_MAX_CHARS = int(os.getenv("CONTEXT_OVERLAP_MAX_CHARS", "400"))  # chunk_overlap 보다 넉넉하게
+
+_totals_lock = threading.Lock()
+_totals = {"context_calls": 0, "context_tokens_before": 0, "context_tokens_after": 0,
+           "synthesis_calls": 0, "synthesis_tokens_before": 0, "synthesis_tokens_after": 0}
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?。])\s+")
+_HEADER_RE = re.compile(r"^(\[[^\]]+\]|[A-Z][\w ()]{0,30}:(\s*\S.{0,150})?)$")
+
+
+def _overlap(left: str, right: str) -> int:
+    """left의 끝과 right의 시작이 겹치는 최대 글자 수 (OVERLAP_MIN_CHARS 미만이면 0)"""
+    for size in range(min(len(left), len(right), OVERLAP_MAX_CHARS), OVERLAP_MIN_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def strip_overlap(text: str, kept: list) -> str:
+    """이미 담은 텍스트와 앞 / 뒤로 겹치는 부분을 text에서 제거"""
+    for other in kept:
+        size = _overlap(other, text)
+        if size:
+            text = text[size:].lstrip()
+        size = _overlap(text, other)
+        if size:
+            text = text[:-size].rstrip()
+    return text
+
+
+def trim_text(query: str, text: str, max_tokens: int) -> str:
+    """
+    max_tokens를 넘는 텍스트를 질문 관련 문장만 남겨 줄임
+    - 'Title: ...' / '[Reference Paper]' 같은 짧은 머리 줄은 항상 유지
+    - 문장 점수: 질문 토큰과 겹치는 서로 다른 토큰 수 (동점이면 앞 문장 우선)
+    - 고른 문장은 원래 순서대로 다시 이어 붙임
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    query_terms = set(tokenize(query))
+    units = []  # (줄 번호, 문장, 머리 줄 여부)
+    for line_no, line in enumerate(text.splitlines()):
+        line = line.strip()
+        if not line:
+            continue
+        if _HEADER_RE.match(line):
+            units.append((line_no, line, True))
+        else:
+            units.extend((line_no, sentence, False) for sentence in _SENTENCE_RE.split(line) if sentence)
+
+    budget = max_tokens - sum(count_tokens(u[1]) for u in units if u[2])
+    ranked = sorted(
+        (i for i, u in enumerate(units) if not u[2]),
+        key=lambda i: -len(query_terms & set(tokenize(units[i][1]))),
+    )
+    selected = {i for i, u in enumerate(units) if u[2]}
+    for i in ranked:
+        tokens = count_tokens(units[i][1])
+        if tokens <= budget:
+            selected.add(i)
+            budget -= tokens
+
+    lines, current = [], None
+    for i in sorted(selected):
+        line_no, sentence, _ = units[i]
+        if line_no == current:
+            lines[-1] += " " + sentence
+        else:
+            lines.append(sentence)
+            current = line_no
+    trimmed = "\n".join(lines)
+    # 머리 줄만으로도 넘치는 경우 대비
+    return truncate_to_tokens(trimmed, max_tokens)
+
+
+def pack_documents(
+    query: str,
+    docs: list,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    doc_max_tokens: int = CONTEXT_DOC_MAX_TOKENS,
+) -> tuple:
+    """
+    검색 순위 순서의 docs → (예산 안에 담긴 Document 리스트, 통계)
+    - 반환 Document는 page_content만 줄인 사본 (metadata / id 유지)
+    - 통계: docs / packed_docs / tokens_before / tokens_after
+    """
+    tokens_before = count_tokens("\n\n".join(doc.page_content for doc in docs))
+    packed, kept_texts, seen, used = [], {}, set(), 0
+
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text or text in seen:
+            continue
+        seen.add(text)
+
+        # 같은 논문 · 같은 source 문서끼리만 overlap 비교 (본문 chunk 경계)
+        group = (doc.metadata.get("paper_id"), doc.metadata.get("source"))
+        text = strip_overlap(text, kept_texts.get(group, []))
+        text = trim_text(query, text, doc_max_tokens)
+        if not text:
+            continue
+
+        remaining = budget - used - (2 if packed else 0)  # 문서 구분자 "\n\n"
+        tokens = count_tokens(text)
+        if tokens > remaining:
+            if remaining < CONTEXT_MIN_TAIL_TOKENS and packed:
+                break
+            text = trim_text(query, text, remaining)
+            tokens = count_tokens(text)
+
+        kept_texts.setdefault(group, []).append(text)
+        packed.append(Document(page_content=text, metadata=dict(doc.metadata), id=getattr(doc, "id", None)))
+        used += tokens + (2 if len(packed) > 1 else 0)
+        if used >= budget:
+            break
+
+    stats = {
+        "docs": len(docs),
+        "packed_docs": len(packed),
+        "tokens_before": tokens_before,
+        "tokens_after": count_tokens("\n\n".join(doc.page_content for doc in packed)),
+    }
+    return packed, stats
+
+
+def _record(kind: str, stats: dict):
+    with _totals_lock:
+        _totals[f"{kind}_calls"] += 1
+        _totals[f"{kind}_tokens_before"] += stats["tokens_before"]
+        _totals[f"{kind}_tokens_after"] += stats["tokens_after"]
+
+
+def packing_stats() -> dict:
+    """누적 압축 전 / 후 프롬프트 토큰 수 (/query/stats 용)"""
+    with _totals_lock:
+        totals = dict(_totals)
+    for kind in ("context", "synthesis"):
+        before = totals[f"{kind}_tokens_before"]
+        totals[f"{kind}_saved_ratio"] = round(1 - totals[f"{kind}_tokens_after"] / before, 3) if before else None
+    return totals
+
+
+def _report(stats: dict, budget: int):
+    _record("context", stats)
+    print(f"📦 context {stats['tokens_before']} → {stats['tokens_after']} tokens "
+          f"({stats['packed_docs']}/{stats['docs']} docs, budget {budget})")
+
+
+def pack_context(query: str, docs: list, budget: int = CONTEXT_TOKEN_BUDGET) -> tuple:
+    """pack_documents 결과를 프롬프트 {context} 문자열로 (context, 통계)"""
+    packed, stats = pack_documents(query, docs, budget)
+    _report(stats, budget)
+    return "\n\n".join(doc.page_content for doc in packed), stats
+
+
+class PackedRetriever(BaseRetriever):
+    """검색 결과를 pack_documents로 줄여서 돌려주는 retriever 래퍼 (ConversationalRetrievalChain용)"""
+
+    retriever: BaseRetriever
+    budget: int = CONTEXT_TOKEN_BUDGET
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list:
+        docs = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        packed, stats = pack_documents(query, docs, self.budget)
+        _report(stats, self.budget)
+        return packed
+
+
+def pack_synthesis_inputs(query: str, inputs: dict, max_tokens: int = SYNTHESIS_FIELD_MAX_TOKENS) -> tuple:
+    """
+    hybrid 종합 프롬프트 입력 (graph_answer / vector_answer 등) 을 항목별 max_tokens 이내로 줄임
+    - question은 그대로 유지
+    """
+    packed = {
+        key: value if key == "question" or not isinstance(value, str) else trim_text(query, value, max_tokens)
+        for key, value in inputs.items()
+    }
+    stats = {
+        "tokens_before": sum(count_tokens(v) for v in inputs.values() if isinstance(v, str)),
+        "tokens_after": sum(count_tokens(v) for v in packed.values() if isinstance(v, str)),
+    }
+    _record("synthesis", stats)
+    print(f"📦 종합 프롬프트 입력 {stats['tokens_before']} → {stats['tokens_after']} tokens")
+    return packed, stats
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="검색 문서 context 압축 전 / 후 토큰 수 비교")
+    parser.add_argument("--persist-dir", default=os.path.join(os.path.dirname(__file__), "../utils/metadata/chroma_db"))
+    parser.add_argument("--questions", default=os.path.join(os.path.dirname(__file__), "../graphdb/router_questions.json"))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    from vectorstore.vector_qa import retrieve_documents
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [item["question"] for item in json.load(f)]
+
+    before, after = 0, 0
+    for question in questions:
+        _, stats = pack_context(question, retrieve_documents(question, k=args.k, VECTOR_DB_DIR=args.persist_dir), args.budget)
+        before += stats["tokens_before"]
+        after += stats["tokens_after"]
+    print(json.dumps({
+        "questions": len(questions),
+        "k": args.k,
+        "budget": args.budget,
+        "mean_tokens_before": round(before / max(1, len(questions)), 1),
+        "mean_tokens_after": round(after / max(1, len(questions)), 1),
+    }, ensure_ascii=False, indent=2))
@@ -0,0 +1,250 @@
+# embedding_cache.py
+# 임베딩 결과 영속 캐시 (모델명 + 텍스트 hash → float16 벡터, memmap 파일 + offset index)
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 스레드 잠금만 사용
+    fcntl = None
+
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "true").lower() == "true"
+EMBEDDING_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "../utils/metadata/.cache/embeddings"),
+)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "200000"))
+INITIAL_ROWS = 1024
+INDEX_SAVE_EVERY = 64  # 질의 임베딩은 새 항목 64개마다 파일에 반영
+
+
+def text_key(model_name: str, text: str) -> str:
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _file_signature(path: str):
+    # index.json은 항상 os.replace로 교체되므로 inode가 바뀜 (mtime 해상도가 낮아도 변경 감지)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class EmbeddingCache:
+    """
+    key → 벡터 (float16) 저장소
+    - vectors.f16: (rows, dim) float16 memmap, 필요 시 2배씩 확장 (max_entries 까지)
+    - index.json: key → row offset (LRU 순서로 저장)
+    - max_entries 초과 시 가장 오래 사용되지 않은 key의 row를 재사용
+    - 여러 프로세스 (uvicorn worker / 임베딩 pool worker / 빌드 스크립트) 가 같은 디렉토리를 공유
+      - 새 벡터는 pending에 모았다가 save()에서 cache.lock 배타 잠금 안에서
+        최신 index 재로드 → row 할당 → 벡터 / index 쓰기 (row offset 중복 할당 방지)
+      - 조회는 공유 잠금 안에서 다른 프로세스가 저장한 index를 반영한 뒤 row를 읽음
+      - LRU 순서는 저장 시점의 index 기준 (다른 프로세스의 hit 순서는 반영되지 않음)
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_DIR, max_entries: int = EMBEDDING_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self.vectors_path = os.path.join(path, "vectors.f16")
+        self.index_path = os.path.join(path, "index.json")
+        self.lock_path = os.path.join(path, "cache.lock")
+        self.index = OrderedDict()
+        self.pending = OrderedDict()  # key → float16 벡터 (아직 파일에 쓰지 않은 항목)
+        self.dim = None
+        self.rows = 0
+        self._vectors = None
+        self._free_rows = []
+        self._index_signature = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.index_path):
+            with self._lock, self._file_lock(exclusive=False):
+                self._reload_if_changed()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """다른 프로세스와의 index 읽기 / 쓰기 직렬화 (조회는 공유 잠금, 저장은 배타 잠금)"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open_vectors(self, rows: int):
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float16, mode="r+", shape=(rows, self.dim))
+        self.rows = rows
+
+    def _reload_if_changed(self):
+        # 호출 측에서 lock + 파일 잠금 보유 / 다른 프로세스가 index를 저장한 경우에만 다시 읽음
+        signature = _file_signature(self.index_path)
+        if signature is None or signature == self._index_signature:
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        self.dim = saved["dim"]
+        if self._vectors is None or saved["rows"] != self.rows:
+            self._open_vectors(saved["rows"])
+        self.index = OrderedDict(saved["index"])
+        used = set(self.index.values())
+        self._free_rows = [row for row in range(self.rows - 1, -1, -1) if row not in used]
+        self._index_signature = signature
+
+    def _allocate(self) -> int:
+        # 호출 측에서 lock + 배타 파일 잠금 보유
+        if self._free_rows:
+            return self._free_rows.pop()
+        if len(self.index) >= self.max_entries:
+            _, row = self.index.popitem(last=False)
+            self.evictions += 1
+            return row
+
+        new_rows = min(max(INITIAL_ROWS, self.rows * 2), self.max_entries)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_rows * self.dim * 2)
+        old_rows = self.rows
+        self._open_vectors(new_rows)
+        self._free_rows = list(range(new_rows - 1, old_rows - 1, -1))
+        return self._free_rows.pop()
+
+    def get_many(self, keys: List[str]) -> list:
+        """key별 float32 벡터 (없으면 None)"""
+        with self._lock, self._file_lock(exclusive=False):
+            self._reload_if_changed()
+            result = []
+            for key in keys:
+                if key in self.pending:
+                    self.hits += 1
+                    result.append(np.asarray(self.pending[key], dtype=np.float32))
+                    continue
+                row = self.index.get(key)
+                if row is None:
+                    self.misses += 1
+                    result.append(None)
+                else:
+                    self.index.move_to_end(key)
+                    self.hits += 1
+                    result.append(np.asarray(self._vectors[row], dtype=np.float32))
+            return result
+
+    def put_many(self, keys: List[str], vectors) -> list:
+        """
+        pending에 추가 후 float16으로 반올림된 벡터 반환 (hit / miss 결과가 항상 같도록)
+        - 파일 반영은 save()
+        """
+        vectors = np.asarray(vectors, dtype=np.float16)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            for key, vec in zip(keys, vectors):
+                self.pending[key] = vec
+                self.pending.move_to_end(key)
+        return [np.asarray(vec, dtype=np.float32) for vec in vectors]
+
+    def save(self, force: bool = True):
+        """pending 벡터를 파일에 반영 (force=False 이면 INDEX_SAVE_EVERY개 이상 모였을 때만)"""
+        with self._lock:
+            if not self.pending or (not force and len(self.pending) < INDEX_SAVE_EVERY):
+                return
+            with self._file_lock(exclusive=True):
+                # 잠금 전에 다른 프로세스가 저장한 row 할당을 놓치지 않도록 최신 index 기준으로 할당
+                self._reload_if_changed()
+                for key, vec in self.pending.items():
+                    row = self.index.get(key)
+                    if row is None:
+                        row = self._allocate()
+                        self.index[key] = row
+                    self._vectors[row] = vec
+                    self.index.move_to_end(key)
+                self._vectors.flush()
+
+                tmp_path = f"{self.index_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim, "rows": self.rows, "index": list(self.index.items())}, f)
+                os.replace(tmp_path, self.index_path)
+                self._index_signature = _file_signature(self.index_path)
+                self.pending.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.index) + len(self.pending),
+                "max_entries": self.max_entries,
+                "rows": self.rows,
+                "bytes": self.rows * (self.dim or 0) * 2,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def open_cache(path: str = EMBEDDING_CACHE_DIR) -> EmbeddingCache:
+    path = os.path.abspath(path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(path)
+        return _caches[path]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings 래퍼: 캐시에 없는 텍스트만 base 모델로 임베딩
+    - embed_documents: 빌드 시 배치 단위 조회 → miss만 한 번에 추론 → index 저장
+    - embed_query: 반복 질의는 모델 추론 없이 반환
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, cache: EmbeddingCache = None):
+        self.base = base
+        self.model_name = model_name
+        self.cache = cache or open_cache()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_key(self.model_name, t) for t in texts]
+        vectors = self.cache.get_many(keys)
+        missing = [i for i, vec in enumerate(vectors) if vec is None]
+        if missing:
+            computed = self.base.embed_documents([texts[i] for i in missing])
+            stored = self.cache.put_many([keys[i] for i in missing], computed)
+            for i, vec in zip(missing, stored):
+                vectors[i] = vec
+            self.cache.save()
+        return [vec.tolist() for vec in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_key(self.model_name, text)
+        vec = self.cache.get_many([key])[0]
+        if vec is None:
+            vec = self.cache.put_many([key], [self.base.embed_query(text)])[0]
+            self.cache.save(force=False)
+        return vec.tolist()
+
+
+def with_cache(base: Embeddings, model_name: str) -> Embeddings:
+    """EMBEDDING_CACHE=false 이면 base 그대로 반환"""
+    return CachedEmbeddings(base, model_name) if EMBEDDING_CACHE else base
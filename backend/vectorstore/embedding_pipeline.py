@@ -0,0 +1,198 @@
+# embedding_pipeline.py
+# 대량 인덱싱용 임베딩 파이프라인 (배치 단위 + 멀티 프로세스 + 완료 배치부터 바로 벡터 DB에 반영)
+
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from vectorstore.embedding_cache import EMBEDDING_CACHE, open_cache, text_key
+from vectorstore.flat_index import bulk_writes
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+# 이보다 적은 문서는 worker 프로세스 (모델 로드) 비용이 더 크므로 현재 프로세스에서 임베딩
+EMBEDDING_PARALLEL_MIN_DOCS = int(os.getenv("EMBEDDING_PARALLEL_MIN_DOCS", "2000"))
+
+
+# ============================== #
+#   스레드 / tokenizer 병렬도 설정   #
+# ============================== #
+
+def configure_parallelism(workers: int):
+    """
+    코어를 worker 수만큼 나눠 쓰도록 설정
+    - worker 1개: HF tokenizer 병렬 처리 허용 + torch가 전체 코어 사용
+    - worker 여러 개: 프로세스 단위로 이미 병렬이므로 tokenizer 병렬 처리 끄고 torch 스레드를 코어 / worker 로 제한
+      (fork 후 tokenizer 스레드 풀 deadlock 경고도 방지)
+    """
+    cores = os.cpu_count() or 1
+    threads = max(1, cores // max(1, workers))
+    os.environ["TOKENIZERS_PARALLELISM"] = "true" if workers <= 1 else "false"
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    return threads
+
+
+_worker_model = None
+
+
+def _init_worker(model_name: str, workers: int):
+    global _worker_model
+    configure_parallelism(workers)
+    from vectorstore.onnx_embeddings import load_base_embeddings
+    _worker_model = load_base_embeddings(model_name=model_name)  # EMBEDDING_BACKEND는 환경 변수로 상속
+
+
+def _embed_batch(texts: list) -> list:
+    return _worker_model.embed_documents(texts)
+
+
+# ============================== #
+#           파이프라인             #
+# ============================== #
+
+def _upsert(vector_db, ids: list, docs: list, vectors: list):
+    """
+    미리 계산한 벡터를 벡터 스토어 공개 API로 반영 (같은 id는 교체)
+    - flat / hnsw: add_embeddings 로 벡터를 그대로 저장
+    - Chroma: add_texts(ids=...) — 스토어 임베딩 (CachedEmbeddings) 이 방금 캐시에 넣은 벡터를 그대로 반환하므로 재추론 없음
+    """
+    texts = [doc.page_content for doc in docs]
+    metadatas = [doc.metadata for doc in docs]
+    add_embeddings = getattr(vector_db, "add_embeddings", None)
+    if add_embeddings is not None:
+        add_embeddings(list(zip(texts, [list(map(float, vec)) for vec in vectors])), metadatas=metadatas, ids=ids)
+    else:
+        vector_db.add_texts(texts, metadatas=metadatas, ids=ids)
+
+
+def embed_and_upsert(
+    vector_db,
+    ids: list,
+    docs: list,
+    embeddings,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    workers: int = EMBEDDING_WORKERS,
+    model_name: str = EMBEDDING_MODEL,
+) -> dict:
+    """
+    docs를 batch_size 단위로 임베딩해 vector_db에 upsert
+    - embeddings: vector_db를 열 때 쓴 임베딩 (load_embeddings 결과, 캐시 key 이름과 현재 프로세스 임베딩에 사용)
+    - 임베딩 캐시에 있는 텍스트는 추론 없이 바로 반영
+    - 문서 수가 EMBEDDING_PARALLEL_MIN_DOCS 이상이고 workers > 1 이면 ProcessPool로 배치를 코어에 분산
+    - 배치가 끝나는 순서대로 바로 upsert (in-flight 배치 수 제한, flat / hnsw는 bulk()로 마지막에 한 번 저장)
+    - Chroma + EMBEDDING_CACHE=false 는 미리 계산한 벡터를 넘길 공개 API가 없으므로 add_texts가 현재 프로세스에서 임베딩
+    - 반환: 문서 수 / 캐시 hit 수 / 소요 시간 / docs_per_sec
+    """
+    start = time.perf_counter()
+    cache = open_cache() if EMBEDDING_CACHE else None
+    # 캐시 key는 백엔드별 이름 사용 (CachedEmbeddings.model_name, 예: '...#onnx-int8')
+    cache_name = getattr(embeddings, "model_name", model_name)
+    base = getattr(embeddings, "base", embeddings)  # 캐시 래퍼는 여기서 직접 관리
+    texts = [doc.page_content for doc in docs]
+    cached = 0
+
+    if cache is None and getattr(vector_db, "add_embeddings", None) is None:
+        configure_parallelism(1)
+        with bulk_writes(vector_db):
+            for i in range(0, len(docs), batch_size):
+                vector_db.add_texts(texts[i:i + batch_size], metadatas=[doc.metadata for doc in docs[i:i + batch_size]],
+                                    ids=ids[i:i + batch_size])
+        return _report(len(docs), len(docs), 0, start)
+
+    batches = [list(range(i, min(i + batch_size, len(docs)))) for i in range(0, len(docs), batch_size)]
+
+    # flat / hnsw 백엔드는 배치마다 파일을 다시 쓰지 않고 모든 배치가 끝난 뒤 한 번만 저장
+    with bulk_writes(vector_db):
+        # 1. 캐시 hit 문서는 먼저 반영하고, miss만 임베딩 대상으로 남김
+        pending = []
+        for batch in batches:
+            if cache is None:
+                pending.append(batch)
+                continue
+            keys = [text_key(cache_name, texts[i]) for i in batch]
+            vectors = cache.get_many(keys)
+            hit = [i for i, vec in zip(batch, vectors) if vec is not None]
+            if hit:
+                _upsert(vector_db, [ids[i] for i in hit], [docs[i] for i in hit],
+                        [vec for vec in vectors if vec is not None])
+                cached += len(hit)
+            miss = [i for i, vec in zip(batch, vectors) if vec is None]
+            if miss:
+                pending.append(miss)
+
+        def finish(batch, vectors):
+            if cache is not None:
+                vectors = cache.put_many([text_key(cache_name, texts[i]) for i in batch], vectors)
+            _upsert(vector_db, [ids[i] for i in batch], [docs[i] for i in batch], vectors)
+
+        # 2. miss 배치 임베딩 → 완료 순서대로 upsert
+        to_embed = sum(len(batch) for batch in pending)
+        if to_embed >= EMBEDDING_PARALLEL_MIN_DOCS and workers > 1:
+            print(f"⚙️ {workers}개 프로세스로 {to_embed}개 문서 임베딩 (batch {batch_size})")
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(model_name, workers),
+            ) as pool:
+                queue, in_flight = list(pending), {}
+                while queue or in_flight:
+                    while queue and len(in_flight) < workers * 2:
+                        batch = queue.pop(0)
+                        in_flight[pool.submit(_embed_batch, [texts[i] for i in batch])] = batch
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(in_flight.pop(future), future.result())
+        elif pending:
+            configure_parallelism(1)
+            for batch in pending:
+                finish(batch, base.embed_documents([texts[i] for i in batch]))
+
+    if cache is not None:
+        cache.save()
+
+    return _report(len(docs), to_embed, cached, start)
+
+
+def _report(docs: int, embedded: int, cached: int, start: float) -> dict:
+    seconds = time.perf_counter() - start
+    stats = {
+        "docs": docs,
+        "embedded": embedded,
+        "cached": cached,
+        "seconds": round(seconds, 2),
+        "docs_per_sec": round(docs / seconds, 1) if seconds > 0 else 0.0,
+    }
+    print(f"📈 임베딩 {stats['embedded']}개 + 캐시 {stats['cached']}개 → {stats['docs_per_sec']} docs/sec")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="통합 메타데이터 JSON 여러 개를 벡터 DB에 일괄 인덱싱")
+    parser.add_argument("json_glob", help="예: 'utils/metadata/*/integrated_metadata.json'")
+    parser.add_argument("--persist-dir", default=os.path.join(os.path.dirname(__file__), "../utils/metadata/chroma_db"))
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=EMBEDDING_WORKERS)
+    args = parser.parse_args()
+
+    from vectorstore.build_vector_db import build_vector_db
+
+    start = time.perf_counter()
+    for path in sorted(glob.glob(args.json_glob)):
+        print(f"\n📄 {path}")
+        build_vector_db(path, args.persist_dir, batch_size=args.batch_size, workers=args.workers)
+    print(f"\n✅ 전체 인덱싱 완료: {time.perf_counter() - start:.1f}s")
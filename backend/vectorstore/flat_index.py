@@ -0,0 +1,553 @@
+# flat_index.py
+# Chroma 대체 벡터 백엔드 (float16 memmap 행렬 exact 검색 + 선택적 HNSW 근사 검색)
+# - VECTOR_BACKEND=flat | hnsw 로 선택 (기본값 chroma)
+# - <persist_dir>/flat/ 아래 일반 파일로 저장 → 여러 worker가 읽기 전용 memmap으로 공유
+# - 쓰기는 새 세대 파일을 만든 뒤 manifest.json 을 os.replace 로 교체 (기존 파일을 매핑 중인 reader는 영향 없음)
+# - 여러 writer 프로세스 (업로드 / 임베딩 파이프라인) 는 write.lock 파일 잠금으로 직렬화
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 스레드 잠금만 사용
+    fcntl = None
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+# 필터를 통과한 행이 이 수 이하면 hnsw 대신 해당 행만 exact 계산 (작은 논문 / source 필터)
+HNSW_EXACT_FILTER_ROWS = int(os.getenv("HNSW_EXACT_FILTER_ROWS", "2048"))
+SEARCH_CHUNK_ROWS = 65536  # float16 → float32 변환을 이 행 수 단위로 나눠 메모리 사용 제한
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+# ============================== #
+#     Chroma where 필터 호환        #
+# ============================== #
+
+_OPS = {
+    "$eq": lambda v, x: v == x,
+    "$ne": lambda v, x: v != x,
+    "$gt": lambda v, x: v is not None and v > x,
+    "$gte": lambda v, x: v is not None and v >= x,
+    "$lt": lambda v, x: v is not None and v < x,
+    "$lte": lambda v, x: v is not None and v <= x,
+    "$in": lambda v, x: v in x,
+    "$nin": lambda v, x: v not in x,
+}
+
+
+def match_where(metadata: dict, where: dict) -> bool:
+    """Chroma where 문법 ({"field": value | {"$op": value}}, $and / $or) 으로 메타데이터 검사"""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(match_where(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(match_where(metadata, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = metadata.get(key)
+            try:
+                if not all(_OPS[op](value, x) for op, x in cond.items()):
+                    return False
+            except TypeError:
+                return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
+
+
+# 검색 필터에 쓰는 메타데이터는 로드 시 컬럼 배열로 만들어 둠 (문자열: 코드 배열, 숫자: float 배열)
+INDEXED_COLUMNS = {"paper_id": "category", "source": "category", "year_int": "number"}
+
+
+def _build_columns(records: list) -> dict:
+    columns = {}
+    for key, kind in INDEXED_COLUMNS.items():
+        values = [record[2].get(key) for record in records]
+        if kind == "number":
+            columns[key] = ("number", np.array(
+                [v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in values],
+                dtype=np.float64))
+        else:
+            try:
+                codes = {}
+                array = np.array([codes.setdefault(v, len(codes)) for v in values], dtype=np.int32)
+            except TypeError:  # hash 불가능한 값 → 이 컬럼은 match_where로 처리
+                continue
+            columns[key] = ("category", array, codes)
+    return columns
+
+
+def _column_op(column: tuple, op: str, x) -> Optional[np.ndarray]:
+    """컬럼 하나에 대한 조건 → bool 배열 (지원하지 않는 조합이면 None)"""
+    try:
+        if column[0] == "number":
+            values = column[1]
+            if op in ("$in", "$nin"):
+                if not all(isinstance(v, (int, float)) for v in x):
+                    return None
+                mask = np.isin(values, list(x))
+                return mask if op == "$in" else ~mask
+            if not isinstance(x, (int, float)) or isinstance(x, bool):
+                return None
+            # nan (값 없음) 은 == / 대소 비교가 모두 False, != 는 True → match_where와 같음
+            return {"$eq": values == x, "$ne": values != x, "$gt": values > x, "$gte": values >= x,
+                    "$lt": values < x, "$lte": values <= x}.get(op)
+
+        _, codes, vocab = column
+        if op in ("$eq", "$ne"):
+            mask = codes == vocab.get(x, -1)
+            return mask if op == "$eq" else ~mask
+        if op in ("$in", "$nin"):
+            mask = np.isin(codes, [vocab[v] for v in x if v in vocab])
+            return mask if op == "$in" else ~mask
+    except TypeError:
+        return None
+    return None
+
+
+def _column_mask(columns: dict, where: dict, rows: int) -> Optional[np.ndarray]:
+    """where → bool 배열 (컬럼 배열에 없는 필드 / 연산이 하나라도 있으면 None)"""
+    mask = np.ones(rows, dtype=bool)
+    for key, cond in where.items():
+        if key in ("$and", "$or"):
+            parts = [_column_mask(columns, c, rows) for c in cond]
+            if any(part is None for part in parts):
+                return None
+            if parts:
+                mask &= np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts)
+            elif key == "$or":
+                mask[:] = False
+            continue
+        if key not in columns:
+            return None
+        for op, x in (cond.items() if isinstance(cond, dict) else [("$eq", cond)]):
+            part = _column_op(columns[key], op, x)
+            if part is None:
+                return None
+            mask &= part
+    return mask
+
+
+def bulk_writes(store):
+    """FlatVectorStore면 store.bulk() (쓰기를 모아 한 번에 저장), Chroma 등은 아무것도 하지 않는 context"""
+    bulk = getattr(store, "bulk", None)
+    return bulk() if bulk is not None else nullcontext()
+
+
+# ============================== #
+#          Flat / HNSW 스토어       #
+# ============================== #
+
+class FlatVectorStore(VectorStore):
+    """
+    LangChain VectorStore 인터페이스의 파일 기반 벡터 스토어
+    - manifest.json: 현재 세대 번호 / dim / 행 수 (마지막에 교체 → reader는 항상 한 세대의 파일 묶음만 읽음)
+    - vectors.<세대>.f16: 정규화된 (rows, dim) float16 행렬 (읽기 전용 memmap)
+    - records.<세대>.json: 행 순서대로 [id, page_content, metadata]
+    - hnsw.<세대>.bin: mode="hnsw" 일 때 hnswlib 그래프 (inner product)
+    - exact 검색은 행렬 곱 한 번 (청크 단위), hnsw는 ef_search 로 recall / 속도 조절
+    - 필터 통과 행이 적거나 hnsw 필터 탐색이 실패하면 통과 행만 exact 계산
+    - where 필터는 Chroma와 같은 문법 (paper_id / source / year_int 조건은 미리 만든 컬럼 배열로 계산)
+    - bulk() 블록 안의 upsert / delete는 모아서 블록이 끝날 때 한 번만 새 세대로 씀
+    - 새 세대 쓰기는 write.lock 잠금 안에서 manifest를 다시 읽은 뒤 최신 세대에 변경을 적용
+      (다른 프로세스가 먼저 쓴 세대를 덮어쓰거나 그 행을 잃지 않음)
+    """
+
+    def __init__(self, persist_directory: str, embedding_function: Embeddings, mode: str = "flat"):
+        self.dir = os.path.join(persist_directory, "flat")
+        self._embedding_function = embedding_function
+        self.mode = mode
+        self.generation = 0
+        self.vectors = None
+        self.records = []
+        self.row_of = {}
+        self.columns = {}
+        self.hnsw = None
+        self._staged = None  # bulk() 중 반영 대기: {"deleted": 삭제할 기존 id, "added": id → (벡터, record)}
+        self._lock = threading.RLock()
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    @staticmethod
+    def _names(generation: int) -> dict:
+        # 세대 0 = manifest 도입 전 파일 이름 (기존 스토어 그대로 읽기)
+        if generation == 0:
+            return {"vectors": "vectors.f16", "records": "records.json", "hnsw": "hnsw.bin"}
+        return {"vectors": f"vectors.{generation}.f16", "records": f"records.{generation}.json",
+                "hnsw": f"hnsw.{generation}.bin"}
+
+    def _manifest_generation(self) -> int:
+        try:
+            with open(self._path("manifest.json"), "r", encoding="utf-8") as f:
+                return json.load(f)["generation"]
+        except FileNotFoundError:
+            return 0
+
+    @contextmanager
+    def _file_lock(self):
+        """다른 프로세스의 세대 쓰기와 직렬화 (세대 번호 계산 ~ manifest 교체)"""
+        os.makedirs(self.dir, exist_ok=True)
+        with open(self._path("write.lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        self.vectors, self.hnsw, self.records, self.row_of, self.columns = None, None, [], {}, {}
+        self.generation = self._manifest_generation()
+        names = self._names(self.generation)
+        if not os.path.exists(self._path(names["records"])):
+            return
+        with open(self._path(names["records"]), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        self.records = saved["records"]
+        self.row_of = {record[0]: row for row, record in enumerate(self.records)}
+        self.columns = _build_columns(self.records)
+        if self.records:
+            self.vectors = np.memmap(self._path(names["vectors"]), dtype=np.float16, mode="r",
+                                     shape=(len(self.records), saved["dim"]))
+        if self.mode == "hnsw" and self.records and os.path.exists(self._path(names["hnsw"])):
+            import hnswlib
+            self.hnsw = hnswlib.Index(space="ip", dim=saved["dim"])
+            self.hnsw.load_index(self._path(names["hnsw"]), max_elements=len(self.records))
+            self.hnsw.set_ef(HNSW_EF_SEARCH)
+
+    def _commit(self, deleted: set, added: dict):
+        """
+        잠금 안에서 최신 세대를 다시 읽고 (다른 프로세스가 쓴 경우) 삭제 / 추가를 적용해 새 세대로 씀
+        - deleted: 지울 id, added: id → (벡터, record) (같은 id의 기존 행은 교체)
+        """
+        with self._file_lock():
+            if self._manifest_generation() != self.generation:
+                self._load()
+            keep_rows = [row for doc_id, row in self.row_of.items() if doc_id not in deleted and doc_id not in added]
+            if len(keep_rows) == len(self.records) and not added:
+                return
+            self._write(keep_rows, list(added.values()))
+
+    def _write(self, keep_rows: list, added: list):
+        """
+        기존 행 일부 (keep_rows) + 새 행 (added: [(벡터, record)]) 을 새 세대 파일로 쓰고 manifest 교체 (_commit 잠금 안에서 호출)
+        - 기존 행 벡터는 memmap에서 청크 단위로 복사 (전체를 float32로 올리지 않음)
+        - 바로 이전 세대 파일은 남겨 둠 (manifest를 막 읽은 reader용), 그보다 오래된 파일은 삭제
+        """
+        generation = self.generation + 1
+        names = self._names(generation)
+        dim = self.vectors.shape[1] if self.vectors is not None else len(added[0][0])
+        records = [self.records[row] for row in keep_rows] + [record for _, record in added]
+
+        with open(self._path(names["vectors"]), "wb") as f:
+            for start in range(0, len(keep_rows), SEARCH_CHUNK_ROWS):
+                np.asarray(self.vectors[keep_rows[start:start + SEARCH_CHUNK_ROWS]], dtype=np.float16).tofile(f)
+            if added:
+                np.asarray([vec for vec, _ in added], dtype=np.float16).tofile(f)
+
+        if self.mode == "hnsw" and len(records):
+            import hnswlib
+            vectors = np.memmap(self._path(names["vectors"]), dtype=np.float16, mode="r", shape=(len(records), dim))
+            index = hnswlib.Index(space="ip", dim=dim)
+            index.init_index(max_elements=len(records), ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+            for start in range(0, len(records), SEARCH_CHUNK_ROWS):
+                chunk = np.asarray(vectors[start:start + SEARCH_CHUNK_ROWS], dtype=np.float32)
+                index.add_items(chunk, np.arange(start, start + len(chunk)))
+            index.save_index(self._path(names["hnsw"]))
+
+        with open(self._path(names["records"]), "w", encoding="utf-8") as f:
+            json.dump({"dim": dim, "records": records}, f, ensure_ascii=False)
+
+        # manifest를 마지막에 교체 (reader는 manifest가 가리키는 세대만 읽음)
+        tmp = self._path("manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "dim": dim, "rows": len(records)}, f)
+        os.replace(tmp, self._path("manifest.json"))
+
+        live = set(self._names(generation).values()) | set(self._names(generation - 1).values())
+        for name in os.listdir(self.dir):
+            if name.split(".", 1)[0] in ("vectors", "records", "hnsw") and name not in live:
+                os.remove(self._path(name))
+        self._load()
+
+    # ---------- 쓰기 ----------
+
+    @contextmanager
+    def bulk(self):
+        """블록 안의 upsert / delete를 모아 블록이 끝날 때 한 번만 파일로 씀 (중첩 시 가장 바깥 블록 기준)"""
+        with self._lock:
+            outer = self._staged is None
+            if outer:
+                self._staged = {"deleted": set(), "added": {}}
+            try:
+                yield self
+            finally:
+                if outer:
+                    staged, self._staged = self._staged, None
+                    if staged["deleted"] or staged["added"]:
+                        self._commit(staged["deleted"], staged["added"])
+
+    def add_embeddings(self, text_embeddings: Iterable[Tuple[str, List[float]]], metadatas: Optional[List[dict]] = None,
+                       ids: Optional[List[str]] = None, **kwargs) -> List[str]:
+        """
+        미리 계산한 (text, 벡터) 로 추가 / 교체 (같은 id는 교체, embedding_pipeline / copy_from_chroma 에서 사용)
+        - ids가 없으면 loader.document_id 와 같은 content hash (다른 프로세스가 추가한 행의 id와 겹치지 않음)
+        """
+        text_embeddings = list(text_embeddings)
+        metadatas = metadatas or [{} for _ in text_embeddings]
+        if not ids:
+            from vectorstore.loader import document_id
+            ids = [document_id(Document(page_content=text, metadata=meta or {}))
+                   for (text, _), meta in zip(text_embeddings, metadatas)]
+        new_vectors = _unit_rows([vec for _, vec in text_embeddings])
+        with self.bulk():
+            deleted, added = self._staged["deleted"], self._staged["added"]
+            for doc_id, vec, (text, _), meta in zip(ids, new_vectors, text_embeddings, metadatas):
+                deleted.discard(doc_id)
+                added[doc_id] = (vec, [doc_id, text, meta or {}])
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(zip(texts, self._embedding_function.embed_documents(texts)), metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs):
+        with self.bulk():
+            for doc_id in ids or []:
+                self._staged["deleted"].add(doc_id)
+                self._staged["added"].pop(doc_id, None)
+
+    # ---------- 읽기 ----------
+
+    def filter_mask(self, where: dict) -> np.ndarray:
+        """where 조건을 통과하는 행 bool 배열 (컬럼 배열로 계산할 수 없는 조건만 행별 match_where)"""
+        mask = _column_mask(self.columns, where, len(self.records))
+        if mask is None:
+            mask = np.fromiter((match_where(record[2], where) for record in self.records),
+                               dtype=bool, count=len(self.records))
+        return mask
+
+    def get(self, ids: list = None, where: dict = None, include: list = None, **kwargs) -> dict:
+        """Chroma.get 과 같은 형식 ({"ids", "documents", "metadatas", "embeddings"})"""
+        include = ["documents", "metadatas"] if include is None else include
+        rows = [self.row_of[i] for i in ids if i in self.row_of] if ids is not None else range(len(self.records))
+        if where:
+            allowed = self.filter_mask(where)
+            rows = [row for row in rows if allowed[row]]
+        result = {"ids": [self.records[row][0] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [self.records[row][1] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self.records[row][2] for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = [np.asarray(self.vectors[row], dtype=np.float32).tolist() for row in rows]
+        return result
+
+    def _document(self, row: int) -> Document:
+        doc_id, text, metadata = self.records[row]
+        return Document(page_content=text, metadata=dict(metadata), id=doc_id)
+
+    def search_by_vector(self, query_vector, k: int = 4, filter: dict = None) -> list:
+        """[(row, score)] 상위 k개 (score = 코사인 유사도)"""
+        if self.vectors is None or not len(self.records):
+            return []
+        q = _unit_rows(query_vector)[0]
+        allowed = None
+        if filter:
+            allowed = self.filter_mask(filter)
+            if not allowed.any():
+                return []
+
+        if self.hnsw is not None and (allowed is None or int(allowed.sum()) > HNSW_EXACT_FILTER_ROWS):
+            k_eff = min(k, int(allowed.sum()) if allowed is not None else len(self.records))
+            self.hnsw.set_ef(max(HNSW_EF_SEARCH, k_eff * 2))
+            try:
+                labels, distances = self.hnsw.knn_query(
+                    q, k=k_eff, filter=(lambda row: bool(allowed[row])) if allowed is not None else None
+                )
+                return [(int(row), 1.0 - float(dist)) for row, dist in zip(labels[0], distances[0])]
+            except RuntimeError:
+                # 필터가 제한적이면 그래프 탐색이 k_eff개를 찾지 못해 hnswlib가 RuntimeError → exact 계산
+                pass
+
+        return self._exact_search(q, k, allowed)
+
+    def _exact_search(self, q: np.ndarray, k: int, allowed: Optional[np.ndarray]) -> list:
+        """전체 (또는 allowed 행만) 코사인 유사도 계산 후 상위 k개"""
+        rows = np.flatnonzero(allowed) if allowed is not None else None
+        count = len(self.records) if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SEARCH_CHUNK_ROWS):
+            if rows is None:
+                chunk = self.vectors[start:start + SEARCH_CHUNK_ROWS]
+            else:
+                chunk = self.vectors[rows[start:start + SEARCH_CHUNK_ROWS]]
+            chunk = np.asarray(chunk, dtype=np.float32)
+            scores[start:start + len(chunk)] = chunk @ q
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        if rows is not None:
+            return [(int(rows[i]), float(scores[i])) for i in top]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs) -> list:
+        query_vector = self._embedding_function.embed_query(query)
+        return [(self._document(row), score) for row, score in self.search_by_vector(query_vector, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   persist_directory: str = None, mode: str = "flat", ids: Optional[List[str]] = None, **kwargs):
+        store = cls(persist_directory, embedding, mode=mode)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+
+# ============================== #
+#        벡터를 만든 임베딩 기록       #
+# ============================== #
+
+EMBEDDING_MARKER = "embedding.json"
+
+
+class EmbeddingMismatchError(ValueError):
+    """벡터 스토어의 벡터와 현재 임베딩 (EMBEDDING_BACKEND) 이 다를 때"""
+
+
+def stored_embedding(persist_dir: str) -> Optional[str]:
+    """persist 디렉토리의 벡터를 만든 임베딩 이름 (onnx_embeddings.embedding_name, 기록이 없으면 None)"""
+    try:
+        with open(os.path.join(persist_dir, EMBEDDING_MARKER), "r", encoding="utf-8") as f:
+            return json.load(f).get("embedding")
+    except FileNotFoundError:
+        return None
+
+
+def mark_embedding(persist_dir: str, name: str):
+    os.makedirs(persist_dir, exist_ok=True)
+    tmp = os.path.join(persist_dir, f"{EMBEDDING_MARKER}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"embedding": name}, f)
+    os.replace(tmp, os.path.join(persist_dir, EMBEDDING_MARKER))
+
+
+def open_vector_store(persist_dir: str, embedding_function: Embeddings, backend: str = VECTOR_BACKEND,
+                      embedding_name: str = None):
+    """
+    VECTOR_BACKEND (chroma / flat / hnsw) 에 맞는 벡터 스토어
+    - embedding_name을 주면 스토어에 기록된 임베딩과 비교해 다르면 EmbeddingMismatchError
+      (다른 임베딩 공간의 질의 벡터로 검색하지 않도록, build_vector_db가 다시 임베딩해야 열림)
+    """
+    stored = stored_embedding(persist_dir)
+    if embedding_name is not None and stored is not None and stored != embedding_name:
+        raise EmbeddingMismatchError(
+            f"벡터 DB ({persist_dir}) 는 '{stored}' 임베딩으로 만들어졌습니다 (현재: '{embedding_name}'). "
+            f"build_vector_db를 다시 실행해 현재 임베딩으로 다시 임베딩하세요."
+        )
+    if backend in ("flat", "hnsw"):
+        return FlatVectorStore(persist_dir, embedding_function, mode=backend)
+    from langchain_chroma import Chroma
+    return Chroma(persist_directory=persist_dir, embedding_function=embedding_function)
+
+
+def copy_from_chroma(chroma_db, persist_dir: str, mode: str = "flat") -> FlatVectorStore:
+    """기존 Chroma 컬렉션의 벡터를 다시 임베딩하지 않고 그대로 옮김"""
+    data = chroma_db.get(include=["documents", "metadatas", "embeddings"])
+    store = FlatVectorStore(persist_dir, chroma_db.embeddings, mode=mode)
+    if len(data["ids"]):
+        store.add_embeddings(zip(data["documents"], data["embeddings"]), metadatas=data["metadatas"], ids=data["ids"])
+    return store
+
+
+# ============================== #
+#        Chroma 대비 벤치마크        #
+# ============================== #
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chroma → flat / hnsw 변환 및 recall@k, p50/p99 비교")
+    parser.add_argument("--persist-dir", default=os.path.join(os.path.dirname(__file__), "../utils/metadata/chroma_db"))
+    parser.add_argument("--questions", default=os.path.join(os.path.dirname(__file__), "../graphdb/router_questions.json"))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--modes", default="flat,hnsw")
+    args = parser.parse_args()
+
+    from langchain_chroma import Chroma
+    from vectorstore.onnx_embeddings import load_embeddings
+
+    embeddings = load_embeddings()
+    chroma_db = Chroma(persist_directory=args.persist_dir, embedding_function=embeddings)
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [item["question"] for item in json.load(f)]
+    query_vectors = [embeddings.embed_query(q) for q in questions]
+
+    stores = {"chroma": chroma_db}
+    for mode in args.modes.split(","):
+        start = time.perf_counter()
+        stores[mode] = copy_from_chroma(chroma_db, args.persist_dir, mode=mode)
+        print(f"📦 {mode} 변환 {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        FlatVectorStore(args.persist_dir, embeddings, mode=mode)
+        print(f"📂 {mode} cold open {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    # 정답 = float32 전체 행렬 exact top-k
+    exact = stores.get("flat") or copy_from_chroma(chroma_db, args.persist_dir, mode="flat")
+    truth = [{exact.records[row][0] for row, _ in exact.search_by_vector(v, args.k)} for v in query_vectors]
+
+    report = {}
+    for name, store in stores.items():
+        latencies, recalls = [], []
+        for vec, expected in zip(query_vectors, truth):
+            t0 = time.perf_counter()
+            if name == "chroma":
+                found = {doc.id for doc in store.similarity_search_by_vector(vec, k=args.k)}
+            else:
+                found = {store.records[row][0] for row, _ in store.search_by_vector(vec, args.k)}
+            latencies.append((time.perf_counter() - t0) * 1000)
+            recalls.append(len(found & expected) / max(1, len(expected)))
+        latencies.sort()
+        report[name] = {
+            f"recall@{args.k}": round(float(np.mean(recalls)), 4),
+            "p50_ms": round(latencies[len(latencies) // 2], 3),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
@@ -1,13 +1,45 @@
+import hashlib
 import json
+import os
+import sys
 from typing import List
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-def load_metadata_as_documents(json_path: str) -> List[Document]:
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from graphdb.graph_schema import citing_work_id
+
+# 본문 chunking 설정 (vectorstore/benchmark.py 로 설정별 recall / 지연 시간 비교)
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
+
+
+def document_id(doc: Document) -> str:
+    """본문 + 메타데이터 content hash (내용이 같으면 항상 같은 id)"""
+    payload = json.dumps([doc.page_content, doc.metadata], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _year_int(value) -> int:
+    # 연도 범위 필터용 정수 연도 (알 수 없으면 0)
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+def load_metadata_as_documents(
+    json_path: str,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+) -> List[Document]:
     """
     통합 메타데이터(JSON) → LangChain Document 리스트로 변환
     - 본문은 chunking 후 각 chunk마다 Document로 저장
     - reference는 하나씩 Document로 저장
+    - 모든 Document에 업로드 논문 식별자 (paper_id = work_id) 기록 → 논문 단위 증분 인덱싱
+    - year_int (정수 연도, 미상이면 0) 로 검색 시 연도 범위 필터 적용
     """
     documents = []
 
@@ -16,19 +48,23 @@ def load_metadata_as_documents(json_path: str) -> List[Document]:
 
     # ✅ 본문 chunking
     paper_title = metadata.get("title", "").strip()
+    paper_id = citing_work_id(metadata)
+    paper_year = _year_int(metadata.get("year"))
     abstract_original = metadata.get("abstract_original", "").strip()
     abstract_llm = metadata.get("abstract_llm", "").strip()
     body_text = metadata.get("body_fixed", "").strip()
 
     # chunking
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     body_chunks = text_splitter.create_documents([body_text])
 
     for idx, chunk in enumerate(body_chunks):
         chunk.metadata = {
             "source": "original_paper_body",
             "title": paper_title,
-            "chunk_id": idx
+            "chunk_id": idx,
+            "year_int": paper_year,
+            "paper_id": paper_id
         }
         documents.append(chunk)
 
@@ -44,7 +80,7 @@ Abstract (LLM Summary):
 """
     documents.append(Document(
         page_content=full_original_text.strip(),
-        metadata={"source": "original paper", "title": paper_title}
+        metadata={"source": "original paper", "title": paper_title, "year_int": paper_year, "paper_id": paper_id}
     ))
 
     # ✅ reference 논문 처리
@@ -67,10 +103,12 @@ Citation Contexts:
             "ref_num": ref_num,
             "title": title,
             "year": str(ref.get("year") or "unknown"),
+            "year_int": _year_int(ref.get("year")),
             "authors": ", ".join(ref.get("authors", [])) if isinstance(ref.get("authors", []), list) else "-",
             "doi": ref.get("doi") or "",
             "citation_count": int(ref.get("citation_count") or 0),
-            "source": "reference paper"
+            "source": "reference paper",
+            "paper_id": paper_id
         }
 
         documents.append(Document(page_content=page_content.strip(), metadata=doc_metadata))
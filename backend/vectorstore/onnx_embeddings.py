@@ -0,0 +1,226 @@
+# onnx_embeddings.py
+# MiniLM int8 양자화 ONNX 임베딩 백엔드 (CPU 추론, PyTorch 불필요)
+# - EMBEDDING_BACKEND=onnx 로 선택 (기본값 torch = HuggingFaceEmbeddings)
+# - 최초 1회 export_quantized() 로 모델 변환 (optimum 필요), 이후 onnxruntime + tokenizers 만 사용
+
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from vectorstore.embedding_cache import with_cache
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.dirname(__file__), "../utils/metadata/.cache/onnx/all-MiniLM-L6-v2-int8"),
+)
+ONNX_MAX_LENGTH = 256  # all-MiniLM-L6-v2 max_seq_length
+ONNX_BATCH_SIZE = int(os.getenv("ONNX_BATCH_SIZE", "32"))
+
+
+def export_quantized(model_name: str = EMBEDDING_MODEL, out_dir: str = ONNX_MODEL_DIR) -> str:
+    """
+    HF 모델 → ONNX export → dynamic int8 양자화 (가중치만 int8, 활성값은 런타임 양자화)
+    - out_dir/model_quantized.onnx + tokenizer.json 생성
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+    except ImportError as e:
+        raise ImportError("ONNX 변환에는 optimum[onnxruntime] 이 필요합니다: pip install 'optimum[onnxruntime]'") from e
+
+    print(f"📦 ONNX export 중: {model_name} → {out_dir}")
+    model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+    model.save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(out_dir)
+
+    quantizer = ORTQuantizer.from_pretrained(out_dir)
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=out_dir, quantization_config=qconfig)
+    print("✅ int8 양자화 완료")
+    return os.path.join(out_dir, "model_quantized.onnx")
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    sentence-transformers 파이프라인 (Transformer → mean pooling → L2 normalize) 을 onnxruntime으로 재현
+    - 세션 스레드 수는 ONNX_THREADS (기본: onnxruntime 기본값)
+    """
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, batch_size: int = ONNX_BATCH_SIZE):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_path):
+            model_path = export_quantized(out_dir=model_dir)
+
+        options = ort.SessionOptions()
+        if os.getenv("ONNX_THREADS"):
+            options.intra_op_num_threads = int(os.getenv("ONNX_THREADS"))
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=ONNX_MAX_LENGTH)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed(texts[i:i + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+
+def load_base_embeddings(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL) -> Embeddings:
+    if backend == "onnx":
+        print("🧠 ONNX int8 임베딩 모델 로딩 중...")
+        return OnnxEmbeddings()
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def embedding_name(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL) -> str:
+    """
+    벡터를 만든 임베딩 식별자 (torch: 모델명, onnx: '모델명#onnx-int8')
+    - 임베딩 캐시 key, 벡터 스토어에 기록하는 임베딩 이름 (flat_index.stored_embedding) 에 공통 사용
+    """
+    return model_name if backend != "onnx" else f"{model_name}#onnx-int8"
+
+
+def load_embeddings(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL) -> Embeddings:
+    """
+    설정된 백엔드의 임베딩 (+ 임베딩 캐시)
+    - 캐시 key의 모델명에 백엔드를 포함해 torch / onnx 벡터가 섞이지 않도록 함
+    """
+    return with_cache(load_base_embeddings(backend, model_name), embedding_name(backend, model_name))
+
+
+# ============================== #
+#        동등성 검증 / 벤치마크      #
+# ============================== #
+
+def retrieval_overlap(reference: Embeddings, candidate: Embeddings, questions: list, docs: list, k: int = 5) -> dict:
+    """두 임베딩으로 각각 top-k 문서를 뽑아 겹치는 비율 (overlap@k) 비교"""
+    ref_docs = np.asarray(reference.embed_documents(docs), dtype=np.float32)
+    cand_docs = np.asarray(candidate.embed_documents(docs), dtype=np.float32)
+
+    overlaps, cosines = [], []
+    for question in questions:
+        ref_q = np.asarray(reference.embed_query(question), dtype=np.float32)
+        cand_q = np.asarray(candidate.embed_query(question), dtype=np.float32)
+        ref_top = set(np.argsort(-ref_docs @ ref_q)[:k])
+        cand_top = set(np.argsort(-cand_docs @ cand_q)[:k])
+        overlaps.append(len(ref_top & cand_top) / min(k, len(docs)))
+        cosines.append(float(ref_q @ cand_q / (np.linalg.norm(ref_q) * np.linalg.norm(cand_q))))
+
+    return {
+        "questions": len(questions),
+        "docs": len(docs),
+        "k": k,
+        "mean_overlap_at_k": round(float(np.mean(overlaps)), 4),
+        "min_overlap_at_k": round(float(np.min(overlaps)), 4),
+        "mean_query_cosine": round(float(np.mean(cosines)), 4),
+    }
+
+
+def _bench_backend(backend: str, questions: list, result_queue):
+    # 백엔드별 별도 프로세스에서 측정해야 RSS가 섞이지 않음
+    import resource
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    embeddings = load_base_embeddings(backend)
+    embeddings.embed_query("warm up")
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    for question in questions:
+        t0 = time.perf_counter()
+        embeddings.embed_query(question)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Linux: KB
+    result_queue.put({
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+        "max_rss_mb": round(rss_after / 1024, 1),
+        "model_rss_mb": round((rss_after - rss_before) / 1024, 1),
+    })
+
+
+def benchmark(questions: list, backends=("torch", "onnx")) -> list:
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        queue = context.Queue()
+        process = context.Process(target=_bench_backend, args=(backend, questions, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="ONNX int8 임베딩 백엔드 변환 / 동등성 검증 / 벤치마크")
+    parser.add_argument("--export", action="store_true", help="ONNX export + int8 양자화만 수행")
+    parser.add_argument("--metadata", default=os.path.join(os.path.dirname(__file__), "../utils/metadata/integrated_metadata.json"))
+    parser.add_argument("--questions", default=os.path.join(os.path.dirname(__file__), "../graphdb/router_questions.json"))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-overlap", type=float, default=0.9, help="mean overlap@k가 이보다 낮으면 실패 (exit 1)")
+    args = parser.parse_args()
+
+    if args.export:
+        export_quantized()
+        sys.exit(0)
+
+    from vectorstore.loader import load_metadata_as_documents
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [item["question"] for item in json.load(f)]
+    docs = [doc.page_content for doc in load_metadata_as_documents(args.metadata)]
+
+    overlap = retrieval_overlap(load_base_embeddings("torch"), load_base_embeddings("onnx"), questions, docs, k=args.k)
+    print("🔍 top-k 검색 결과 동등성 (torch 기준):")
+    print(json.dumps(overlap, ensure_ascii=False, indent=2))
+
+    print("\n⏱️ 질의 임베딩 지연 시간 / 메모리:")
+    print(json.dumps(benchmark(questions), ensure_ascii=False, indent=2))
+
+    if overlap["mean_overlap_at_k"] < args.min_overlap:
+        print(f"❌ mean overlap@{args.k} {overlap['mean_overlap_at_k']} < {args.min_overlap}")
+        sys.exit(1)
+    print("✅ 동등성 기준 통과")
@@ -1,24 +1,25 @@
 import os
 import sys
-from typing import List, Tuple, Union
+from typing import List, Optional, Tuple, Union
 
 # ✅ tokenizer warning 제거
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 # ✅ RefNavi 루트 경로 추가 (상대 경로 문제 방지용)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # ✅ LangChain 최신 모듈
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 from langchain_core.prompts import PromptTemplate
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
 
 # ✅ 사용자 정의 모듈
 from dotenv import load_dotenv
+from vectorstore.vector_qa import vector_qa_service, retrieve_documents
+from vectorstore.context_packer import PackedRetriever
 
 # ✅ .env 파일 명시적으로 로딩
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".env")
@@ -32,14 +33,7 @@ base_dir = os.path.join(os.path.dirname(__file__), "..")
 VECTOR_DB_DIR = os.path.join(base_dir, "utils/metadata/chroma_db")
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
-# ✅ 전역 embedding + vector DB 인스턴스
-embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-
-memory = ConversationBufferMemory(
-    memory_key = 'chat_history',
-    return_messages = True,
-    output_key='answer'
-)
+# ✅ embedding / LLM / vector DB 인스턴스는 vector_qa_service와 공유
 
 qa_template = """
 You are RefNavi, an academic assistant chatbot that helps users understand scientific papers using retrieved documents and your own knowledge.
@@ -72,27 +66,37 @@ qa_prompt = PromptTemplate(
     template=qa_template,
 )
 
+class RetrieveDocumentsRetriever(BaseRetriever):
+    """retrieve_documents를 ConversationalRetrievalChain에서 쓰기 위한 retriever 래퍼 (history 반영된 질문으로 검색)"""
+
+    k: int = 3
+    persist_dir: str = VECTOR_DB_DIR
+    filters: Optional[dict] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return retrieve_documents(query, k=self.k, VECTOR_DB_DIR=self.persist_dir, filters=self.filters)
+
+
 def run_qa_chain(
     query: str,
     k: int = 3,
     VECTOR_DB_DIR = VECTOR_DB_DIR,
     return_sources: bool = False,
-
+    chat_history: List = None,
+    filters: dict = None,
 ) -> Union[str, Tuple[str, List[Document]]]:
-    print(f"\n🔍 질의: '{query}' → 유사 문서 검색 중...")
-
-    llm = ChatOpenAI(model_name="gpt-4", temperature=0, openai_api_key=OPENAI_API_KEY)
-    db = Chroma(persist_directory=VECTOR_DB_DIR, embedding_function=embeddings)
+    # ✅ 검색은 vector_qa.retrieve_documents와 같은 경로 (메타데이터 필터 + 질문 추론 가중 + BM25 RRF)
+    retriever = RetrieveDocumentsRetriever(k=k, persist_dir=VECTOR_DB_DIR, filters=filters)
 
     qa_chain = ConversationalRetrievalChain.from_llm(
-        llm=llm,
-        retriever=db.as_retriever(search_kwargs={"k": k}),
-        memory=memory,
+        llm=vector_qa_service.llm,
+        retriever=PackedRetriever(retriever=retriever),  # ✅ 토큰 예산 안으로 context 압축
         return_source_documents=True,
         combine_docs_chain_kwargs={"prompt":qa_prompt, "output_key": "answer"} 
     )
 
-    result = qa_chain.invoke({"question": query})
+    # ✅ 히스토리는 호출 측 (세션별 ConversationStore) 에서 전달 — 전역 memory 공유 없음
+    result = qa_chain.invoke({"question": query, "chat_history": chat_history or []})
     answer = result["answer"]
     sources: List[Document] = result.get("source_documents", [])
 
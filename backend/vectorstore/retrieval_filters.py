@@ -0,0 +1,119 @@
+# retrieval_filters.py
+# 검색 메타데이터 필터 (source / 연도 범위 / paper_id) → 벡터 스토어 where 조건
+# - QueryRequest.filters 로 직접 받거나, 질문에서 추론 (infer_filters)
+# - 검색 후 거르는 대신 인덱스 검색 자체에 적용 (작은 k에서도 조건에 맞는 문서를 k개 확보)
+# - 질문에서 추론한 필터는 hard 필터가 아니라 추가 검색 결과로 순위만 올림 (추론이 틀려도 결과가 사라지지 않음)
+
+import re
+
+SOURCE_BODY = "original_paper_body"
+SOURCE_ORIGINAL = "original paper"
+SOURCE_REFERENCE = "reference paper"
+SOURCES = [SOURCE_BODY, SOURCE_ORIGINAL, SOURCE_REFERENCE]
+
+FILTER_FIELDS = ["source", "year_min", "year_max", "paper_id"]
+
+# 단서는 정규식 (영문은 단어 경계 기준: "intersection"의 section, "reference implementation" 등 제외)
+REFERENCE_CUES = [
+    r"\breferences?\b(?! implementation| model| solution| value| point)", r"\bcited (?:paper|work)s?\b",
+    "레퍼런스", "참고문헌", "참조 논문", "인용된 논문", "인용한 논문",
+]
+BODY_CUES = [r"\bin the body\b", r"\bsections?\b", "본문", "섹션", "이 논문에서", "이 논문의 실험", r"\bthis paper's experiment"]
+# 연도 표현이 논문 출판 연도를 가리키는지 판단하는 단서 ("2015-2017 data" 같은 데이터 기간 제외)
+PUBLICATION_CUES = [
+    r"\bpublish", r"\bpublication", r"\bpapers?\b", r"\bworks?\b", r"\breferences?\b", r"\bcited\b",
+    "논문", "발표", "출판", "레퍼런스", "참고문헌",
+]
+
+_YEAR = r"((?:19|20)\d{2})"
+YEAR_PATTERNS = [
+    (rf"between {_YEAR} and {_YEAR}", "range"),
+    (rf"{_YEAR}\s*(?:년)?\s*(?:~|-|부터)\s*{_YEAR}", "range"),
+    (rf"(?:after|since|from) {_YEAR}", "min"),
+    (rf"{_YEAR}\s*년?\s*(?:이후|부터)", "min"),
+    (rf"(?:before|until|prior to) {_YEAR}", "max"),
+    (rf"{_YEAR}\s*년?\s*(?:이전|까지)", "max"),
+    (rf"(?:in|published in) {_YEAR}\b", "exact"),
+    (rf"{_YEAR}\s*년(?:에|도)", "exact"),
+]
+
+
+def _has(question: str, patterns: list) -> bool:
+    return any(re.search(p, question) for p in patterns)
+
+
+def infer_filters(question: str) -> dict:
+    """
+    질문 → 필터 dict (확실한 단서가 있는 항목만)
+    - reference 단서 → source=reference paper / 본문 단서 → source=original_paper_body
+    - 연도 표현 (after 2015, 2017년 이전, between 2014 and 2017 ...) → year_min / year_max (출판 단서가 있을 때만)
+    - 추론 결과는 검색을 제한하지 않고 vector_qa에서 RRF 가중 검색으로만 사용
+    """
+    q = re.sub(r"\s+", " ", question.lower())
+    filters = {}
+
+    if _has(q, REFERENCE_CUES):
+        filters["source"] = SOURCE_REFERENCE
+    elif _has(q, BODY_CUES):
+        filters["source"] = SOURCE_BODY
+
+    for pattern, kind in YEAR_PATTERNS if _has(q, PUBLICATION_CUES) else []:
+        match = re.search(pattern, q)
+        if not match:
+            continue
+        years = [int(y) for y in match.groups()]
+        if kind == "range":
+            filters["year_min"], filters["year_max"] = min(years), max(years)
+        elif kind == "min":
+            filters["year_min"] = years[0]
+        elif kind == "max":
+            filters["year_max"] = years[0]
+        else:
+            filters["year_min"] = filters["year_max"] = years[0]
+        break
+
+    # 연도 조건은 reference 문서에만 year_int가 의미 있으므로 source도 함께 고정
+    if ("year_min" in filters or "year_max" in filters) and "source" not in filters:
+        filters["source"] = SOURCE_REFERENCE
+    return filters
+
+
+def clean_filters(filters: dict) -> dict:
+    """None / 빈 값 제거 + 알 수 없는 source 검증"""
+    filters = {k: v for k, v in (filters or {}).items() if k in FILTER_FIELDS and v not in (None, "")}
+    if "source" in filters and filters["source"] not in SOURCES:
+        raise ValueError(f"source는 {SOURCES} 중 하나여야 합니다: {filters['source']}")
+    return filters
+
+
+def to_where(filters: dict):
+    """필터 dict → Chroma where 문법 (조건이 2개 이상이면 $and, 없으면 None)"""
+    filters = clean_filters(filters)
+    conditions = []
+    if "source" in filters:
+        conditions.append({"source": filters["source"]})
+    if "paper_id" in filters:
+        conditions.append({"paper_id": filters["paper_id"]})
+    if "year_min" in filters:
+        conditions.append({"year_int": {"$gte": int(filters["year_min"])}})
+    if "year_max" in filters:
+        conditions.append({"year_int": {"$lte": int(filters["year_max"])}})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+if __name__ == "__main__":
+    for question in [
+        "GraphSAGE 관련 레퍼런스를 알려줘",
+        "references published after 2015 about attention",
+        "2014년부터 2016년까지 나온 참고문헌은?",
+        "본문에서 positional encoding 설명해줘",
+        "transformer 논문에 대해 설명해줘",
+        "what was the reference implementation's learning rate?",
+        "how was the 2015-2017 data split?",
+        "what is the intersection of the two masks?",
+    ]:
+        filters = infer_filters(question)
+        print(f"{question}\n  → {filters}\n  → {to_where(filters)}")
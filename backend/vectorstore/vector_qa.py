@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 from typing import List, Tuple, Union
 
 # ✅ tokenizer warning 제거
@@ -7,9 +8,9 @@ os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 # ✅ RefNavi 루트 경로 추가 (상대 경로 문제 방지용)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # ✅ LangChain 최신 모듈
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts.chat import (
@@ -23,6 +24,13 @@ from langchain_core.documents import Document
 
 # ✅ 사용자 정의 모듈
 from dotenv import load_dotenv
+from utils.versioning import get_version
+from vectorstore.onnx_embeddings import load_embeddings, embedding_name
+from vectorstore.bm25_index import BM25Index, hybrid_search, reciprocal_rank_fusion
+from vectorstore.flat_index import open_vector_store
+from vectorstore.retrieval_filters import infer_filters, clean_filters, to_where
+from vectorstore.loader import document_id
+from vectorstore.context_packer import pack_context
 
 # ✅ .env 파일 명시적으로 로딩
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".env")
@@ -35,27 +43,14 @@ if not OPENAI_API_KEY:
 base_dir = os.path.join(os.path.dirname(__file__), "..")
 VECTOR_DB_DIR = os.path.join(base_dir, "utils/metadata/chroma_db")
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"  # dense + BM25 (RRF)
+RETRIEVAL_INFER_FILTERS = os.getenv("RETRIEVAL_INFER_FILTERS", "true").lower() == "true"  # 질문에서 source / 연도 추론 (순위 가중만)
 
 # ✅ 전역 embedding + vector DB 인스턴스
-embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+embeddings = load_embeddings(model_name=EMBEDDING_MODEL)  # EMBEDDING_BACKEND (torch / onnx) + 임베딩 캐시
 
-def run_qa_chain(
-    query: str,
-    chat_history: List = [],
-    k: int = 3,
-    VECTOR_DB_DIR=VECTOR_DB_DIR,
-    return_sources: bool = False,
-) -> Union[str, Tuple[str, List[Document]]]:
-    print(f"\n🔍 질의: '{query}' → 유사 문서 검색 중...")
-
-    llm = ChatOpenAI(model_name="gpt-4", temperature=0, openai_api_key=OPENAI_API_KEY)
-    db = Chroma(persist_directory=VECTOR_DB_DIR, embedding_function=embeddings)
-
-    retrieved_docs = db.similarity_search(query, k=k)
-    context = "\n\n".join([doc.page_content for doc in retrieved_docs])
-
-    # ✅ system + history + human message 기반 prompt 구성
-    qa_template = """
+# ✅ system + history + human message 기반 prompt 구성
+qa_template = """
 You are RefNavi, an academic assistant chatbot that helps users understand scientific papers using retrieved documents and your own knowledge.
 
 Your goal is to answer the user's question as clearly and informatively as possible.
@@ -81,17 +76,147 @@ Maintain a polite and helpful tone in all responses.
 답변 (Answer):
 """
 
+
+# ✅ 장기 실행 Vector QA 서비스
+class VectorQAService:
+    """
+    프로세스 전역 Vector QA 서비스
+    - embedding 모델 / ChatOpenAI / Chroma 스토어를 한 번만 생성해 요청 스레드 간 공유
+    - 벡터 스토어 (VECTOR_BACKEND: chroma / flat / hnsw) 는 persist 디렉토리별로 열어 두고, vector 버전이 바뀐 경우에만 새로 열어 참조를 교체
+      (교체 전에 스토어를 받아간 요청은 기존 인스턴스로 끝까지 처리)
+    - 같은 디렉토리의 BM25 색인도 함께 열어 dense / BM25 결과를 reciprocal rank fusion으로 합침
+      (색인 파일이 없으면 dense 검색만 수행, 논문 shard는 필요할 때 로드, 버전이 바뀌면 바뀐 shard만 다시 로드)
+    - warm_up(): 서버 시작 시 스토어 로드 + 임베딩 모델 첫 추론을 미리 수행
+    """
+
+    def __init__(self, embeddings, llm):
+        self.embeddings = embeddings
+        self.llm = llm
+        self._stores = {}  # persist_dir → (vector 버전, 벡터 스토어, BM25Index | None)
+        self._bm25 = {}    # persist_dir → BM25Index (버전이 바뀌어도 유지, refresh로 갱신)
+        self._lock = threading.Lock()
+
+    def _entry(self, persist_dir: str) -> tuple:
+        persist_dir = os.path.abspath(persist_dir)
+        version = get_version("vector")
+        entry = self._stores.get(persist_dir)
+        if entry is not None and entry[0] == version:
+            return entry
+
+        with self._lock:
+            entry = self._stores.get(persist_dir)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    print(f"🔄 벡터 DB 다시 열기 (vector version {entry[0]} → {version})")
+                # VECTOR_BACKEND: chroma / flat / hnsw (다른 EMBEDDING_BACKEND로 만든 스토어면 EmbeddingMismatchError)
+                store = open_vector_store(persist_dir, self.embeddings, embedding_name=embedding_name(model_name=EMBEDDING_MODEL))
+                bm25 = self._bm25.get(persist_dir)
+                if bm25 is None:
+                    # shard 목록만 읽고, 논문 shard는 검색에 처음 필요할 때 로드 (paper_id 필터 검색은 그 논문 shard만)
+                    bm25 = self._bm25[persist_dir] = BM25Index.for_store(persist_dir, lazy=True)
+                else:
+                    bm25.refresh()  # 메모리에 있는 논문 shard 중 바뀐 것만 다시 로드
+                entry = self._stores[persist_dir] = (version, store, bm25 if bm25.available_shards() else None)
+            return entry
+
+    def get_store(self, persist_dir: str = VECTOR_DB_DIR) -> Chroma:
+        return self._entry(persist_dir)[1]
+
+    def retrieve(self, query: str, k: int = 3, persist_dir: str = VECTOR_DB_DIR, where: dict = None) -> List[Document]:
+        """where (Chroma 필터 문법) 는 dense / BM25 검색 모두에 인덱스 단계에서 적용"""
+        _, store, bm25 = self._entry(persist_dir)
+        if not HYBRID_RETRIEVAL or bm25 is None:
+            return store.similarity_search(query, k=k, filter=where)
+        return hybrid_search(store, bm25, query, k, where)
+
+    def warm_up(self, persist_dir: str = VECTOR_DB_DIR):
+        print("🔥 Vector QA warm-up (벡터 DB 로드 + 임베딩 모델 초기화)")
+        try:
+            self.get_store(persist_dir)
+            self.embeddings.embed_query("warm up")
+        except Exception as e:
+            # warm-up 실패는 서버 시작을 막지 않음 (첫 질의에서 다시 로드)
+            print(f"⚠️ Vector QA warm-up 실패: {e}")
+
+
+vector_qa_service = VectorQAService(
+    embeddings=embeddings,
+    llm=ChatOpenAI(model_name="gpt-4", temperature=0, openai_api_key=OPENAI_API_KEY),
+)
+
+
+def retrieve_documents(query: str, k: int = 3, VECTOR_DB_DIR=VECTOR_DB_DIR, filters: dict = None) -> List[Document]:
+    """
+    유사도 검색만 수행 (LLM 호출 없음)
+    - filters (source / year_min / year_max / paper_id) 는 인덱스 검색 단계의 hard 필터
+    - 명시하지 않은 source / 연도는 질문에서 추론 (paper_id만 지정하면 해당 논문 안에서 추론 적용)
+    - 추론된 필터는 결과를 제한하지 않고, 추론 필터 검색 결과를 RRF로 한 번 더 합쳐 조건에 맞는 문서의 순위만 올림
+    """
+    print(f"\n🔍 질의: '{query}' → 유사 문서 검색 중...")
+    explicit = clean_filters(filters)
+    inferred = {}
+    if RETRIEVAL_INFER_FILTERS and not ({"source", "year_min", "year_max"} & explicit.keys()):
+        inferred = infer_filters(query)
+    where = to_where(explicit)
+    if where:
+        print(f"🔎 검색 필터: {where}")
+    if not inferred:
+        return vector_qa_service.retrieve(query, k=k, persist_dir=VECTOR_DB_DIR, where=where)
+
+    boosted_where = to_where({**inferred, **explicit})
+    print(f"🔎 추론 필터 (순위 가중): {boosted_where}")
+    fetch_k = max(k * 2, 10)
+    by_id = {}
+    rankings = []
+    for leg_where in (where, boosted_where):
+        ranking = []
+        for doc in vector_qa_service.retrieve(query, k=fetch_k, persist_dir=VECTOR_DB_DIR, where=leg_where):
+            doc_id = getattr(doc, "id", None) or document_id(doc)
+            by_id.setdefault(doc_id, doc)
+            ranking.append(doc_id)
+        rankings.append(ranking)
+    return [by_id[doc_id] for doc_id in reciprocal_rank_fusion(rankings, k=k)]
+
+
+def _build_answer_chain(query: str, retrieved_docs: List[Document], chat_history: List):
+    llm = vector_qa_service.llm
+    # ✅ chunk 중복 제거 + 관련 문장 위주로 토큰 예산 안에 담기 (CONTEXT_TOKEN_BUDGET)
+    context, _ = pack_context(query, retrieved_docs)
+
     system_prompt = SystemMessagePromptTemplate.from_template(qa_template)
     human_prompt = HumanMessagePromptTemplate.from_template("{question}")
     chat_prompt = ChatPromptTemplate.from_messages([
         system_prompt,
-        *chat_history,
+        *(chat_history or []),
         human_prompt
     ])
 
     chain = chat_prompt | llm | StrOutputParser()
-    inputs = {"context": context, "question": query}
-    answer = chain.invoke(inputs)
+    return chain, context
+
+
+def answer_from_documents(query: str, retrieved_docs: List[Document], chat_history: List = None) -> str:
+    """검색된 문서를 context로 LLM 답변 생성"""
+    chain, context = _build_answer_chain(query, retrieved_docs, chat_history)
+    return chain.invoke({"context": context, "question": query})
+
+
+def stream_answer_from_documents(query: str, retrieved_docs: List[Document], chat_history: List = None):
+    """answer_from_documents의 스트리밍 버전 (생성되는 토큰 단위로 yield)"""
+    chain, context = _build_answer_chain(query, retrieved_docs, chat_history)
+    yield from chain.stream({"context": context, "question": query})
+
+
+def run_qa_chain(
+    query: str,
+    chat_history: List = None,
+    k: int = 3,
+    VECTOR_DB_DIR=VECTOR_DB_DIR,
+    return_sources: bool = False,
+    filters: dict = None,
+) -> Union[str, Tuple[str, List[Document]]]:
+    retrieved_docs = retrieve_documents(query, k=k, VECTOR_DB_DIR=VECTOR_DB_DIR, filters=filters)
+    answer = answer_from_documents(query, retrieved_docs, chat_history)
 
     sources = retrieved_docs
     if sources: